@@ -11,7 +11,7 @@ from core.config import cfg
 from apis.base import format_search_kw
 from core.print import print_warning, print_info, print_error, print_success
 from core.insights import InsightsService
-from driver.wxarticle import WXArticleFetcher
+from driver.article_extract import ArticleExtractor
 from core.queue import TaskQueue
 router = APIRouter(prefix=f"/articles", tags=["文章管理"])
 
@@ -94,6 +94,33 @@ async def toggle_article_read_status(
             )
         )
     
+@router.get("/content/backfill", summary="获取正文回填进度")
+async def get_content_backfill(
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.content_backfill import ContentBackfill
+    return success_response(ContentBackfill.get_progress())
+
+
+@router.post("/content/backfill", summary="启动正文回填(并发抓取正文为空的文章)")
+async def start_content_backfill(
+    max_items: int = Query(0, ge=0, description="本次最多处理的文章数，0为不限"),
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.content_backfill import ContentBackfill
+    started = ContentBackfill.start(max_items or None)
+    return success_response({"started": started, **ContentBackfill.get_progress()})
+
+
+@router.delete("/content/backfill", summary="停止正文回填")
+async def stop_content_backfill(
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.content_backfill import ContentBackfill
+    ContentBackfill.stop()
+    return success_response(ContentBackfill.get_progress())
+
+
 @router.post("/{article_id}/content/fetch", summary="抓取并保存文章正文(用于全文拆解/本地阅读)")
 async def fetch_article_content(
     article_id: str,
@@ -128,7 +155,7 @@ async def fetch_article_content(
                 detail=error_response(code=40001, message="文章缺少原文链接，无法抓取正文"),
             )
 
-        info = await WXArticleFetcher().async_get_article_content(url)
+        info = await ArticleExtractor.extract_async(url)
         if not info:
             raise HTTPException(
                 status_code=fast_status.HTTP_502_BAD_GATEWAY,
@@ -169,7 +196,7 @@ async def fetch_article_content(
 
         # Background: fill key points / breakdown (best-effort) after content is available.
         try:
-            TaskQueue.add_task(service.ensure_cached, article_id)
+            TaskQueue.add_task(service.ensure_cached, article_id, _priority="interactive")
         except Exception:
             pass
 
@@ -485,7 +485,7 @@ async def backfill_mp_recent_pages(
         if updated_article_ids:
             service = InsightsService()
             for aid in updated_article_ids[:500]:
-                TaskQueue.add_task(service.get_or_create_basic, aid)
+                TaskQueue.add_task(service.get_or_create_basic, aid, _priority="bulk")
     except Exception:
         pass
 
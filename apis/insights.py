@@ -47,10 +47,10 @@ async def get_article_insights(
     try:
         auto_kp = bool(cfg.get("insights.auto_key_points", True))
         auto_bd = bool(cfg.get("insights.auto_llm_breakdown", False))
-        missing_kp = auto_kp and not (getattr(insight, "key_points_json", None) or "")
+        missing_kp = auto_kp and service.needs_key_points(insight)
         missing_bd = auto_bd and include_llm and not (getattr(insight, "llm_breakdown_json", None) or "")
         if missing_kp or missing_bd:
-            TaskQueue.add_task(service.ensure_cached, article_id)
+            TaskQueue.add_task(service.ensure_cached, article_id, _priority="interactive")
     except Exception:
         pass
     data = _serialize_insight(insight)
@@ -149,8 +149,60 @@ async def batch_cache_insights(
     scheduled = 0
     for (aid,) in article_ids:
         try:
-            TaskQueue.add_task(service.ensure_cached, aid)
+            TaskQueue.add_task(service.ensure_cached, aid, _priority="bulk")
             scheduled += 1
         except Exception:
             continue
     return success_response({"scheduled": scheduled, "limit": limit})
+
+
+@router.get("/batch/backfill", summary="获取基础洞察批量回填进度")
+async def get_insights_backfill(
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.insights_backfill import InsightsBackfill
+    return success_response(InsightsBackfill.get_progress())
+
+
+@router.post("/batch/backfill", summary="启动基础洞察批量回填(多进程解析全部文章，支持断点续跑)")
+async def start_insights_backfill(
+    max_items: int = Query(0, ge=0, description="本次最多处理的文章数，0为不限"),
+    restart: bool = Query(False, description="忽略检查点从头开始"),
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.insights_backfill import InsightsBackfill
+    started = InsightsBackfill.start(max_items or None, restart)
+    return success_response({"started": started, **InsightsBackfill.get_progress()})
+
+
+@router.delete("/batch/backfill", summary="停止基础洞察批量回填")
+async def stop_insights_backfill(
+    current_user: dict = Depends(get_current_user),
+):
+    from jobs.insights_backfill import InsightsBackfill
+    InsightsBackfill.stop()
+    return success_response(InsightsBackfill.get_progress())
+
+
+@router.get("/topics/trending", summary="获取跨公众号热点话题(按增长速度排序)")
+async def get_trending_topics(
+    limit: int = Query(20, ge=1, le=100),
+    min_feeds: int = Query(None, ge=1, description="至少被N个公众号报道，默认 insights.topics.min_feeds"),
+    current_user: dict = Depends(get_current_user),
+):
+    from core.insights.topics import trending_topics
+    return success_response({"list": trending_topics(DB.get_session(), limit=limit, min_feeds=min_feeds)})
+
+
+@router.post("/topics/cycle", summary="立即执行一轮话题增量聚类")
+def run_topics_cycle(
+    current_user: dict = Depends(get_current_user),
+):
+    # 同步接口(在线程池中执行)，单轮耗时受 insights.topics.cpu_budget 限制
+    from core.insights import topics
+    if not topics.available():
+        raise HTTPException(
+            status_code=fast_status.HTTP_400_BAD_REQUEST,
+            detail=error_response(code=40001, message="话题聚类未启用"),
+        )
+    return success_response(topics.Topics.run_cycle())
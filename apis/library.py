@@ -6,6 +6,7 @@ from sqlalchemy import func
 from apis.base import format_search_kw, success_response
 from core.auth import get_current_user
 from core.db import DB
+from core.insights.related import related_articles
 from core.models.article import Article, ArticleBase
 from core.models.article_favorite import ArticleFavorite
 from core.models.article_insight import ArticleInsight
@@ -108,6 +109,7 @@ async def list_library_articles(
 @router.get("/articles/{article_id}", summary="文章库详情(含洞察/收藏/笔记)")
 async def get_library_article(
     article_id: str,
+    related: int = Query(5, ge=0, le=20, description="返回的相关文章数，0为不返回"),
     current_user: dict = Depends(get_current_user),
 ):
     session = DB.get_session()
@@ -160,5 +162,6 @@ async def get_library_article(
     d["notes"] = [n.__dict__ | {"_sa_instance_state": None} for n in notes]
     for n in d["notes"]:
         n.pop("_sa_instance_state", None)
+    d["related"] = related_articles(session, article_id, k=related)
     return success_response(d)
 
@@ -13,6 +13,7 @@ from core.res import save_avatar_locally
 import io
 import os
 from jobs.article import UpdateArticle
+from core.queue.registry import register_task
 from driver.wxarticle import WXArticleFetcher
 import base64
 from typing import Any, Optional
@@ -59,6 +60,41 @@ def _normalize_fakeid(mp_id: Optional[str]) -> Optional[str]:
     return None
 
 
+@register_task("mps.prewarm_new_feed", tag="crawl")
+def _prewarm_new_feed(feed_id: str, days: int, max_pages: int, limit: int, biz: str = "") -> None:
+    """新添加公众号后首次采集最近文章并预生成洞察"""
+    from core.wx import WxGather
+    from core.insights import InsightsService
+    from core.models.feed import Feed
+
+    session2 = DB.get_session()
+    f = session2.query(Feed).filter(Feed.id == feed_id).first()
+    if not f:
+        return
+    fakeid = _normalize_fakeid(f.faker_id) or _normalize_fakeid(biz)
+    if not fakeid:
+        return
+    try:
+        wx = WxGather().Model()
+        wx.get_Articles(
+            faker_id=fakeid,
+            Mps_id=f.id,
+            Mps_title=f.mp_name or "",
+            CallBack=UpdateArticle,
+            start_page=0,
+            MaxPage=max_pages,
+            interval=int(cfg.get("sync_interval", 10)) if int(cfg.get("sync_interval", 10)) < 10 else 2,
+            Gather_Content=False,
+            since_days=days,
+        )
+    except Exception:
+        pass
+    try:
+        InsightsService().ensure_mp_recent_cached(f.id, days=days, limit=limit)
+    except Exception:
+        pass
+
+
 def _extract_numeric_id(mp_id: Optional[str]) -> Optional[str]:
     if not mp_id:
         return None
@@ -335,7 +371,6 @@ async def update_mps(
             from core.insights import InsightsService
             wx=WxGather().Model()
             wx.get_Articles(biz,Mps_id=mp.id,Mps_title=mp.mp_name,CallBack=UpdateArticle,start_page=start_page,MaxPage=end_page)
-            result=wx.articles
             try:
                 if bool(cfg.get("insights.prewarm_on_update", True)):
                     days = int(cfg.get("insights.prewarm_days", 3))
@@ -494,45 +529,16 @@ async def add_mp(
          #在这里实现第一次添加获取公众号文章
         if not existing_feed:
             from core.queue import TaskQueue
-            from core.wx import WxGather
-            from core.insights import InsightsService
-
-            def _prewarm_new_feed(feed_id: str, days: int, max_pages: int, limit: int):
-                session2 = DB.get_session()
-                f = session2.query(Feed).filter(Feed.id == feed_id).first()
-                if not f:
-                    return
-                fakeid = _normalize_fakeid(f.faker_id) or _normalize_fakeid(biz)
-                if not fakeid:
-                    return
-                try:
-                    wx = WxGather().Model()
-                    wx.get_Articles(
-                        faker_id=fakeid,
-                        Mps_id=f.id,
-                        Mps_title=f.mp_name or "",
-                        CallBack=UpdateArticle,
-                        start_page=0,
-                        MaxPage=max_pages,
-                        interval=int(cfg.get("sync_interval", 10)) if int(cfg.get("sync_interval", 10)) < 10 else 2,
-                        Gather_Content=False,
-                        since_days=days,
-                    )
-                except Exception:
-                    pass
-                try:
-                    InsightsService().ensure_mp_recent_cached(f.id, days=days, limit=limit)
-                except Exception:
-                    pass
 
             if bool(cfg.get("insights.prewarm_on_add", True)):
                 days = int(cfg.get("insights.prewarm_days", 3))
                 max_pages = int(cfg.get("insights.prewarm_max_pages", 30))
                 limit = int(cfg.get("insights.prewarm_limit", 120))
-                TaskQueue.add_task(_prewarm_new_feed, feed.id, days, max_pages, limit)
+                TaskQueue.add_task(_prewarm_new_feed, feed.id, days, max_pages, limit, biz, _priority="bulk")
             else:
                 Max_page=int(cfg.get("max_page","2"))
-                TaskQueue.add_task(WxGather().Model().get_Articles,faker_id=feed.faker_id,Mps_id=feed.id,CallBack=UpdateArticle,MaxPage=Max_page,Mps_title=mp_name)
+                from jobs.worker import crawl_feed
+                TaskQueue.add_task(crawl_feed,feed.id,max_page=Max_page,_key=f"crawl:{feed.id}",_latest=True)
             
         return success_response({
             "id": feed.id,
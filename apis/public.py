@@ -1,5 +1,4 @@
 import json
-import re
 
 from fastapi import APIRouter, HTTPException, Query, status as fast_status
 
@@ -10,20 +9,14 @@ from core.insights import InsightsService
 from core.models.article import Article
 from core.models.feed import Feed
 from core.models.article_insight import ArticleInsight
-from core.insights.extract import html_to_text
+from core.insights.extract import parse_article
+from core.insights.related import related_articles
 from core.queue import TaskQueue
 
 
 router = APIRouter(prefix="/public", tags=["公开"])
 
 
-def _estimate_word_count(text: str) -> int:
-    if not text:
-        return 0
-    t = re.sub(r"\s+", "", text)
-    return len(t)
-
-
 def _serialize_channel(feed: Feed) -> dict:
     return {
         "id": feed.id,
@@ -138,7 +131,7 @@ async def list_public_channel_articles(
 
     items = []
     for article, feed in rows:
-        text_for_count = html_to_text(article.content) or (article.description or "")
+        word_count = parse_article(article.content).word_count or parse_article(article.description).word_count
         items.append(
             {
                 "id": str(article.id),
@@ -149,7 +142,7 @@ async def list_public_channel_articles(
                 "mp_name": feed.mp_name or "",
                 "pic_url": article.pic_url or "",
                 "is_read": int(getattr(article, "is_read", 0) or 0),
-                "word_count": _estimate_word_count(text_for_count),
+                "word_count": word_count,
             }
         )
 
@@ -182,9 +175,19 @@ async def get_public_insights(article_id: str):
     try:
         auto_kp = bool(cfg.get("insights.auto_key_points", True))
         auto_bd = bool(cfg.get("insights.auto_llm_breakdown", False))
-        if (auto_kp and not (getattr(insight, "key_points_json", None) or "")) or (auto_bd and not (getattr(insight, "llm_breakdown_json", None) or "")):
-            TaskQueue.add_task(service.ensure_cached, article_id)
+        if (auto_kp and service.needs_key_points(insight)) or (auto_bd and not (getattr(insight, "llm_breakdown_json", None) or "")):
+            TaskQueue.add_task(service.ensure_cached, article_id, _priority="interactive")
     except Exception:
         pass
 
     return success_response(_serialize_insight(insight))
+
+
+@router.get("/insights/{article_id}/related", summary="公开相关文章(基于正文相似度)")
+async def get_public_related(
+    article_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    same_feed: bool = Query(False, description="仅返回同一公众号的文章"),
+):
+    session = DB.get_session()
+    return success_response({"list": related_articles(session, article_id, k=limit, same_feed=same_feed)})
@@ -326,3 +326,53 @@ async def rss(
     return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
 
 
+
+
+@feed_router.get("/topics/trending.{ext}", summary="获取跨公众号热点话题源(预警)")
+async def topics_rss(
+    request: Request,
+    ext: str,
+    limit: int = Query(20, ge=1, le=100),
+    min_feeds: int = Query(None, ge=1, description="至少被N个公众号报道，默认 insights.topics.min_feeds"),
+    content_type:str=Query(None,alias="ctype"),
+):
+    rss=RSS(name=f'topics_{limit}_{min_feeds}',ext=ext)
+    rss.set_content_type(content_type)
+    session = DB.get_session()
+    from html import escape
+    from datetime import datetime, timezone, timedelta
+    from core.insights.topics import trending_topics
+    cst = timezone(timedelta(hours=8))
+    rss_domain=cfg.get("rss.base_url",str(request.base_url))
+    rss_list = []
+    for topic in trending_topics(session, limit=limit, min_feeds=min_feeds):
+        rep = topic["representative"]
+        lines = "".join(
+            f'<li><a href="{escape(a["url"])}">{escape(a["title"])}</a> - {escape(a["mp_name"])}</li>'
+            for a in topic["articles"]
+        )
+        summary = f'{topic["feeds"]}个公众号 {topic["size"]}篇，近期每小时{topic["velocity"]}篇'
+        rss_list.append({
+            # 话题成员变化后以新条目出现，便于订阅端提醒
+            "id": f'topic-{topic["id"]}-{topic["size"]}',
+            "title": f'[{topic["feeds"]}源/{topic["size"]}篇] {topic["title"]}',
+            "link": rep.get("url") or f"{rss_domain}rss/feed/{rep.get('id')}",
+            "description": summary,
+            "content": f"<p>{escape(summary)}</p><ul>{lines}</ul>",
+            "image": rep.get("pic_url", ""),
+            "mp_name": "、".join(topic["feed_names"]),
+            "updated": datetime.fromtimestamp(topic["last_seen"], tz=cst),
+            "feed": {
+                "id": "topics",
+                "name": "、".join(topic["feed_names"]),
+                "cover": "",
+                "intro": "",
+            },
+        })
+    rss_xml = rss.generate(rss_list, ext=ext, title=f'{cfg.get("rss.title","WeRss") or "WeRss"} 热点话题',
+                           link=rss_domain, description="多个公众号同时报道、增长最快的话题",
+                           image_url=cfg.get("rss.cover") or f"{rss_domain}static/logo.svg")
+    return Response(
+        content=rss_xml,
+        media_type=rss.get_type()
+    )
@@ -1,5 +1,4 @@
 import json
-import re
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, status as fast_status
@@ -8,6 +7,7 @@ from apis.base import error_response, success_response, format_search_kw
 from core.config import cfg
 from core.db import DB
 from core.insights import InsightsService
+from core.insights.extract import parse_article
 from core.models.article import Article, ArticleBase
 from core.models.article_insight import ArticleInsight
 from core.models.base import DATA_STATUS
@@ -43,13 +43,6 @@ def require_service_api_key(x_api_key: Optional[str] = Header(None, alias="X-API
     return x_api_key
 
 
-def _estimate_word_count(text: str) -> int:
-    if not text:
-        return 0
-    t = re.sub(r"\s+", "", text)
-    return len(t)
-
-
 def _serialize_feed(feed: Feed) -> dict:
     return {
         "id": str(feed.id),
@@ -118,6 +111,7 @@ async def service_list_channel_articles(
     rows = q.order_by(Art.publish_time.desc()).limit(limit).offset(offset).all()
     items = []
     for art, feed in rows:
+        word_count = parse_article(art.content).word_count if include_content else 0
         items.append(
             {
                 "id": str(art.id),
@@ -129,7 +123,7 @@ async def service_list_channel_articles(
                 "pic_url": art.pic_url or "",
                 "url": art.url or "",
                 "content": art.content if include_content else None,
-                "word_count": _estimate_word_count((art.description or "") if not include_content else (art.content or art.description or "")),
+                "word_count": word_count or parse_article(art.description).word_count,
             }
         )
     channel = None
@@ -159,10 +153,10 @@ async def service_get_article(
     insight = service.get_or_create_basic(article_id)
     if insight and schedule_cache:
         try:
-            missing_kp = bool(cfg.get("insights.auto_key_points", True)) and not (getattr(insight, "key_points_json", None) or "")
+            missing_kp = bool(cfg.get("insights.auto_key_points", True)) and service.needs_key_points(insight)
             missing_bd = bool(cfg.get("insights.auto_llm_breakdown", False)) and include_llm and not (getattr(insight, "llm_breakdown_json", None) or "")
             if missing_kp or missing_bd:
-                TaskQueue.add_task(service.ensure_cached, article_id)
+                TaskQueue.add_task(service.ensure_cached, article_id, _priority="interactive")
         except Exception:
             pass
 
@@ -3,6 +3,7 @@ import time
 import sys
 import psutil
 from fastapi import APIRouter,Depends
+from fastapi.responses import PlainTextResponse
 from typing import Dict, Any
 from core.auth import get_current_user
 from .base import success_response, error_response
@@ -64,6 +65,47 @@ async def system_resources(
             code=50002,
             message=f"获取系统资源失败: {str(e)}"
         )
+@router.get("/metrics", summary="获取运行指标")
+async def get_metrics(
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """获取进程内运行指标(计数器/耗时)及正文提取命中率"""
+    try:
+        from core.metrics import metrics
+        from driver.article_extract import ArticleExtractor
+        data = metrics.snapshot()
+        from core.ratelimit import get_limiters_info
+        data["article_extract"] = ArticleExtractor.get_stats()
+        from core.insights.hydrate import Hydrator
+        data["hydrate"] = Hydrator.get_stats()
+        from driver.account_pool import Accounts
+        data["ratelimit"] = get_limiters_info()
+        data["accounts"] = Accounts.get_info()
+        return success_response(data=data)
+    except Exception as e:
+        return error_response(
+            code=50003,
+            message=f"获取运行指标失败: {str(e)}"
+        )
+@router.get("/queues", summary="获取队列与调度器运行指标")
+async def get_queues(
+    current_user: dict = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """所有任务队列与定时调度器的指标：入队速率、排队/执行耗时分位数、失败数、执行中的任务、下次触发时间"""
+    try:
+        from core.monitor import snapshot
+        return success_response(data=snapshot())
+    except Exception as e:
+        return error_response(
+            code=50004,
+            message=f"获取队列指标失败: {str(e)}"
+        )
+@router.get("/queues/prometheus", summary="队列与调度器指标(Prometheus格式)", response_class=PlainTextResponse)
+async def get_queues_prometheus(
+    current_user: dict = Depends(get_current_user)
+):
+    from core.monitor import to_prometheus
+    return PlainTextResponse(to_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
 from core.article_lax import laxArticle
 from .ver import API_VERSION
 from core.base import VERSION as CORE_VERSION,LATEST_VERSION
@@ -0,0 +1,130 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class TaskCancelled(Exception):
+    """任务已被取消或超过执行期限"""
+
+
+class CancelToken:
+    """协作式取消令牌
+
+    任务执行前绑定到当前线程(bind)，采集/抓取循环通过 cancelled()/check()/sleep()
+    检查是否被取消或已超过期限；取消时执行已登记的回调(如关闭浏览器页面)。
+    """
+
+    def __init__(self, timeout: float = None, name: str = ""):
+        self.name = name
+        self.started = time.time()
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.deadline = self.started + self.timeout if self.timeout else None
+        self.reason = ""
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = "已取消") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> None:
+        """登记取消时执行的回调，已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.expired():
+            self.cancel("执行超时")
+        return self._event.is_set()
+
+    def extend(self, seconds: float = None) -> None:
+        """续期：期限重置为从现在起 seconds 秒(默认为原执行期限)，已取消或不限期时不变
+
+        分批处理且有检查点的长任务(如正文回填)每完成一批续期一次，单批卡住仍会超时。
+        """
+        seconds = seconds or self.timeout
+        if self.deadline is None or not seconds or self.cancelled():
+            return
+        self.deadline = time.time() + seconds
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def check(self) -> None:
+        """已取消时抛出 TaskCancelled"""
+        if self.cancelled():
+            raise TaskCancelled(f"{self.name or '任务'}{self.reason}")
+
+    def sleep(self, seconds: float) -> bool:
+        """可被取消打断的等待，返回False表示等待期间被取消"""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._event.wait(max(0.0, seconds))
+        return not self.cancelled()
+
+
+_local = threading.local()
+
+
+def current() -> Optional[CancelToken]:
+    """当前线程绑定的取消令牌，未绑定时返回None"""
+    return getattr(_local, "token", None)
+
+
+def bind(token: Optional[CancelToken]) -> Optional[CancelToken]:
+    """将令牌绑定到当前线程，返回之前绑定的令牌(用于恢复)"""
+    previous = current()
+    _local.token = token
+    return previous
+
+
+def cancelled() -> bool:
+    token = current()
+    return token is not None and token.cancelled()
+
+
+def check() -> None:
+    token = current()
+    if token is not None:
+        token.check()
+
+
+def extend(seconds: float = None) -> None:
+    """为当前线程绑定的令牌续期，未绑定时忽略"""
+    token = current()
+    if token is not None:
+        token.extend(seconds)
+
+
+def sleep(seconds: float) -> bool:
+    """可取消的 time.sleep，未绑定令牌时等同于 time.sleep，返回False表示被取消"""
+    token = current()
+    if token is None:
+        time.sleep(max(0.0, seconds))
+        return True
+    return token.sleep(seconds)
+
+
+def on_cancel(callback: Callable[[], None]) -> None:
+    token = current()
+    if token is not None:
+        token.on_cancel(callback)
@@ -181,7 +181,7 @@ class Db:
                     if cfg.get("insights.auto_basic", True) or cfg.get("insights.auto_key_points", False) or cfg.get("insights.auto_llm_breakdown", False):
                         from core.queue import TaskQueue
                         from core.insights import InsightsService
-                        TaskQueue.add_task(InsightsService().ensure_cached, art.id)
+                        TaskQueue.add_task(InsightsService().ensure_cached, art.id, _priority="bulk")
                 except Exception:
                     pass
 
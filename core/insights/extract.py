@@ -1,76 +1,127 @@
 import hashlib
 import json
 import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Any
 
 from bs4 import BeautifulSoup
 
+from core.config import cfg
+
 
 def _normalize_space(text: str) -> str:
     return re.sub(r"\s+", " ", (text or "").strip())
 
 
-def html_to_text(html: str) -> str:
-    if not html:
-        return ""
-    soup = BeautifulSoup(html, "lxml")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    text = soup.get_text(" ", strip=True)
-    return _normalize_space(text)
+_STRIP_TAGS = ["script", "style", "noscript"]
+_HEADING_TAGS = [f"h{lvl}" for lvl in range(1, 7)]
 
 
-def extract_summary(description: str, content_html: str, max_len: int = 200) -> str:
-    desc = _normalize_space(description)
-    if desc:
-        return desc[:max_len]
-    if not content_html:
-        return ""
-
-    soup = BeautifulSoup(content_html, "lxml")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
+@dataclass(frozen=True)
+class ParsedArticle:
+    """Everything the insights pipeline needs from one article body, built from a single parse."""
 
-    paragraphs: list[str] = []
-    for p in soup.find_all("p"):
-        t = _normalize_space(p.get_text(" ", strip=True))
-        if len(t) >= 20:
-            paragraphs.append(t)
-        if len(paragraphs) >= 3:
-            break
-    if paragraphs:
-        return _normalize_space(" ".join(paragraphs))[:max_len]
+    digest: str
+    text: str = ""
+    # Paragraphs (level 0) and headings (level 1-6) in document order.
+    blocks: tuple[tuple[int, str], ...] = ()
 
-    return html_to_text(content_html)[:max_len]
+    @property
+    def paragraphs(self) -> tuple[str, ...]:
+        return tuple(text for lvl, text in self.blocks if not lvl)
 
+    @property
+    def headings(self) -> tuple[tuple[int, str], ...]:
+        return tuple((lvl, text) for lvl, text in self.blocks if lvl)
+
+    @property
+    def word_count(self) -> int:
+        return len(re.sub(r"\s+", "", self.text))
+
+    def blocks_cover(self, text: str = None, ratio: float = 0.6) -> bool:
+        """Whether the blocks hold at least `ratio` of the text.
+
+        WeChat bodies often keep text in <section>/<span> rather than <p>, so callers
+        fall back to splitting the plain text when the block structure misses most of it.
+        """
+        text = self.text if text is None else text
+        return bool(self.blocks) and sum(len(t) for _, t in self.blocks) >= ratio * len(text)
+
+    def summary(self, description: str = "", max_len: int = 200) -> str:
+        desc = _normalize_space(description)
+        if desc:
+            return desc[:max_len]
+        paragraphs = [p for p in self.paragraphs if len(p) >= 20][:3]
+        if paragraphs:
+            return _normalize_space(" ".join(paragraphs))[:max_len]
+        return self.text[:max_len]
+
+    def heading_items(self, levels: tuple[int, ...] = (1, 2), max_items: int = 20) -> list[dict[str, Any]]:
+        items: list[dict[str, Any]] = []
+        seen: set[tuple[int, str]] = set()
+        for lvl, text in self.headings:
+            if lvl not in levels or (lvl, text) in seen:
+                continue
+            seen.add((lvl, text))
+            items.append({"level": lvl, "text": text})
+            if len(items) >= max_items:
+                break
+        return items
 
-def extract_headings(content_html: str, levels: tuple[int, ...] = (1, 2), max_items: int = 20) -> list[dict[str, Any]]:
-    if not content_html:
-        return []
-    soup = BeautifulSoup(content_html, "lxml")
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
 
-    wanted = {f"h{lvl}": lvl for lvl in levels}
-    items: list[dict[str, Any]] = []
-    seen: set[tuple[int, str]] = set()
+_parsed: "OrderedDict[str, ParsedArticle]" = OrderedDict()
+_parsed_lock = threading.Lock()
 
-    for el in soup.find_all(list(wanted.keys())):
-        lvl = wanted.get(el.name)
-        if not lvl:
-            continue
+
+def _parse(html: str, digest: str) -> ParsedArticle:
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(_STRIP_TAGS):
+        tag.decompose()
+    blocks = []
+    for el in soup.find_all(["p"] + _HEADING_TAGS):
         text = _normalize_space(el.get_text(" ", strip=True))
-        if not text:
-            continue
-        key = (lvl, text)
-        if key in seen:
-            continue
-        seen.add(key)
-        items.append({"level": lvl, "text": text})
-        if len(items) >= max_items:
-            break
-
-    return items
+        if text:
+            blocks.append((0 if el.name == "p" else int(el.name[1]), text))
+    return ParsedArticle(
+        digest=digest,
+        text=_normalize_space(soup.get_text(" ", strip=True)),
+        blocks=tuple(blocks),
+    )
+
+
+def parse_article(content_html: str) -> ParsedArticle:
+    """Parse article HTML once; results are memoized per content hash (insights.parse_cache_size entries)."""
+    html = content_html or ""
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    if not html:
+        return ParsedArticle(digest=digest)
+    with _parsed_lock:
+        parsed = _parsed.get(digest)
+        if parsed is not None:
+            _parsed.move_to_end(digest)
+            return parsed
+    parsed = _parse(html, digest)
+    limit = int(cfg.get("insights.parse_cache_size", 256) or 0)
+    if limit > 0:
+        with _parsed_lock:
+            _parsed[digest] = parsed
+            while len(_parsed) > limit:
+                _parsed.popitem(last=False)
+    return parsed
+
+
+def html_to_text(html: str) -> str:
+    return parse_article(html).text
+
+
+def extract_summary(description: str, content_html: str, max_len: int = 200) -> str:
+    return parse_article(content_html).summary(description, max_len=max_len)
+
+
+def extract_headings(content_html: str, levels: tuple[int, ...] = (1, 2), max_items: int = 20) -> list[dict[str, Any]]:
+    return parse_article(content_html).heading_items(levels, max_items=max_items)
 
 
 def compute_content_hash(description: str, content_html: str) -> str:
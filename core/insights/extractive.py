@@ -0,0 +1,123 @@
+"""Local extractive summarizer (no-LLM tier).
+
+Sentences are vectorized with TF-IDF over CJK character bigrams (plus lowercase
+latin words), ranked with TextRank on the cosine-similarity graph, and picked
+greedily with a redundancy filter. Runs in a few milliseconds per article.
+"""
+import math
+import re
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .extract import ParsedArticle
+
+_SENTENCE = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]?")
+_TOKEN = re.compile(r"[㐀-鿿豈-﫿]+|[a-zA-Z][a-zA-Z0-9_\-]+|\d+(?:\.\d+)?%?")
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+
+# Longer articles are ranked on their first sentences only (keeps the graph small).
+MAX_SENTENCES = 300
+
+
+def available() -> bool:
+    return np is not None
+
+
+def tokenize(text: str) -> list[str]:
+    """CJK runs become character bigrams (single char when alone); latin words/numbers stay whole."""
+    tokens: list[str] = []
+    for run in _TOKEN.findall(text or ""):
+        if _CJK.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def split_sentences(parsed: ParsedArticle, min_len: int = 8, max_len: int = 200) -> list[str]:
+    # Fall back to the plain text when the paragraphs miss most of the body.
+    units = parsed.paragraphs if parsed.blocks_cover() else (parsed.text,)
+    sentences: list[str] = []
+    for unit in units:
+        for s in _SENTENCE.findall(unit):
+            s = s.strip()
+            if min_len <= len(s) <= max_len:
+                sentences.append(s)
+            if len(sentences) >= MAX_SENTENCES:
+                return sentences
+    return sentences
+
+
+def tfidf_matrix(docs: list[list[str]]) -> "np.ndarray":
+    """L2-normalized TF-IDF rows (sublinear TF, smoothed IDF)."""
+    vocab: dict[str, int] = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(docs):
+        for t in tokens:
+            rows.append(i)
+            cols.append(vocab.setdefault(t, len(vocab)))
+    matrix = np.zeros((len(docs), max(1, len(vocab))), dtype=np.float32)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+    np.log1p(matrix, out=matrix)
+    df = np.count_nonzero(matrix, axis=0)
+    matrix *= (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def textrank(similarity: "np.ndarray", damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> "np.ndarray":
+    n = similarity.shape[0]
+    weights = similarity.copy()
+    np.fill_diagonal(weights, 0)
+    out = weights.sum(axis=1, keepdims=True)
+    out[out == 0] = 1
+    transition = weights / out
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def summarize(parsed: ParsedArticle, title: str = "", max_points: int = None, redundancy: float = 0.5) -> dict[str, Any]:
+    """Return {"highlight", "points"} picked from the article's own sentences (empty when nothing usable).
+
+    `max_points` defaults to 3-8, growing with article length.
+    """
+    sentences = split_sentences(parsed)
+    if not sentences or np is None:
+        return {"highlight": "", "points": []}
+    max_points = max_points or max(3, min(8, int(math.sqrt(len(sentences)))))
+    docs = [tokenize(s) for s in sentences]
+    if title:
+        docs.append(tokenize(title))
+    matrix = tfidf_matrix(docs)
+    if title:
+        title_vec, matrix = matrix[-1], matrix[:-1]
+    similarity = matrix @ matrix.T
+    scores = textrank(similarity)
+    # Mild preferences: sentences close to the title and early in the article.
+    if title:
+        scores = scores * (1 + matrix @ title_vec)
+    scores = scores * (1 + 0.2 / (1 + np.arange(len(sentences)) / 10))
+
+    picked: list[int] = []
+    for i in np.argsort(-scores):
+        if len(picked) >= max_points:
+            break
+        if picked and float(similarity[i, picked].max()) > redundancy:
+            continue
+        picked.append(int(i))
+    highlight = sentences[picked[0]][:80] if picked else ""
+    return {"highlight": highlight, "points": [sentences[i] for i in sorted(picked)]}
@@ -0,0 +1,137 @@
+"""Public-page hydration for articles that only have url + title.
+
+Fetches the WeChat article page once to backfill digest/cover (and the body when
+it is missing). Requests share the tiered extractor's pooled HTTP client and the
+process-wide "wx" rate limiter, so hydration never opens fresh connections or
+bursts past the crawler's budget. URLs that yielded nothing are remembered in a
+negative cache (LRU, TTL per URL), so repeat views of the same article do not
+re-fetch the page. Pages that fail (network/HTTP errors, verification pages) are
+cached for the shorter `error_ttl`. While one view is fetching a URL, concurrent
+views of it skip hydration (return False) rather than waiting for the result.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from core.config import cfg
+from core.metrics import metrics
+from core.print import print_warning
+from core.ratelimit import get_limiter
+
+
+class PublicPageHydrator:
+    def __init__(self):
+        # Page fetched fine but has no digest/cover (or the article is gone): rarely changes.
+        self.negative_ttl = float(cfg.get("insights.hydrate.negative_ttl", 21600) or 0)
+        # Network/HTTP errors and verification pages: retry sooner.
+        self.error_ttl = float(cfg.get("insights.hydrate.error_ttl", 600) or 0)
+        # Longest wait for a rate-limit token on the request path; skipped (not cached) after that.
+        self.max_wait = float(cfg.get("insights.hydrate.max_wait", 2) or 0)
+        self.max_entries = max(1, int(cfg.get("insights.hydrate.cache_size", 10000) or 10000))
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._inflight: set[str] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def applicable(article) -> bool:
+        url = (getattr(article, "url", "") or "").strip()
+        return bool(url) and "mp.weixin.qq.com" in url and not (getattr(article, "description", "") or "").strip()
+
+    # ---------------------------------------------------------------- negative cache
+    def _cached_negative(self, url: str) -> bool:
+        with self._lock:
+            expires = self._negative.get(url)
+            if expires is None:
+                return False
+            if expires < time.time():
+                del self._negative[url]
+                return False
+            self._negative.move_to_end(url)
+            return True
+
+    def _remember(self, url: str, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._negative[url] = time.time() + ttl
+            self._negative.move_to_end(url)
+            while len(self._negative) > self.max_entries:
+                self._negative.popitem(last=False)
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._negative.pop(url, None)
+
+    # ---------------------------------------------------------------- fetch
+    def _fetch(self, url: str) -> Optional[dict[str, Any]]:
+        from driver.article_extract import ArticleExtractor
+
+        if not get_limiter("wx").acquire(timeout=self.max_wait):
+            metrics.inc("hydrate.throttled")
+            return None
+        metrics.inc("hydrate.fetch")
+        try:
+            info = ArticleExtractor.fetch_http(url)
+        except Exception as e:
+            metrics.inc("hydrate.error")
+            print_warning(f"获取公众号文章页失败: {url} {e}")
+            self._remember(url, self.error_ttl)
+            return None
+        if info.get("verify") or info.get("http_status"):
+            metrics.inc("hydrate.error")
+            self._remember(url, self.error_ttl)
+            return None
+        return info
+
+    def hydrate(self, article) -> bool:
+        """Fill missing description/pic_url/content from the public page; True when the article changed."""
+        if not self.applicable(article):
+            return False
+        url = article.url.strip()
+        if self._cached_negative(url):
+            metrics.inc("hydrate.negative_hit")
+            return False
+        with self._lock:
+            if url in self._inflight:
+                return False
+            self._inflight.add(url)
+        try:
+            info = self._fetch(url)
+            if info is None:
+                return False
+            desc = (info.get("description") or "").strip()
+            image = (info.get("topic_image") or "").strip()
+            content = (info.get("content") or "").strip()
+            if content == "DELETED":
+                content = ""
+            changed = False
+            if desc and not (article.description or "").strip():
+                article.description = desc
+                changed = True
+            if image and not (article.pic_url or "").strip():
+                article.pic_url = image
+                changed = True
+            if content and not (getattr(article, "content", "") or "").strip():
+                article.content = content
+                changed = True
+            if not desc:
+                # Nothing to backfill the digest from: don't fetch this page again for a while.
+                self._remember(url, self.negative_ttl)
+            metrics.inc("hydrate.ok" if changed else "hydrate.empty")
+            return changed
+        finally:
+            with self._lock:
+                self._inflight.discard(url)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            size = len(self._negative)
+        return {
+            "negative_entries": size,
+            **{k: metrics.get(f"hydrate.{k}") for k in ("fetch", "ok", "empty", "error", "negative_hit", "throttled")},
+        }
+
+
+# 进程内共享
+Hydrator = PublicPageHydrator()
@@ -0,0 +1,157 @@
+"""Map-reduce LLM processing for articles longer than `llm.max_chars`.
+
+The article is split into token-sized chunks along headings/paragraphs, every chunk
+is processed concurrently (the shared LLM client enforces in-flight/TPM limits), and
+partial results are merged by a reduce prompt — hierarchically if the partials are
+themselves too large for one request.
+"""
+import asyncio
+import json
+import math
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+from core.config import cfg
+from core.llm.client import estimate_tokens
+from core.metrics import metrics
+from core.print import print_info, print_warning
+
+from .extract import ParsedArticle
+
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;])\s*")
+
+# Builds the messages for one map call: (index, total, chunk_text) -> messages
+MapPrompt = Callable[[int, int, str], list[dict[str, Any]]]
+# Builds the messages for one reduce call: (partial_results) -> messages
+ReducePrompt = Callable[[list[dict[str, Any]]], list[dict[str, Any]]]
+# Runs one JSON chat call: (messages, stage, usage, source_text) -> parsed JSON;
+# source_text is the chunk (or the serialized partials) the messages were built from.
+ChatJson = Callable[[list[dict[str, Any]], str, dict[str, int], str], Awaitable[Any]]
+
+
+def enabled() -> bool:
+    return str(cfg.get("llm.map_reduce.enable", True)).lower() == "true"
+
+
+def _tokens(text: str) -> int:
+    return estimate_tokens([{"content": text}])
+
+
+def _units(parsed: ParsedArticle, text: str) -> list[tuple[int, str]]:
+    """Splittable units in document order: (heading level or 0, text)."""
+    if parsed.blocks_cover(text):
+        return list(parsed.blocks)
+    return [(0, s) for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def split_chunks(parsed: ParsedArticle, text: str = None, max_tokens: int = None, max_chunks: int = None) -> list[str]:
+    """Split an article into chunks of about `max_tokens`, preferring heading boundaries.
+
+    At most `max_chunks` chunks are produced; longer articles get proportionally larger chunks.
+    """
+    text = parsed.text if text is None else text
+    max_tokens = int(max_tokens or cfg.get("llm.map_reduce.chunk_tokens", 6000) or 6000)
+    max_chunks = int(max_chunks or cfg.get("llm.map_reduce.max_chunks", 16) or 16)
+    budget = max(max_tokens, math.ceil(_tokens(text) / max_chunks))
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("\n".join(current))
+        current, size = [], 0
+
+    for level, unit in _units(parsed, text):
+        n = _tokens(unit)
+        # Start a new chunk at a heading once the current one is half full.
+        if current and (size + n > budget or (level and size >= budget // 2)):
+            flush()
+        if n > budget:
+            for i in range(0, len(unit), budget):
+                current.append(unit[i:i + budget])
+                size += _tokens(unit[i:i + budget])
+                if size >= budget:
+                    flush()
+            continue
+        current.append(f"{'#' * level} {unit}" if level else unit)
+        size += n
+    flush()
+    # Heading boundaries can leave more chunks than allowed; merge the smallest neighbours.
+    while len(chunks) > max_chunks:
+        i = min(range(len(chunks) - 1), key=lambda k: len(chunks[k]) + len(chunks[k + 1]))
+        chunks[i:i + 2] = [chunks[i] + "\n" + chunks[i + 1]]
+    return chunks
+
+
+def _serialize(partials: list[Any]) -> str:
+    return json.dumps(partials, ensure_ascii=False, sort_keys=True)
+
+
+def _groups(partials: list[Any], budget: int) -> list[list[Any]]:
+    groups: list[list[Any]] = [[]]
+    size = 0
+    for item in partials:
+        n = _tokens(json.dumps(item, ensure_ascii=False))
+        if groups[-1] and size + n > budget:
+            groups.append([])
+            size = 0
+        groups[-1].append(item)
+        size += n
+    # Always make progress: at least two partials per group.
+    if len(groups) == len(partials) and len(partials) > 1:
+        groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+    return groups
+
+
+async def map_reduce(
+    *,
+    name: str,
+    chunks: list[str],
+    chat_json: ChatJson,
+    map_prompt: MapPrompt,
+    reduce_prompt: ReducePrompt,
+    max_tokens: int = None,
+) -> tuple[Any, dict[str, Any]]:
+    """Run map calls for all chunks concurrently, then reduce; returns (result, report).
+
+    The report carries per-stage latency, call/cache/token counts and failed map chunks.
+    A failed reduce raises; failed map chunks are skipped as long as one succeeded.
+    """
+    max_tokens = int(max_tokens or cfg.get("llm.map_reduce.chunk_tokens", 6000) or 6000)
+    report: dict[str, Any] = {"chunks": len(chunks)}
+    started = time.time()
+
+    usage: dict[str, int] = {}
+    results = await asyncio.gather(
+        *[chat_json(map_prompt(i, len(chunks), chunk), "map", usage, chunk) for i, chunk in enumerate(chunks)],
+        return_exceptions=True,
+    )
+    partials = [r for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    report["map"] = {"seconds": round(time.time() - started, 2), "failed": len(errors), **usage}
+    metrics.observe(f"llm.{name}.map", time.time() - started)
+    if not partials:
+        raise errors[0]
+    if errors:
+        print_warning(f"LLM {name}: {len(errors)}/{len(chunks)} chunks failed: {errors[0]}")
+
+    reduce_started = time.time()
+    usage = {}
+    levels = 0
+    while True:
+        levels += 1
+        groups = _groups(partials, max_tokens) if len(partials) > 1 else [partials]
+        if len(groups) == 1:
+            result = await chat_json(reduce_prompt(groups[0]), "reduce", usage, _serialize(groups[0]))
+            break
+        partials = list(await asyncio.gather(*[chat_json(reduce_prompt(g), "reduce", usage, _serialize(g))
+                                               for g in groups]))
+    report["reduce"] = {"seconds": round(time.time() - reduce_started, 2), "levels": levels, **usage}
+    report["seconds"] = round(time.time() - started, 2)
+    metrics.observe(f"llm.{name}.reduce", time.time() - reduce_started)
+    print_info(f"LLM {name} map-reduce: {json.dumps(report, ensure_ascii=False)}")
+    return result, report
@@ -0,0 +1,423 @@
+"""Related-articles similarity index.
+
+Every article is reduced to a compact hashed TF-IDF vector (CJK bigrams + latin
+words hashed into `dim` signed buckets, L2-normalized, float16) kept in a NumPy
+memmap next to small per-row feed/time columns and a 128-bit random-projection
+signature. Queries are blocked by feed and/or a publish-time window; small blocks
+are scanned exactly, large ones are pre-filtered by Hamming distance on the
+signatures and only the closest few hundred are re-ranked by cosine, so a lookup
+stays in the millisecond range even with a million rows.
+
+Files under `{cache.dir}/related/`:
+  rows.txt      "article_id<TAB>feed_id" per row (row order; source of truth for the row count)
+  vectors.f16   float16 [capacity, dim]
+  times.i64     publish time per row
+  feeds.i32     feed index per row
+  sig{i}.u64    random-projection signature, one file per 64-bit word (contiguous for fast XOR)
+  df.npy        document frequency per bucket (for IDF), plus the document count
+  .lock         inter-process write lock
+
+Several processes write the index (API workers indexing on demand, the insights
+queue, the backfill). Writes are serialized with an flock on `.lock`; the writer
+reloads rows and document frequencies under the lock, writes the row data and only
+then appends the rows.txt line, so readers never see a row without its vector.
+Every query first picks up rows appended by other processes (rows.txt is read
+incrementally from the last offset).
+"""
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fcntl
+except ImportError:
+    # No inter-process locking on non-POSIX systems: keep a single writer process there.
+    fcntl = None
+
+from core.config import cfg
+from core.print import print_info, print_warning
+
+from .extractive import tokenize
+
+# Only the head of long articles is vectorized; titles count double.
+MAX_TEXT_CHARS = 4000
+SIG_BITS = 128
+# Blocks larger than this use the signature pre-filter instead of an exact scan.
+EXACT_SCAN_MAX = 50000
+
+
+def available() -> bool:
+    return np is not None and str(cfg.get("insights.related.enable", True)).lower() == "true"
+
+
+_POPCOUNT8 = None
+
+
+def _popcount(words: "np.ndarray") -> "np.ndarray":
+    """Set bits per element of a uint64 vector, as uint8."""
+    global _POPCOUNT8
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    if _POPCOUNT8 is None:
+        _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return _POPCOUNT8[words.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+
+def hashed_tf(title: str, text: str, dim: int) -> tuple["np.ndarray", "np.ndarray"]:
+    """Sparse signed, sublinear term frequencies: (bucket indices, values)."""
+    counts: dict[int, float] = {}
+    tokens = tokenize(title) * 2 + tokenize((text or "")[:MAX_TEXT_CHARS])
+    for token in tokens:
+        h = zlib.crc32(token.encode("utf-8"))
+        bucket = h % dim
+        counts[bucket] = counts.get(bucket, 0.0) + (1.0 if (h >> 31) & 1 else -1.0)
+    buckets = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    values = np.sign(values) * np.log1p(np.abs(values))
+    return buckets, values
+
+
+class RelatedIndex:
+    def __init__(self, path: str = None, dim: int = None):
+        self.path = path or os.path.join(cfg.get("cache.dir", "./data/cache"), "related")
+        self.dim = int(dim or cfg.get("insights.related.dim", 256) or 256)
+        self.window_days = int(cfg.get("insights.related.window_days", 365) or 0)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._vectors = None
+        self._times = None
+        self._feeds = None
+        self._sigs = None
+        # Fixed seed: signatures must stay comparable across restarts.
+        self._projection = np.random.default_rng(20240601).standard_normal((self.dim, SIG_BITS)).astype(np.float32) \
+            if np is not None else None
+        self._rows: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._feed_ids: dict[str, int] = {}
+        self._feed_names: list[str] = []
+        self._rows_bytes = 0
+        self._df = None
+        self._df_stamp = None
+        self._docs = 0
+        self._dirty = 0
+        self._lock_file = None
+        self._lock_depth = 0
+
+    # ---------------------------------------------------------------- storage
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open(self, capacity: int) -> None:
+        def mm(name, dtype, shape):
+            filename = self._file(name)
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            with open(filename, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            return np.memmap(filename, dtype=dtype, mode="r+", shape=shape)
+
+        self._vectors = mm("vectors.f16", np.float16, (capacity, self.dim))
+        self._times = mm("times.i64", np.int64, (capacity,))
+        self._feeds = mm("feeds.i32", np.int32, (capacity,))
+        self._sigs = [mm(f"sig{i}.u64", np.uint64, (capacity,)) for i in range(SIG_BITS // 64)]
+
+    def _load(self) -> None:
+        if self._loaded:
+            self._refresh()
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self._read_rows()
+        self._load_df()
+        self._open(max(1024, self._capacity_on_disk(), len(self._ids)))
+        self._loaded = True
+        if self._ids:
+            print_info(f"相关文章索引已加载: {len(self._ids)}篇")
+
+    def _capacity_on_disk(self) -> int:
+        vectors = self._file("vectors.f16")
+        return os.path.getsize(vectors) // (self.dim * 2) if os.path.exists(vectors) else 0
+
+    def _read_rows(self) -> None:
+        """Read rows appended to rows.txt since the last call (complete lines only)."""
+        try:
+            with open(self._file("rows.txt"), "rb") as f:
+                f.seek(self._rows_bytes)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8").splitlines():
+            article_id, _, feed_id = line.partition("\t")
+            self._rows[article_id] = len(self._ids)
+            self._ids.append(article_id)
+            self._feed_index(feed_id)
+        self._rows_bytes += end
+
+    def _refresh(self) -> None:
+        """Pick up rows (and a grown capacity) written by other processes."""
+        self._read_rows()
+        if len(self._ids) > self._vectors.shape[0]:
+            self._reopen(self._capacity_on_disk())
+
+    def _df_file_stamp(self):
+        try:
+            st = os.stat(self._file("df.npy"))
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def _load_df(self) -> None:
+        self._df = None
+        try:
+            stats = np.load(self._file("df.npy"))
+            if stats.shape[0] == self.dim + 1:
+                self._df, self._docs = stats[:-1].astype(np.float64), int(stats[-1])
+        except (FileNotFoundError, ValueError):
+            pass
+        if self._df is None:
+            self._df, self._docs = np.zeros(self.dim, dtype=np.float64), 0
+        self._df_stamp = self._df_file_stamp()
+
+    def _save_df(self) -> None:
+        tmp = self._file("df.tmp.npy")
+        np.save(tmp, np.append(self._df, self._docs))
+        os.replace(tmp, self._file("df.npy"))
+        self._df_stamp = self._df_file_stamp()
+
+    @contextmanager
+    def writing(self):
+        """Hold the inter-process write lock (re-entrant; wrap a batch of add_tf calls to lock once)."""
+        with self._lock:
+            self._load()
+            if self._lock_depth == 0:
+                if fcntl is not None:
+                    self._lock_file = open(self._file(".lock"), "a")
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                # Another process may have appended rows or updated the document frequencies.
+                self._refresh()
+                if self._df_file_stamp() != self._df_stamp:
+                    self._load_df()
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    try:
+                        self._save_df()
+                    finally:
+                        if self._lock_file is not None:
+                            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                            self._lock_file.close()
+                            self._lock_file = None
+
+    def _feed_index(self, feed_id: str) -> int:
+        if feed_id not in self._feed_ids:
+            self._feed_ids[feed_id] = len(self._feed_names)
+            self._feed_names.append(feed_id)
+        return self._feed_ids[feed_id]
+
+    def _reopen(self, capacity: int) -> None:
+        for m in (self._vectors, self._times, self._feeds, *self._sigs):
+            m.flush()
+        self._vectors = self._times = self._feeds = self._sigs = None
+        self._open(capacity)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        self._reopen(max(needed, capacity * 2, self._capacity_on_disk()))
+
+    def flush(self) -> None:
+        """Sync the memmaps to disk (document frequencies are saved when the write lock is released)."""
+        with self._lock:
+            if not self._loaded:
+                return
+            for m in (self._vectors, self._times, self._feeds, *self._sigs):
+                m.flush()
+            self._dirty = 0
+
+    # ---------------------------------------------------------------- writes
+    def add(self, article_id: str, feed_id: str, publish_time: int, title: str, text: str) -> None:
+        """Add or replace one article (called on ingest / content change)."""
+        buckets, values = hashed_tf(title, text, self.dim)
+        self.add_tf(article_id, feed_id, publish_time, buckets, values)
+
+    def add_tf(self, article_id: str, feed_id: str, publish_time: int, buckets, values) -> None:
+        if len(buckets) == 0:
+            return
+        with self.writing():
+            row = self._rows.get(article_id)
+            if row is None:
+                self._df[buckets] += 1
+                self._docs += 1
+            idf = np.log((1 + self._docs) / (1 + self._df[buckets])) + 1
+            weights = values * idf
+            norm = float(np.linalg.norm(weights))
+            if norm == 0:
+                return
+            vector = np.zeros(self.dim, dtype=np.float32)
+            vector[buckets] = weights / norm
+            feed_id = str(feed_id or "")
+            new = row is None
+            if new:
+                row = len(self._ids)
+                self._grow(row + 1)
+            self._vectors[row] = vector
+            self._times[row] = int(publish_time or 0)
+            self._feeds[row] = self._feed_index(feed_id)
+            for sig, word in zip(self._sigs, np.packbits(vector @ self._projection > 0).view(np.uint64)):
+                sig[row] = word
+            if new:
+                # The rows.txt line commits the row for readers in other processes.
+                line = f"{article_id}\t{feed_id}\n".encode("utf-8")
+                with open(self._file("rows.txt"), "ab") as f:
+                    f.write(line)
+                self._rows[article_id] = row
+                self._ids.append(article_id)
+                self._rows_bytes += len(line)
+            self._dirty += 1
+            if self._dirty >= 100:
+                self.flush()
+
+    # ---------------------------------------------------------------- queries
+    def __contains__(self, article_id: str) -> bool:
+        with self._lock:
+            self._load()
+            return article_id in self._rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._ids)
+
+    def read(self, start: int, stop: int) -> tuple[list[str], "np.ndarray", list[str], "np.ndarray"]:
+        """Rows [start, stop) in insertion order: (article ids, float32 vectors, feed ids, publish times)."""
+        with self._lock:
+            self._load()
+            stop = min(stop, len(self._ids))
+            if start >= stop:
+                return [], np.zeros((0, self.dim), dtype=np.float32), [], np.zeros(0, dtype=np.int64)
+            feeds = [self._feed_names[i] for i in self._feeds[start:stop]]
+            return (self._ids[start:stop], self._vectors[start:stop].astype(np.float32), feeds,
+                    np.array(self._times[start:stop]))
+
+    def vectors(self, article_ids: list[str]) -> "np.ndarray":
+        """float32 vectors for the given articles (zero rows for articles not in the index)."""
+        with self._lock:
+            self._load()
+            out = np.zeros((len(article_ids), self.dim), dtype=np.float32)
+            for i, article_id in enumerate(article_ids):
+                row = self._rows.get(article_id)
+                if row is not None:
+                    out[i] = self._vectors[row]
+            return out
+
+    def search(self, article_id: str, k: int = 10, same_feed: bool = False, days: int = None,
+               rerank: int = 400) -> list[tuple[str, float]]:
+        """Top-k cosine neighbours of an indexed article, blocked by feed and publish-time window."""
+        with self._lock:
+            self._load()
+            row = self._rows.get(article_id)
+            if row is None:
+                return []
+            count = len(self._ids)
+            vectors, times, feeds, sigs = self._vectors, self._times, self._feeds, self._sigs
+        query = vectors[row].astype(np.float32)
+        days = self.window_days if days is None else days
+        mask = None
+        if same_feed:
+            mask = feeds[:count] == feeds[row]
+        if days:
+            window = (times[:count] >= times[row] - days * 86400) & (times[:count] <= times[row] + days * 86400)
+            mask = window if mask is None else mask & window
+        if mask is None:
+            mask = np.ones(count, dtype=bool)
+        mask[row] = False
+        selected = int(np.count_nonzero(mask))
+        if not selected:
+            return []
+        keep = max(rerank, k * 20)
+        if selected <= EXACT_SCAN_MAX or selected <= keep:
+            candidates = np.flatnonzero(mask)
+        else:
+            # Hamming distance on signatures approximates the angle; only the closest
+            # `keep` rows (cut-off found with a histogram, no full sort) are re-ranked.
+            distance = np.zeros(count, dtype=np.uint8)
+            for sig in sigs:
+                distance += _popcount(sig[:count] ^ sig[row])
+            np.putmask(distance, ~mask, 255)
+            cutoff = int(np.searchsorted(np.cumsum(np.bincount(distance, minlength=256)), keep))
+            candidates = np.flatnonzero(distance <= cutoff)
+            if len(candidates) > keep * 4:
+                candidates = candidates[np.argpartition(distance[candidates], keep - 1)[:keep]]
+        scores = vectors[candidates].astype(np.float32) @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[candidates[i]], float(scores[i])) for i in top if scores[i] > 0]
+
+
+# 进程内共享
+Related = RelatedIndex()
+
+
+def index_article(article, parsed=None) -> None:
+    """Best-effort incremental update for one article."""
+    if not available():
+        return
+    try:
+        if parsed is None:
+            from .extract import parse_article
+            parsed = parse_article(article.content)
+        text = parsed.text or (article.description or "")
+        Related.add(article.id, article.mp_id, article.publish_time, article.title or "", text)
+    except Exception as e:
+        print_warning(f"更新相关文章索引失败({article.id}): {e}")
+
+
+def related_articles(session, article_id: str, k: int = 10, same_feed: bool = False) -> list[dict[str, Any]]:
+    """Related articles for the API: indexes the article on demand, drops deleted rows."""
+    if not available() or k <= 0:
+        return []
+    from core.models.article import Article
+    from core.models.base import DATA_STATUS
+
+    if article_id not in Related:
+        article = session.query(Article).filter(Article.id == article_id).first()
+        if article is None:
+            return []
+        index_article(article)
+    hits = Related.search(article_id, k=k * 2, same_feed=same_feed)
+    if not hits:
+        return []
+    rows = {
+        a.id: a
+        for a in session.query(Article.id, Article.title, Article.mp_id, Article.publish_time, Article.pic_url)
+        .filter(Article.id.in_([h[0] for h in hits]), Article.status != DATA_STATUS.DELETED)
+        .all()
+    }
+    items: list[dict[str, Any]] = []
+    for hit_id, score in hits:
+        a = rows.get(hit_id)
+        if a is None:
+            continue
+        items.append({
+            "id": str(a.id),
+            "title": a.title or "",
+            "mp_id": a.mp_id or "",
+            "publish_time": int(a.publish_time or 0),
+            "pic_url": a.pic_url or "",
+            "score": round(score, 4),
+        })
+        if len(items) >= k:
+            break
+    return items
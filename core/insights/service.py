@@ -1,3 +1,4 @@
+import html
 import json
 from datetime import datetime
 from typing import Any
@@ -8,9 +9,18 @@ from core.db import DB
 from core.models.article import Article
 from core.models.article_insight import ArticleInsight
 from core.print import print_error, print_info
+from core.queue.registry import register_task
 
-from .extract import compute_content_hash, extract_headings, extract_summary, html_to_text
+from . import extractive, mapreduce, related
+from .extract import compute_content_hash, parse_article
 
+# Prompt versions are part of the LLM result cache key; bump when a prompt changes.
+KEY_POINTS_PROMPT_VERSION = "key_points.v1"
+BREAKDOWN_PROMPT_VERSION = "breakdown.v1"
+
+# key_points_json["source"]: "local" (extractive, no LLM) or "llm".
+KEY_POINTS_LOCAL = "local"
+KEY_POINTS_LLM = "llm"
 
 class InsightsService:
     def __init__(self):
@@ -19,25 +29,9 @@ class InsightsService:
 
     def ensure_cached(self, article_id: str) -> None:
         """Best-effort precompute & cache insights for better UX."""
-        import asyncio
-
-        def _run_coro(coro):
-            try:
-                loop = asyncio.get_running_loop()
-                if loop.is_running():
-                    loop.create_task(coro)
-                    return None
-            except RuntimeError:
-                pass
-
-            loop = asyncio.new_event_loop()
-            try:
-                return loop.run_until_complete(coro)
-            finally:
-                try:
-                    loop.close()
-                except Exception:
-                    pass
+        # LLM steps run on this thread's reusable event loop; HTTP calls go through
+        # the shared pooled client (core.llm.client), so nothing is dropped or re-handshaked.
+        from core.llm.client import LLM
 
         session = DB.get_session()
         article = session.query(Article).filter(Article.id == article_id).first()
@@ -50,9 +44,9 @@ class InsightsService:
                 url = (article.url or "").strip()
                 if url and "mp.weixin.qq.com" in url:
                     try:
-                        from driver.wxarticle import WXArticleFetcher
+                        from driver.article_extract import ArticleExtractor
 
-                        info = WXArticleFetcher().get_article_content(url)
+                        info = ArticleExtractor.extract(url)
                         content = (info.get("content") or "").strip()
                         changed = False
                         if content:
@@ -83,10 +77,8 @@ class InsightsService:
         except Exception:
             pass
 
-        # Important: when we just fetched content via Playwright (sync),
-        # some environments may have an active asyncio loop that makes `_run_coro`
-        # fall back to `create_task()` and never persist results (key points/breakdown).
-        # Re-schedule a second pass so LLM steps run after the fetch stage.
+        # When we just fetched content via Playwright (sync), re-schedule a second pass
+        # so the LLM steps run as their own queue task after the fetch stage.
         if fetched_content:
             try:
                 from core.queue import TaskQueue
@@ -99,14 +91,14 @@ class InsightsService:
         # Key points: can be generated from digest/summary even without content.
         if bool(cfg.get("insights.auto_key_points", False)):
             try:
-                _run_coro(self.generate_key_points(article_id))
+                LLM.run(self.generate_key_points(article_id))
             except Exception:
                 pass
 
         # Breakdown: requires content + LLM configured
         if bool(cfg.get("insights.auto_llm_breakdown", False)):
             try:
-                _run_coro(self.generate_llm_breakdown(article_id))
+                LLM.run(self.generate_llm_breakdown(article_id))
             except Exception:
                 pass
 
@@ -150,7 +142,7 @@ class InsightsService:
         for (aid,) in ids:
             try:
                 if TaskQueue:
-                    TaskQueue.add_task(self.ensure_cached, str(aid))
+                    TaskQueue.add_task(self.ensure_cached, str(aid), _priority="bulk")
                 else:
                     self.ensure_cached(str(aid))
             except Exception:
@@ -160,58 +152,49 @@ class InsightsService:
         """Backfill digest/cover from the public article page (no WeChat backend auth).
 
         This is used when we only have url + title, but missing `description`/`pic_url`.
+        Goes through the shared hydrator (pooled client, "wx" rate limiter, negative cache).
         """
         try:
-            url = (article.url or "").strip()
-            if not url or "mp.weixin.qq.com" not in url:
-                return False
-            # Only hydrate when digest missing (cover may already exist)
-            if (article.description or "").strip():
-                return False
-
-            import requests
-            from bs4 import BeautifulSoup
-
-            headers = {
-                "User-Agent": cfg.get("user_agent", ""),
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                "Connection": "keep-alive",
-            }
-            resp = requests.get(url, headers=headers, timeout=float(cfg.get("llm.timeout", 20)))
-            if resp.status_code != 200 or not resp.text:
-                return False
-
-            soup = BeautifulSoup(resp.text, "lxml")
-            desc = ""
-            for key in ("og:description", "twitter:description"):
-                meta = soup.find("meta", attrs={"property": key}) or soup.find("meta", attrs={"name": key})
-                if meta and meta.get("content"):
-                    desc = (meta.get("content") or "").strip()
-                    if desc:
-                        break
-
-            image = ""
-            for key in ("twitter:image", "og:image"):
-                meta = soup.find("meta", attrs={"property": key}) or soup.find("meta", attrs={"name": key})
-                if meta and meta.get("content"):
-                    image = (meta.get("content") or "").strip()
-                    if image:
-                        break
-
-            changed = False
-            if desc and not (article.description or "").strip():
-                article.description = desc
-                changed = True
-            if image and not (article.pic_url or "").strip():
-                article.pic_url = image
-                changed = True
-            return changed
+            from .hydrate import Hydrator
+
+            return Hydrator.hydrate(article)
         except Exception:
             return False
 
-    def _fallback_key_points(self, insight: ArticleInsight) -> dict[str, Any]:
-        """No-LLM fallback: derive key points from headings (or summary)."""
+    @staticmethod
+    def llm_configured() -> bool:
+        return bool(
+            cfg.get("llm.siliconflow.api_key", "")
+            and cfg.get("llm.siliconflow.api_url", "")
+            and cfg.get("llm.siliconflow.model", "")
+        )
+
+    def needs_key_points(self, insight: ArticleInsight) -> bool:
+        """Key points missing, or only the local tier while an LLM is available (upgrade on open)."""
+        raw = getattr(insight, "key_points_json", None) or ""
+        if not raw:
+            return True
+        if not self.llm_configured():
+            return False
+        try:
+            return (json.loads(raw) or {}).get("source") == KEY_POINTS_LOCAL
+        except Exception:
+            return True
+
+    def _fallback_key_points(self, insight: ArticleInsight, article: Article | None = None) -> dict[str, Any]:
+        """No-LLM fallback: extractive TF-IDF/TextRank key points, else headings (or summary)."""
+        if article is not None and extractive.available():
+            try:
+                text = article.content or ""
+                if not text.strip() and (article.description or "").strip():
+                    text = f"<p>{html.escape(article.description)}</p>"
+                parsed = parse_article(text)
+                data = extractive.summarize(parsed, title=article.title or "")
+                if data.get("points"):
+                    return {**data, "source": KEY_POINTS_LOCAL}
+            except Exception as e:
+                print_error(f"Extractive key points failed: {e}")
+
         headings: list[dict[str, Any]] = []
         try:
             headings = json.loads(insight.headings_json) if insight.headings_json else []
@@ -248,7 +231,56 @@ class InsightsService:
         if highlight and not points:
             points = [highlight]
 
-        return {"highlight": highlight, "points": points}
+        return {"highlight": highlight, "points": points, "source": KEY_POINTS_LOCAL}
+
+    async def _map_reduce_json(
+        self,
+        *,
+        name: str,
+        article: Article,
+        insight: ArticleInsight,
+        content_text: str,
+        system: str,
+        map_task: str,
+        reduce_task: str,
+        prompt_version: str,
+        model: str,
+        api_url: str,
+        api_key: str,
+    ) -> Any:
+        """Chunk a long article, run `map_task` on every chunk concurrently and merge with `reduce_task`."""
+        from core.llm.siliconflow import siliconflow_chat_json
+
+        timeout = float(cfg.get("llm.timeout", 60))
+        chunks = mapreduce.split_chunks(parse_article(article.content), content_text)
+
+        def messages(user: dict[str, Any]) -> list[dict[str, Any]]:
+            user = {"title": article.title or "", "summary_hint": insight.summary or "", **user}
+            return [
+                {"role": "system", "content": system},
+                {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+            ]
+
+        async def chat_json(msgs: list[dict[str, Any]], stage: str, usage: dict[str, int], source: str) -> Any:
+            return await siliconflow_chat_json(
+                model=model,
+                api_url=api_url,
+                api_key=api_key,
+                messages=msgs,
+                timeout=timeout,
+                prompt_version=f"{prompt_version}.{stage}",
+                cache_text=source,
+                usage=usage,
+            )
+
+        data, _report = await mapreduce.map_reduce(
+            name=name,
+            chunks=chunks,
+            chat_json=chat_json,
+            map_prompt=lambda i, total, chunk: messages({"part": f"{i + 1}/{total}", "task": map_task, "content": chunk}),
+            reduce_prompt=lambda parts: messages({"task": reduce_task, "parts": parts}),
+        )
+        return data
 
     def get_or_create_basic(self, article_id: str) -> ArticleInsight | None:
         session = DB.get_session()
@@ -280,11 +312,13 @@ class InsightsService:
             should_refresh = True
 
         if should_refresh:
+            # One parse serves summary and headings; memoized for the LLM steps that follow.
+            parsed = parse_article(article.content)
             max_len = int(cfg.get("insights.summary_max_len", 200))
-            summary = extract_summary(article.description, article.content, max_len=max_len)
+            summary = parsed.summary(article.description, max_len=max_len)
             if not (summary or "").strip():
                 summary = (article.title or "").strip()[:max_len]
-            headings = extract_headings(article.content, levels=(1, 2), max_items=int(cfg.get("insights.headings_max_items", 20)))
+            headings = parsed.heading_items(levels=(1, 2), max_items=int(cfg.get("insights.headings_max_items", 20)))
             now = datetime.now()
             if summary and not (article.description or "").strip():
                 article.description = summary
@@ -297,6 +331,11 @@ class InsightsService:
             insight.updated_at = now
             insight.summary = summary
             insight.headings_json = json.dumps(headings, ensure_ascii=False)
+            if bool(cfg.get("insights.local_key_points", True)) and extractive.available():
+                # Instant no-LLM tier; LLM points replace it when the article is opened.
+                local = self._fallback_key_points(insight, article)
+                if local.get("points"):
+                    insight.key_points_json = json.dumps(local, ensure_ascii=False)
             insight.content_hash = content_hash
             insight.status = 1
             insight.error = ""
@@ -306,6 +345,7 @@ class InsightsService:
             session.add(insight)
             session.commit()
             session.refresh(insight)
+            related.index_article(article, parsed)
 
         # Late backfill: ensure list preview has content even when digest is missing.
         try:
@@ -330,7 +370,12 @@ class InsightsService:
             return None
 
         # Cache hit: avoid re-running when content unchanged.
-        if not force and getattr(insight, "key_points_json", None) and (insight.content_hash == compute_content_hash(article.description, article.content)):
+        # Local (extractive) points are upgraded by the LLM when one is configured.
+        if (
+            not force
+            and not self.needs_key_points(insight)
+            and insight.content_hash == compute_content_hash(article.description, article.content)
+        ):
             return insight
 
         # If LLM not configured, still persist a deterministic fallback so UI has data.
@@ -338,7 +383,7 @@ class InsightsService:
         api_url = cfg.get("llm.siliconflow.api_url", "")
         model = cfg.get("llm.siliconflow.model", "")
         if not (api_key and api_url and model):
-            data = self._fallback_key_points(insight)
+            data = self._fallback_key_points(insight, article)
             insight.key_points_json = json.dumps(data, ensure_ascii=False)
             insight.updated_at = datetime.now()
             session.add(insight)
@@ -348,7 +393,7 @@ class InsightsService:
 
         # Prefer full content; fall back to digest.
         # If both are missing, avoid hallucinating: store a deterministic, title-only fallback.
-        content_text = html_to_text(article.content) or (article.description or "")
+        content_text = parse_article(article.content).text or (article.description or "")
         if not (content_text or "").strip():
             title = (article.title or "").strip()
             highlight = title[:80]
@@ -356,7 +401,9 @@ class InsightsService:
             if highlight:
                 points.append(highlight)
             points.append("未获取摘要/正文，建议先回填摘要或抓取正文后再生成")
-            insight.key_points_json = json.dumps({"highlight": highlight, "points": points}, ensure_ascii=False)
+            insight.key_points_json = json.dumps(
+                {"highlight": highlight, "points": points, "source": KEY_POINTS_LOCAL}, ensure_ascii=False
+            )
             insight.updated_at = datetime.now()
             session.add(insight)
             session.commit()
@@ -364,7 +411,9 @@ class InsightsService:
             return insight
         max_chars = int(cfg.get("llm.max_chars", 24000))
         clipped = content_text[:max_chars]
-        if len(content_text) > max_chars:
+        # Long articles go through map-reduce instead of losing everything past max_chars.
+        long_text = len(content_text) > max_chars and mapreduce.enabled()
+        if len(content_text) > max_chars and not long_text:
             print_info(f"LLM input truncated: {len(content_text)} -> {len(clipped)} chars")
 
         from core.llm.siliconflow import siliconflow_chat_json
@@ -381,31 +430,50 @@ class InsightsService:
         }
 
         try:
-            data = await siliconflow_chat_json(
-                model=model,
-                api_url=api_url,
-                api_key=api_key,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
-                ],
-                timeout=float(cfg.get("llm.timeout", 60)),
-            )
+            if long_text:
+                data = await self._map_reduce_json(
+                    name="key_points",
+                    article=article,
+                    insight=insight,
+                    content_text=content_text,
+                    system=system,
+                    map_task="这是长文的一部分，提取本部分 2-5 条关键信息点(points)，并给出本部分最重要的一句高亮(highlight)。中文简洁。",
+                    reduce_task="parts 为长文各部分提取的信息点，合并去重为 3-8 条覆盖全文的关键信息点(points)，并给出全文最重要的一句高亮(highlight)。中文简洁。",
+                    prompt_version=KEY_POINTS_PROMPT_VERSION,
+                    model=model,
+                    api_url=api_url,
+                    api_key=api_key,
+                )
+            else:
+                data = await siliconflow_chat_json(
+                    model=model,
+                    api_url=api_url,
+                    api_key=api_key,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+                    ],
+                    timeout=float(cfg.get("llm.timeout", 60)),
+                    prompt_version=KEY_POINTS_PROMPT_VERSION,
+                    cache_text=clipped,
+                )
             if not isinstance(data, dict):
                 raise ValueError("Invalid LLM response: not a JSON object")
             highlight = (data.get("highlight") or "").strip()
             points = data.get("points") if isinstance(data.get("points"), list) else []
             points = [str(x).strip() for x in points if str(x).strip()]
             if not highlight or not points:
-                fallback = self._fallback_key_points(insight)
+                fallback = self._fallback_key_points(insight, article)
                 highlight = highlight or fallback.get("highlight", "")
                 points = points or fallback.get("points", [])
-            insight.key_points_json = json.dumps({"highlight": highlight, "points": points}, ensure_ascii=False)
+            insight.key_points_json = json.dumps(
+                {"highlight": highlight, "points": points, "source": KEY_POINTS_LLM}, ensure_ascii=False
+            )
             insight.error = ""
         except Exception as e:
             print_error(f"LLM key points failed: {e}")
             # Persist fallback to keep UX stable.
-            data = self._fallback_key_points(insight)
+            data = self._fallback_key_points(insight, article)
             insight.key_points_json = json.dumps(data, ensure_ascii=False)
             insight.error = str(e)
 
@@ -448,7 +516,7 @@ class InsightsService:
             session.commit()
             return insight
 
-        content_text = html_to_text(article.content)
+        content_text = parse_article(article.content).text
         if not content_text:
             insight.status = 9
             insight.error = "Article content is empty; cannot run LLM breakdown."
@@ -461,7 +529,9 @@ class InsightsService:
 
         max_chars = int(cfg.get("llm.max_chars", 24000))
         clipped = content_text[:max_chars]
-        if len(content_text) > max_chars:
+        # Long articles go through map-reduce instead of losing everything past max_chars.
+        long_text = len(content_text) > max_chars and mapreduce.enabled()
+        if len(content_text) > max_chars and not long_text:
             print_info(f"LLM input truncated: {len(content_text)} -> {len(clipped)} chars")
 
         system = (
@@ -476,16 +546,33 @@ class InsightsService:
         }
 
         try:
-            data = await siliconflow_chat_json(
-                model=model,
-                api_url=api_url,
-                api_key=api_key,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
-                ],
-                timeout=float(cfg.get("llm.timeout", 60)),
-            )
+            if long_text:
+                data = await self._map_reduce_json(
+                    name="breakdown",
+                    article=article,
+                    insight=insight,
+                    content_text=content_text,
+                    system=system,
+                    map_task="这是长文的一部分，将本部分按标题层级拆解为最多三级大纲。每个节点给出 1-3 条要点 bullets。保持中文简洁。",
+                    reduce_task="parts 为长文各部分按顺序拆解出的大纲，合并为覆盖全文的最多三级大纲：保持原文顺序，合并重复/相近的节点，每个节点 1-3 条要点 bullets。保持中文简洁。",
+                    prompt_version=BREAKDOWN_PROMPT_VERSION,
+                    model=model,
+                    api_url=api_url,
+                    api_key=api_key,
+                )
+            else:
+                data = await siliconflow_chat_json(
+                    model=model,
+                    api_url=api_url,
+                    api_key=api_key,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+                    ],
+                    timeout=float(cfg.get("llm.timeout", 60)),
+                    prompt_version=BREAKDOWN_PROMPT_VERSION,
+                    cache_text=clipped,
+                )
             insight.llm_breakdown_json = json.dumps(data, ensure_ascii=False)
             insight.status = 2
             insight.error = ""
@@ -501,3 +588,9 @@ class InsightsService:
         session.commit()
         session.refresh(insight)
         return insight
+
+
+# 注册为可持久化任务(数据库队列只保存任务名与文章ID，执行时以新实例调用)
+register_task("insights.ensure_cached")(InsightsService.ensure_cached)
+register_task("insights.get_or_create_basic")(InsightsService.get_or_create_basic)
+register_task("insights.ensure_mp_recent_cached")(InsightsService.ensure_mp_recent_cached)
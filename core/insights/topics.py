@@ -0,0 +1,340 @@
+"""Cross-feed topic clustering and trending detection (early warning).
+
+Reuses the related-articles index vectors: every cycle reads the rows appended
+since the last cursor in mini-batches and assigns them to the nearest topic
+centroid (cosine >= `threshold`); rows that match nothing seed new topics,
+greedily within the batch. Centroids are kept as running vector sums, so a cycle
+only touches the new rows — there is no full re-clustering — and it stops once
+`cpu_budget` seconds of this thread's CPU time are spent (the cursor resumes next cycle).
+
+Topics are scored by velocity (members published per hour over the last
+`velocity_hours`) weighted by how many distinct feeds cover them; a topic is
+"emerging" once at least `min_feeds` feeds report it. Topics whose newest member
+is older than `window_hours` are dropped.
+
+State lives under `{cache.dir}/topics/` (state.json + centroids.npy). Rows that
+the index replaces in place (content changes) keep their original assignment.
+Several processes share that state (the leader's scheduler, `POST /topics/cycle`
+in any API worker): cycles run under an exclusive `flock` on `.lock` and start
+from the state on disk, and readers reload whenever state.json changes.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fcntl
+except ImportError:
+    # No inter-process locking on non-POSIX systems: keep a single writer process there.
+    fcntl = None
+
+from core.config import cfg
+from core.print import print_info, print_warning
+
+from .related import Related, RelatedIndex
+
+
+def available() -> bool:
+    from . import related
+
+    return related.available() and str(cfg.get("insights.topics.enable", True)).lower() == "true"
+
+
+class TopicClusterer:
+    def __init__(self, index: RelatedIndex = None, path: str = None):
+        self.index = index if index is not None else Related
+        self.path = path or os.path.join(cfg.get("cache.dir", "./data/cache"), "topics")
+        self.threshold = float(cfg.get("insights.topics.threshold", 0.45) or 0.45)
+        self.window = int(float(cfg.get("insights.topics.window_hours", 72) or 72) * 3600)
+        self.velocity_window = int(float(cfg.get("insights.topics.velocity_hours", 6) or 6) * 3600)
+        self.batch_size = max(1, int(cfg.get("insights.topics.batch_size", 2000) or 2000))
+        self.cpu_budget = float(cfg.get("insights.topics.cpu_budget", 2.0) or 2.0)
+        self.min_feeds = max(1, int(cfg.get("insights.topics.min_feeds", 2) or 2))
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stamp = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.cursor = 0
+        self._next_id = 1
+        # Per topic: id, members [[article_id, feed_id, publish_time]], representative, created_at
+        self._topics: list[dict[str, Any]] = []
+        self._sums = np.zeros((0, self.index.dim), dtype=np.float32) if np is not None else None
+
+    # ---------------------------------------------------------------- storage
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _state_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self._file("state.json"))
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(".lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        """(Re)read the state when state.json changed since it was last read or written here."""
+        stamp = self._state_stamp()
+        if self._loaded and stamp == self._stamp:
+            return
+        self._loaded = True
+        self._stamp = stamp
+        self._reset()
+        try:
+            with open(self._file("state.json"), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            sums = np.load(self._file("centroids.npy"))
+            if state.get("dim") != self.index.dim or sums.shape[0] != len(state.get("topics", [])):
+                raise ValueError("state does not match the index")
+            self.cursor = int(state.get("cursor", 0))
+            self._next_id = int(state.get("next_id", 1))
+            self._topics = state.get("topics", [])
+            self._sums = sums.astype(np.float32)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print_warning(f"读取话题聚类状态失败，重新聚类: {e}")
+            self._reset()
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            np.save(self._file("centroids.tmp.npy"), self._sums)
+            os.replace(self._file("centroids.tmp.npy"), self._file("centroids.npy"))
+            tmp = self._file("state.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.index.dim, "cursor": self.cursor, "next_id": self._next_id,
+                           "topics": self._topics}, f, ensure_ascii=False)
+            os.replace(tmp, self._file("state.json"))
+            self._stamp = self._state_stamp()
+        except Exception as e:
+            print_warning(f"保存话题聚类状态失败: {e}")
+
+    def _refresh(self) -> None:
+        """Pick up cycles run by other processes (shared lock: never reads a half-written state)."""
+        if self._loaded and self._state_stamp() == self._stamp:
+            return
+        with self._file_lock(exclusive=False):
+            self._load()
+
+    # ---------------------------------------------------------------- clustering
+    def _expire(self, now: int) -> None:
+        cutoff = now - self.window
+        keep = [i for i, t in enumerate(self._topics) if max(m[2] for m in t["members"]) >= cutoff]
+        if len(keep) < len(self._topics):
+            self._topics = [self._topics[i] for i in keep]
+            self._sums = self._sums[keep]
+
+    def _assign(self, ids: list[str], vectors: "np.ndarray", feeds: list[str], times: "np.ndarray",
+                now: int) -> set[int]:
+        """Mini-batch assignment; returns the indices of the topics that changed."""
+        touched: set[int] = set()
+        unmatched = np.arange(len(ids))
+        if len(self._topics):
+            norms = np.linalg.norm(self._sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            similarity = vectors @ (self._sums / norms).T
+            best = similarity.argmax(axis=1)
+            matched = similarity[np.arange(len(ids)), best] >= self.threshold
+            np.add.at(self._sums, best[matched], vectors[matched])
+            for i in np.flatnonzero(matched):
+                self._topics[best[i]]["members"].append([ids[i], feeds[i], int(times[i])])
+                touched.add(int(best[i]))
+            unmatched = np.flatnonzero(~matched)
+        # Leftovers are clustered greedily among the topics seeded by this batch.
+        seeds = np.zeros((len(unmatched), vectors.shape[1]), dtype=np.float32)
+        seed_norms = np.ones(len(unmatched), dtype=np.float32)
+        first_new = len(self._topics)
+        count = 0
+        for i in unmatched:
+            member = [ids[i], feeds[i], int(times[i])]
+            if count:
+                scores = (seeds[:count] @ vectors[i]) / seed_norms[:count]
+                j = int(scores.argmax())
+                if scores[j] >= self.threshold:
+                    seeds[j] += vectors[i]
+                    seed_norms[j] = max(float(np.linalg.norm(seeds[j])), 1e-6)
+                    self._topics[first_new + j]["members"].append(member)
+                    continue
+            seeds[count] = vectors[i]
+            seed_norms[count] = max(float(np.linalg.norm(vectors[i])), 1e-6)
+            count += 1
+            self._topics.append({"id": str(self._next_id), "members": [member], "representative": member[0],
+                                 "created_at": now})
+            self._next_id += 1
+        if count:
+            self._sums = np.vstack([self._sums, seeds[:count]])
+        touched.update(range(first_new, len(self._topics)))
+        return touched
+
+    def _update_representatives(self, touched: set[int]) -> None:
+        """Representative = the member closest to the centroid (only for multi-member topics)."""
+        for i in touched:
+            topic = self._topics[i]
+            if len(topic["members"]) < 2:
+                continue
+            vectors = self.index.vectors([m[0] for m in topic["members"]])
+            topic["representative"] = topic["members"][int((vectors @ self._sums[i]).argmax())][0]
+
+    def run_cycle(self, cpu_budget: float = None) -> dict[str, Any]:
+        """Consume new index rows until caught up or the CPU budget is spent."""
+        cpu_budget = self.cpu_budget if cpu_budget is None else cpu_budget
+        started = time.thread_time()
+        now = int(time.time())
+        processed = skipped = 0
+        with self._lock, self._file_lock(exclusive=True):
+            # Continue from the state on disk: another process may have run a cycle meanwhile.
+            self._load()
+            total = len(self.index)
+            if self.cursor > total:
+                # The index was rebuilt; start over.
+                self._reset()
+            self._expire(now)
+            touched: set[int] = set()
+            while self.cursor < total and time.thread_time() - started < cpu_budget:
+                ids, vectors, feeds, times = self.index.read(self.cursor, self.cursor + self.batch_size)
+                if not ids:
+                    break
+                self.cursor += len(ids)
+                # Backfilled history is skipped cheaply; only the window is clustered.
+                recent = np.flatnonzero((times >= now - self.window) & vectors.any(axis=1))
+                skipped += len(ids) - len(recent)
+                if len(recent):
+                    touched |= self._assign([ids[i] for i in recent], vectors[recent],
+                                            [feeds[i] for i in recent], times[recent], now)
+                processed += len(ids)
+            self._update_representatives(touched)
+            self._save()
+            report = {
+                "processed": processed,
+                "skipped": skipped,
+                "pending": max(0, total - self.cursor),
+                "topics": len(self._topics),
+                "cpu_seconds": round(time.thread_time() - started, 3),
+            }
+        if processed:
+            print_info(f"话题聚类: {json.dumps(report, ensure_ascii=False)}")
+        return report
+
+    # ---------------------------------------------------------------- scoring
+    def _score(self, topic: dict[str, Any], now: int) -> dict[str, Any]:
+        members = topic["members"]
+        hours = self.velocity_window / 3600
+        recent = sum(1 for m in members if m[2] >= now - self.velocity_window)
+        previous = sum(1 for m in members if now - 2 * self.velocity_window <= m[2] < now - self.velocity_window)
+        feeds = len({m[1] for m in members})
+        velocity = recent / hours
+        return {
+            "id": topic["id"],
+            "size": len(members),
+            "feeds": feeds,
+            "velocity": round(velocity, 3),
+            "acceleration": round((recent - previous) / hours, 3),
+            "score": round(velocity * math.log2(1 + feeds), 3),
+            "first_seen": min(m[2] for m in members),
+            "last_seen": max(m[2] for m in members),
+            "representative": topic["representative"],
+            "members": [m[0] for m in sorted(members, key=lambda m: -m[2])],
+            "feed_ids": sorted({m[1] for m in members}),
+        }
+
+    def trending(self, limit: int = 20, min_feeds: int = None, emerging: bool = True) -> list[dict[str, Any]]:
+        """Topics ordered by score; `emerging` keeps those covered by >= min_feeds feeds with recent members."""
+        min_feeds = self.min_feeds if min_feeds is None else min_feeds
+        now = int(time.time())
+        with self._lock:
+            self._refresh()
+            scored = [self._score(t, now) for t in self._topics]
+        if emerging:
+            scored = [t for t in scored if t["feeds"] >= min_feeds and t["velocity"] > 0]
+        scored.sort(key=lambda t: (t["score"], t["size"], t["last_seen"]), reverse=True)
+        return scored[:limit]
+
+    def get(self, topic_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            topic = next((t for t in self._topics if t["id"] == topic_id), None)
+            return self._score(topic, int(time.time())) if topic else None
+
+
+# 进程内共享
+Topics = TopicClusterer()
+
+
+def trending_topics(session, limit: int = 20, min_feeds: int = None, max_members: int = 10) -> list[dict[str, Any]]:
+    """Trending topics for the API/RSS, with titles and feed names filled in from the database."""
+    if not available():
+        return []
+    from core.models.article import Article
+    from core.models.base import DATA_STATUS
+    from core.models.feed import Feed
+
+    topics = Topics.trending(limit=limit, min_feeds=min_feeds)
+    if not topics:
+        return []
+    article_ids = {t["representative"] for t in topics}
+    for t in topics:
+        article_ids.update(t["members"][:max_members])
+    articles = {
+        a.id: a
+        for a in session.query(Article.id, Article.title, Article.url, Article.mp_id, Article.publish_time,
+                               Article.pic_url, Article.description)
+        .filter(Article.id.in_(list(article_ids)), Article.status != DATA_STATUS.DELETED)
+        .all()
+    }
+    feed_ids = {fid for t in topics for fid in t["feed_ids"]}
+    feeds = {f.id: f.mp_name or "" for f in session.query(Feed.id, Feed.mp_name).filter(Feed.id.in_(list(feed_ids))).all()}
+    items: list[dict[str, Any]] = []
+    for t in topics:
+        members = []
+        for article_id in t["members"]:
+            a = articles.get(article_id)
+            if a is None:
+                continue
+            members.append({
+                "id": str(a.id),
+                "title": a.title or "",
+                "url": a.url or "",
+                "mp_id": a.mp_id or "",
+                "mp_name": feeds.get(a.mp_id, ""),
+                "publish_time": int(a.publish_time or 0),
+            })
+            if len(members) >= max_members:
+                break
+        rep = articles.get(t["representative"])
+        if rep is None and not members:
+            continue
+        items.append({
+            **{k: v for k, v in t.items() if k not in ("members", "feed_ids", "representative")},
+            "title": (rep.title if rep else members[0]["title"]) or "",
+            "representative": {
+                "id": str(rep.id), "title": rep.title or "", "url": rep.url or "", "mp_id": rep.mp_id or "",
+                "pic_url": rep.pic_url or "", "description": rep.description or "",
+            } if rep else members[0],
+            "feed_names": [feeds.get(fid, "") for fid in t["feed_ids"] if feeds.get(fid)],
+            "articles": members,
+        })
+    return items
@@ -0,0 +1,155 @@
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from core.config import cfg
+from core.models.leader_lock import LeaderLock
+from core.print import print_success, print_warning
+
+
+class LeaderElection:
+    """基于数据库锁的主节点选举
+
+    uvicorn 多 worker 或多节点部署时每个进程都会创建定时调度器，
+    只有持有锁(leader_locks 表中 lease_until 未过期的记录)的实例执行定时任务。
+    主节点每 ttl/3 秒续约一次；进程退出或失联超过 ttl 秒后，其它实例在下次心跳时接管。
+    """
+
+    def __init__(self, name: str = "scheduler", ttl: int = None, db=None):
+        self.name = name
+        self.ttl = max(5, int(ttl or cfg.get("scheduler.leader.ttl", 30) or 30))
+        self.enabled = str(cfg.get("scheduler.leader.enable", True)).lower() == "true"
+        self.holder = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._db = db
+        self._leader = False
+        self._lease_until = 0.0
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from core.db import DB
+            self._db = DB
+        return self._db
+
+    def _session(self):
+        if not self._table_ready:
+            LeaderLock.__table__.create(bind=self.db.get_engine(), checkfirst=True)
+            self._table_ready = True
+        return self.db.get_session()
+
+    def try_acquire(self) -> bool:
+        """抢占或续约锁，返回当前是否为主节点"""
+        now = int(time.time())
+        lease_until = now + self.ttl
+        session = None
+        try:
+            session = self._session()
+            result = session.execute(
+                update(LeaderLock)
+                .where(and_(
+                    LeaderLock.name == self.name,
+                    or_(LeaderLock.holder == self.holder, LeaderLock.lease_until < now),
+                ))
+                .values(holder=self.holder, lease_until=lease_until, updated_at=datetime.now())
+            )
+            session.commit()
+            acquired = (result.rowcount or 0) > 0
+            if not acquired:
+                exists = session.query(LeaderLock.name).filter(LeaderLock.name == self.name).first() is not None
+                session.commit()
+                if not exists:
+                    try:
+                        session.add(LeaderLock(name=self.name, holder=self.holder, lease_until=lease_until,
+                                               updated_at=datetime.now()))
+                        session.commit()
+                        acquired = True
+                    except IntegrityError:
+                        # 其它实例同时插入，本次未抢到
+                        session.rollback()
+            self.last_error = None
+        except Exception as e:
+            if session is not None:
+                session.rollback()
+            self.last_error = str(e)
+            print_warning(f"主节点选举失败({self.name}): {e}")
+            # 数据库不可用时保留到本地租约到期为止，避免两个实例同时认为自己是主节点
+            acquired = self._leader and time.time() < self._lease_until
+            lease_until = self._lease_until
+        self._set_leader(acquired, lease_until)
+        return acquired
+
+    def _set_leader(self, leader: bool, lease_until: float) -> None:
+        with self._lock:
+            changed = leader != self._leader
+            self._leader = leader
+            self._lease_until = lease_until if leader else 0.0
+        if changed and leader:
+            print_success(f"当前实例成为{self.name}主节点: {self.holder}")
+        elif changed:
+            print_warning(f"当前实例不再是{self.name}主节点: {self.holder}")
+
+    def release(self) -> None:
+        """主动释放锁(进程退出时)，其它实例无需等待租约过期"""
+        self._stop.set()
+        if not self.enabled or not self._leader:
+            return
+        try:
+            session = self._session()
+            session.execute(
+                update(LeaderLock)
+                .where(and_(LeaderLock.name == self.name, LeaderLock.holder == self.holder))
+                .values(lease_until=0, updated_at=datetime.now())
+            )
+            session.commit()
+        except Exception:
+            pass
+        self._set_leader(False, 0)
+
+    def is_leader(self) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            return self._leader and time.time() < self._lease_until
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            self.try_acquire()
+
+    def start(self) -> None:
+        """立即参与一次选举并启动心跳线程(重复调用无副作用)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._heartbeat, name=f"leader-{self.name}", daemon=True)
+        self.try_acquire()
+        self._thread.start()
+        atexit.register(self.release)
+
+    def get_info(self) -> dict:
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "holder": self.holder,
+            "leader": self.is_leader(),
+            "lease_until": int(self._lease_until),
+            "ttl": self.ttl,
+            "error": self.last_error,
+        }
+
+
+# 定时调度器共用的主节点选举
+Leader = LeaderElection("scheduler")
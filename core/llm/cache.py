@@ -0,0 +1,165 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Optional
+
+from sqlalchemy import func
+
+from core.config import cfg
+from core.metrics import metrics
+from core.models.llm_cache import LLMCacheEntry
+from core.print import print_info, print_warning
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本(合并空白)，排版差异不影响缓存命中"""
+    return re.sub(r"\s+", " ", str(text or "")).strip()
+
+
+class LLMCache:
+    """持久化的 LLM 结果缓存(llm_cache 表)
+
+    键为 (规范化后的文章正文哈希、提示词版本、模型、参数) 的哈希，保存模型原始返回内容，
+    同样的正文(转载/重复文章、强制刷新)再次生成时直接复用，不再调用模型。
+    超过 llm.cache.ttl_days 天的记录视为过期；总大小超过 llm.cache.max_mb 时
+    按最近命中时间淘汰最久未使用的记录。
+    """
+
+    def __init__(self, db=None):
+        self._db = db
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self.enabled = str(cfg.get("llm.cache.enable", True)).lower() == "true"
+        self.ttl = float(cfg.get("llm.cache.ttl_days", 30) or 0) * 86400
+        self.max_bytes = int(float(cfg.get("llm.cache.max_mb", 100) or 0) * 1024 * 1024)
+        # 每写入多少条检查一次容量
+        self.check_every = 50
+        self._puts = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from core.db import DB
+            self._db = DB
+        return self._db
+
+    def _session(self):
+        if not self._table_ready:
+            with self._lock:
+                if not self._table_ready:
+                    LLMCacheEntry.__table__.create(bind=self.db.get_engine(), checkfirst=True)
+                    self._table_ready = True
+        return self.db.get_session()
+
+    @staticmethod
+    def key(prompt_version: str, model: str, text: str, params: dict = None) -> str:
+        """text 为本次生成所依据的文章正文(分块/合并阶段为对应的片段)，提示词的其它部分由 prompt_version 区分"""
+        data = {
+            "v": prompt_version,
+            "model": model,
+            "params": params or {},
+            "text": hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest(),
+        }
+        return hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回None"""
+        if not self.enabled or not key:
+            return None
+        session = None
+        try:
+            session = self._session()
+            entry = session.query(LLMCacheEntry).filter(LLMCacheEntry.key == key).first()
+            now = int(time.time())
+            if entry is None or (self.ttl and (entry.created_at or 0) + self.ttl < now):
+                if entry is not None:
+                    session.delete(entry)
+                session.commit()
+                metrics.inc("llm_cache.miss")
+                return None
+            content = entry.content
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_hit = now
+            session.commit()
+            metrics.inc("llm_cache.hit")
+            return content
+        except Exception as e:
+            if session is not None:
+                session.rollback()
+            print_warning(f"读取LLM缓存失败: {e}")
+            return None
+
+    def put(self, key: str, content: str, *, model: str = "", prompt_version: str = "") -> None:
+        if not self.enabled or not key or content is None:
+            return
+        session = None
+        try:
+            session = self._session()
+            now = int(time.time())
+            session.merge(LLMCacheEntry(key=key, prompt_version=prompt_version, model=model, content=content,
+                                        size=len(content.encode("utf-8")), hits=0, created_at=now, last_hit=now))
+            session.commit()
+        except Exception as e:
+            if session is not None:
+                session.rollback()
+            print_warning(f"写入LLM缓存失败: {e}")
+            return
+        self._puts += 1
+        if self._puts % self.check_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """删除过期记录，并在超过容量上限时淘汰最久未命中的记录(降到上限的90%)，返回删除条数"""
+        session = self._session()
+        removed = 0
+        try:
+            if self.ttl:
+                removed += (
+                    session.query(LLMCacheEntry)
+                    .filter(LLMCacheEntry.created_at < int(time.time() - self.ttl))
+                    .delete(synchronize_session=False)
+                )
+                session.commit()
+            total = session.query(func.coalesce(func.sum(LLMCacheEntry.size), 0)).scalar() or 0
+            session.commit()
+            if self.max_bytes and total > self.max_bytes:
+                target = total - int(self.max_bytes * 0.9)
+                freed, keys = 0, []
+                for key, size in (session.query(LLMCacheEntry.key, LLMCacheEntry.size)
+                                  .order_by(LLMCacheEntry.last_hit.asc()).all()):
+                    keys.append(key)
+                    freed += size or 0
+                    if freed >= target:
+                        break
+                session.commit()
+                for i in range(0, len(keys), 500):
+                    removed += (
+                        session.query(LLMCacheEntry)
+                        .filter(LLMCacheEntry.key.in_(keys[i:i + 500]))
+                        .delete(synchronize_session=False)
+                    )
+                    session.commit()
+            if removed:
+                print_info(f"LLM缓存淘汰 {removed} 条")
+        except Exception as e:
+            session.rollback()
+            print_warning(f"LLM缓存淘汰失败: {e}")
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        session = self._session()
+        count, size = session.query(func.count(LLMCacheEntry.key), func.coalesce(func.sum(LLMCacheEntry.size), 0)).one()
+        session.commit()
+        return {
+            "entries": count,
+            "bytes": int(size or 0),
+            "max_bytes": self.max_bytes,
+            "hits": metrics.get("llm_cache.hit"),
+            "misses": metrics.get("llm_cache.miss"),
+        }
+
+
+# 进程内共享
+Cache = LLMCache()
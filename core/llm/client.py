@@ -0,0 +1,216 @@
+import asyncio
+import math
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import httpx
+
+from core.config import cfg
+from core.monitor import RateCounter, Window, register_queue
+from core.print import print_success, print_warning
+from core.ratelimit import TokenBucket
+
+
+class LLMError(Exception):
+    """LLM 请求失败"""
+
+
+# 中日韩文字及全角符号，约1字1token
+_WIDE = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef]")
+
+
+def estimate_tokens(messages: list) -> int:
+    """粗略估算请求的 token 数(中文约1字1token，英文约4字符1token，取偏大值)"""
+    text = "".join(str(m.get("content") or "") for m in messages or [])
+    wide = len(_WIDE.findall(text))
+    return max(1, wide + math.ceil((len(text) - wide) / 4))
+
+
+class LLMClient:
+    """共享的异步 LLM 客户端
+
+    在独立事件循环线程中维护一个长连接的 httpx.AsyncClient(安装 h2 时使用 HTTP/2)，
+    所有请求共享连接池，避免每次调用重新握手。全局限制同时进行的请求数(llm.max_in_flight)
+    与每分钟 token 预算(llm.tpm，按估算预扣、按返回的 usage 校正)。
+
+    同步代码(队列工作线程)使用 submit()/chat_sync()，异步代码使用 await chat()；
+    run() 在同步线程中复用一个事件循环执行协程，替代每次新建事件循环；
+    异步代码使用 await arun()，不阻塞调用方的事件循环。
+    """
+
+    def __init__(self):
+        self.max_in_flight = max(1, int(cfg.get("llm.max_in_flight", 4) or 4))
+        self.tpm = int(cfg.get("llm.tpm", 0) or 0)
+        self.timeout = float(cfg.get("llm.timeout", 60) or 60)
+        self.http2 = str(cfg.get("llm.http2", True)).lower() == "true"
+        self.name = "llm"
+        self.tag = "LLM"
+        self._budget = TokenBucket(self.tpm / 60.0, self.tpm, name="llm.tpm") if self.tpm > 0 else None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._local = threading.local()
+        self._in_flight = 0
+        self.stats = {"done": 0, "failed": 0, "tokens": 0}
+        self._enqueued = RateCounter()
+        self._wait = Window()
+        self._run = Window()
+        register_queue(self)
+
+    # ---------------------------------------------------------------- 生命周期
+    def start(self) -> None:
+        """启动事件循环线程(幂等)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="LLM客户端", daemon=True)
+            self._thread.start()
+        self._ready.wait(10)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print_warning("未安装 h2，LLM客户端使用 HTTP/1.1 连接池")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+        )
+        print_success(f"LLM客户端已启动: 并发{self.max_in_flight} TPM{self.tpm or '不限'} HTTP/{'2' if http2 else '1.1'}")
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(self._client.aclose())
+            except Exception:
+                pass
+            loop.close()
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(10)
+        self._thread = None
+        self._loop = None
+
+    # ---------------------------------------------------------------- 请求
+    async def _budget_acquire(self, tokens: int) -> None:
+        if self._budget is None:
+            return
+        tokens = min(tokens, self._budget.burst)
+        while True:
+            wait = self._budget.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 5.0))
+
+    async def _chat(self, url: str, headers: dict, payload: dict, timeout: float) -> dict:
+        queued = time.time()
+        estimate = estimate_tokens(payload.get("messages"))
+        async with self._semaphore:
+            await self._budget_acquire(estimate)
+            self._wait.add(time.time() - queued)
+            self._in_flight += 1
+            start = time.time()
+            try:
+                resp = await self._client.post(url, headers=headers, json=payload, timeout=timeout)
+                if resp.status_code >= 400:
+                    raise LLMError(f"HTTP {resp.status_code}: {resp.text[:500]}")
+                data = resp.json()
+                self.stats["done"] += 1
+            except LLMError:
+                self.stats["failed"] += 1
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                raise LLMError(f"{type(e).__name__}: {e}")
+            finally:
+                self._in_flight -= 1
+                self._run.add(time.time() - start)
+        used = (data.get("usage") or {}).get("total_tokens") if isinstance(data, dict) else None
+        if used:
+            self.stats["tokens"] += int(used)
+            if self._budget is not None:
+                # 按实际用量校正预扣的估算值
+                self._budget.consume(int(used) - min(estimate, self._budget.burst))
+        return data
+
+    def submit(self, url: str, payload: dict, headers: dict = None, timeout: float = None) -> Future:
+        """提交一个 chat/completions 请求，返回 concurrent.futures.Future(结果为响应JSON)"""
+        self.start()
+        self._enqueued.inc()
+        return asyncio.run_coroutine_threadsafe(
+            self._chat(url, headers or {}, payload, float(timeout or self.timeout)), self._loop
+        )
+
+    async def chat(self, url: str, payload: dict, headers: dict = None, timeout: float = None) -> dict:
+        """在任意事件循环中等待请求结果"""
+        return await asyncio.wrap_future(self.submit(url, payload, headers, timeout))
+
+    def chat_sync(self, url: str, payload: dict, headers: dict = None, timeout: float = None) -> dict:
+        """同步等待请求结果(含排队时间，最长等待3倍超时)"""
+        timeout = float(timeout or self.timeout)
+        return self.submit(url, payload, headers, timeout).result(timeout * 3)
+
+    def run(self, coro) -> Any:
+        """在当前(同步)线程执行协程并返回结果，每个线程复用一个事件循环
+
+        不能在运行中的事件循环内调用(会阻塞该循环)，异步代码请使用 await arun()。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            loop = getattr(self._local, "loop", None)
+            if loop is None or loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self._local.loop = loop
+            return loop.run_until_complete(coro)
+        coro.close()
+        raise RuntimeError("LLM.run() 不能在运行中的事件循环内调用，请使用 await LLM.arun()")
+
+    async def arun(self, coro) -> Any:
+        """在客户端事件循环中执行协程，调用方的事件循环只等待结果"""
+        self.start()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def get_metrics(self) -> dict:
+        data = {
+            "name": self.name,
+            "tag": self.tag,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "enqueued": self._enqueued.total,
+            "enqueue_rate": self._enqueued.rate(),
+            "done": self.stats["done"],
+            "failed": self.stats["failed"],
+            "tokens": self.stats["tokens"],
+            "in_flight_count": self._in_flight,
+            "workers": self.max_in_flight,
+            "wait": self._wait.snapshot(),
+            "run": self._run.snapshot(),
+        }
+        if self._budget is not None:
+            data["budget"] = self._budget.get_info()
+        return data
+
+
+# 进程内共享
+LLM = LLMClient()
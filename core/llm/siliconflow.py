@@ -1,13 +1,27 @@
 import json
 from typing import Any
 
-import httpx
+from .cache import Cache
+from .client import LLM, LLMError
+
+# Sampling params sent with every request (part of the result cache key).
+CHAT_PARAMS = {"temperature": 0.2}
 
 
 class SiliconFlowError(Exception):
     pass
 
 
+def _add_usage(usage: dict[str, int], reported: dict[str, Any] | None, cached: bool = False) -> None:
+    """Accumulate per-call token usage into a caller-owned dict."""
+    usage["calls"] = usage.get("calls", 0) + 1
+    if cached:
+        usage["cached"] = usage.get("cached", 0) + 1
+        return
+    for name in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        usage[name] = usage.get(name, 0) + int((reported or {}).get(name) or 0)
+
+
 async def _siliconflow_chat_content(
     *,
     model: str,
@@ -15,6 +29,7 @@ async def _siliconflow_chat_content(
     api_key: str,
     messages: list[dict[str, Any]],
     timeout: float = 60.0,
+    usage: dict[str, int] | None = None,
 ) -> str:
     if not api_url:
         raise SiliconFlowError("Missing SiliconFlow api_url (set llm.siliconflow.api_url or SILICONFLOW_API_URL).")
@@ -28,15 +43,17 @@ async def _siliconflow_chat_content(
     payload = {
         "model": model,
         "messages": messages,
-        "temperature": 0.2,
+        **CHAT_PARAMS,
     }
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(url, headers=headers, json=payload)
-        if resp.status_code >= 400:
-            raise SiliconFlowError(f"HTTP {resp.status_code}: {resp.text[:500]}")
-        data = resp.json()
+    # Shared pooled client with global in-flight / TPM limits (core.llm.client)
+    try:
+        data = await LLM.chat(url, payload, headers=headers, timeout=timeout)
+    except LLMError as e:
+        raise SiliconFlowError(str(e))
 
+    if usage is not None:
+        _add_usage(usage, data.get("usage") if isinstance(data, dict) else None)
     try:
         return data["choices"][0]["message"]["content"]
     except Exception as e:
@@ -50,19 +67,42 @@ async def siliconflow_chat_json(
     api_key: str,
     messages: list[dict[str, Any]],
     timeout: float = 60.0,
+    prompt_version: str | None = None,
+    cache_text: str | None = None,
+    usage: dict[str, int] | None = None,
 ) -> dict[str, Any]:
-    content = await _siliconflow_chat_content(
-        model=model,
-        api_url=api_url,
-        api_key=api_key,
-        messages=messages,
-        timeout=timeout,
-    )
+    """Chat completion parsed as JSON.
+
+    With `prompt_version` and `cache_text` (the article text the prompt is built
+    from), raw completions are cached by (hash of the normalized text,
+    prompt_version, model, params); the same article is answered from the cache.
+    Bump the version whenever the prompt changes. `usage`, when given, accumulates
+    calls / cache hits / token counts across calls.
+    """
+    key = Cache.key(prompt_version, model, cache_text, CHAT_PARAMS) if prompt_version and cache_text is not None else None
+    content = Cache.get(key) if key else None
+    cached = content is not None
+    if cached:
+        if usage is not None:
+            _add_usage(usage, None, cached=True)
+    else:
+        content = await _siliconflow_chat_content(
+            model=model,
+            api_url=api_url,
+            api_key=api_key,
+            messages=messages,
+            timeout=timeout,
+            usage=usage,
+        )
 
     try:
-        return json.loads(content)
+        data = json.loads(content)
     except Exception as e:
         raise SiliconFlowError(f"Model did not return valid JSON: {e}; content={content[:500]}")
+    # Only cache completions that parsed, so a bad answer is retried next time.
+    if key and not cached:
+        Cache.put(key, content, model=model, prompt_version=prompt_version)
+    return data
 
 
 async def siliconflow_chat_text(
@@ -0,0 +1,61 @@
+import threading
+import time
+from typing import Dict
+
+
+class MetricsRegistry:
+    """进程内指标注册表
+
+    计数器(counter)用于累计次数，如命中/回退/失败；
+    耗时(timer)记录调用次数、总耗时与最大耗时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._timers: Dict[str, dict] = {}
+        self._started = time.time()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """累加计数器"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """记录一次耗时(秒)"""
+        with self._lock:
+            t = self._timers.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["sum"] += seconds
+            if seconds > t["max"]:
+                t["max"] = seconds
+
+    def ratio(self, name: str, total: str) -> float:
+        """计算 name/total 比例，total为0时返回0"""
+        with self._lock:
+            denominator = self._counters.get(total, 0)
+            if not denominator:
+                return 0.0
+            return round(self._counters.get(name, 0) / denominator, 4)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timers = {}
+            for name, t in self._timers.items():
+                timers[name] = {
+                    "count": t["count"],
+                    "avg": round(t["sum"] / t["count"], 4) if t["count"] else 0,
+                    "max": round(t["max"], 4),
+                }
+            return {
+                "uptime": round(time.time() - self._started, 2),
+                "counters": dict(self._counters),
+                "timers": timers,
+            }
+
+
+metrics = MetricsRegistry()
@@ -12,5 +12,13 @@ from .config_management import ConfigManagement
 from .article_insight import ArticleInsight
 from .article_favorite import ArticleFavorite
 from .article_note import ArticleNote
+# 持久化任务队列
+from .queue_job import QueueJob
+# 定时任务主节点选举
+from .leader_lock import LeaderLock
+# 消息任务运行汇总
+from .message_task_run import MessageTaskRun, MessageTaskRunItem
+# LLM 结果缓存
+from .llm_cache import LLMCacheEntry
 # 导入基础模型
 from .base import *
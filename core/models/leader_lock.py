@@ -0,0 +1,14 @@
+from .base import Base, Column, String, Integer, DateTime
+
+
+class LeaderLock(Base):
+    """主节点选举锁表(多进程/多节点中只有持有锁的实例执行定时任务)"""
+    __tablename__ = "leader_locks"
+
+    # 锁名称，如 scheduler
+    name = Column(String(50), primary_key=True)
+    # 当前持有者(主机名-进程号-随机串)
+    holder = Column(String(255))
+    # 租约到期时间戳(秒)，持有者需在到期前续约
+    lease_until = Column(Integer, default=0)
+    updated_at = Column(DateTime)
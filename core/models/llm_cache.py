@@ -0,0 +1,19 @@
+from .base import Base, Column, String, Integer, Text
+
+
+class LLMCacheEntry(Base):
+    """LLM 结果缓存(按规范化输入的哈希复用原始返回内容)"""
+    __tablename__ = "llm_cache"
+
+    # sha256(提示词版本 + 模型 + 参数 + 规范化后的消息)
+    key = Column(String(64), primary_key=True)
+    prompt_version = Column(String(50))
+    model = Column(String(255))
+    # 模型原始返回内容
+    content = Column(Text)
+    # content 的字节数，用于按容量淘汰
+    size = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+    # 时间戳(秒)
+    created_at = Column(Integer, index=True)
+    last_hit = Column(Integer, index=True)
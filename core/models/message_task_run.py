@@ -0,0 +1,26 @@
+from .base import Base, Column, String, Integer, DateTime, Text
+
+
+class MessageTaskRun(Base):
+    """消息任务的一次运行(汇总本次所有公众号的新文章后统一发送通知)"""
+    __tablename__ = "message_task_runs"
+
+    id = Column(String(64), primary_key=True)
+    task_id = Column(String(255), index=True, nullable=False)
+    # 本次投递的公众号数，0表示仍在投递中
+    expected = Column(Integer, default=0)
+    # 0: 收集中 1: 已发送
+    status = Column(Integer, default=0, index=True)
+    created_at = Column(DateTime)
+    sent_at = Column(DateTime)
+
+
+class MessageTaskRunItem(Base):
+    """一次运行中单个公众号采集到的新文章"""
+    __tablename__ = "message_task_run_items"
+
+    run_id = Column(String(64), primary_key=True)
+    mp_id = Column(String(255), primary_key=True)
+    # JSON: 文章字段列表
+    articles = Column(Text)
+    created_at = Column(DateTime)
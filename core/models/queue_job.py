@@ -0,0 +1,33 @@
+from .base import Base, Column, String, Integer, DateTime, Text
+
+
+class QueueJob(Base):
+    """持久化任务队列表(多节点 worker 通过租约领取任务)"""
+    __tablename__ = "queue_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # 队列名称，不同队列互不干扰
+    queue = Column(String(50), index=True, nullable=False, default="default")
+    # 已注册的任务名
+    name = Column(String(255), nullable=False)
+    # JSON: {"args": [...], "kwargs": {...}}
+    payload = Column(Text)
+    # 分组标签(如 crawl/insights/webhook)
+    tag = Column(String(50), default="")
+    # 去重键，同一队列中未完成的相同键只保留一个任务
+    dedupe_key = Column(String(255), index=True)
+    # 优先级，数值越小越先执行
+    priority = Column(Integer, default=100)
+    # 0: 等待 1: 执行中 2: 完成 9: 死信
+    status = Column(Integer, default=0, index=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    # 时间戳(秒)：最早执行时间 / 租约到期时间
+    run_at = Column(Integer, index=True)
+    lease_until = Column(Integer)
+    worker_id = Column(String(255))
+    last_error = Column(Text)
+
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
@@ -0,0 +1,192 @@
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+class Window:
+    """耗时采样窗口(保留最近 size 个样本)，用于计算分位数"""
+
+    def __init__(self, size: int = 1024):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        seconds = max(0.0, float(seconds))
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @staticmethod
+    def _quantile(ordered: list, q: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            count, total, peak = self.count, self.total, self.max
+        return {
+            "count": count,
+            "sum": round(total, 4),
+            "avg": round(total / count, 4) if count else 0,
+            "p50": round(self._quantile(ordered, 0.5), 4),
+            "p90": round(self._quantile(ordered, 0.9), 4),
+            "p99": round(self._quantile(ordered, 0.99), 4),
+            "max": round(peak, 4),
+        }
+
+
+class RateCounter:
+    """累计次数及最近 window 秒内的速率(次/秒)"""
+
+    def __init__(self, window: float = 60):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self.window = window
+        self.total = 0
+
+    def _trim(self, now: float) -> None:
+        while self._events and self._events[0] < now - self.window:
+            self._events.popleft()
+
+    def inc(self) -> None:
+        now = time.time()
+        with self._lock:
+            self.total += 1
+            self._events.append(now)
+            self._trim(now)
+
+    def rate(self) -> float:
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            return round(len(self._events) / self.window, 4)
+
+
+# 进程内所有队列/调度器(弱引用，对象释放后自动移除)
+_queues: "weakref.WeakSet" = weakref.WeakSet()
+_schedulers: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def register_queue(queue) -> None:
+    """登记队列，对象需提供 get_metrics()"""
+    _queues.add(queue)
+
+
+def register_scheduler(scheduler) -> None:
+    """登记调度器，对象需提供 get_metrics()"""
+    _schedulers.add(scheduler)
+
+
+def _collect(items: Iterable) -> List[dict]:
+    result = []
+    for item in list(items):
+        try:
+            result.append(item.get_metrics())
+        except Exception as e:
+            result.append({"name": getattr(item, "name", ""), "error": str(e)})
+    return sorted(result, key=lambda x: str(x.get("name", "")))
+
+
+def _leader_info() -> dict:
+    try:
+        from core.leader import Leader
+        return Leader.get_info()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def snapshot() -> dict:
+    """所有队列与调度器的运行指标"""
+    return {
+        "time": int(time.time()),
+        "queues": _collect(_queues),
+        "schedulers": _collect(_schedulers),
+        "leader": _leader_info(),
+    }
+
+
+# ---------------------------------------------------------------- Prometheus
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _value(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_label(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Writer:
+    """按指标名分组输出(同名指标的样本需连续出现)"""
+
+    def __init__(self):
+        self._families: Dict[str, List[str]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        if name not in self._families:
+            self._families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        return self._families[name]
+
+    def metric(self, name: str, kind: str, help_text: str, value, **labels) -> None:
+        if value is None:
+            return
+        self._family(name, kind, help_text).append(f"{name}{_labels(**labels)} {_value(value)}")
+
+    def summary(self, name: str, help_text: str, window: dict, **labels) -> None:
+        if not window:
+            return
+        lines = self._family(name, "summary", help_text)
+        for quantile in ("0.5", "0.9", "0.99"):
+            key = "p" + quantile[2:].ljust(2, "0")
+            lines.append(f"{name}{_labels(**labels, quantile=quantile)} {_value(window.get(key, 0))}")
+        lines.append(f"{name}_sum{_labels(**labels)} {_value(window.get('sum', 0))}")
+        lines.append(f"{name}_count{_labels(**labels)} {_value(window.get('count', 0))}")
+
+    def render(self) -> str:
+        return "\n".join(line for lines in self._families.values() for line in lines) + "\n"
+
+
+def to_prometheus(data: dict = None) -> str:
+    """将 snapshot() 结果转换为 Prometheus 文本格式"""
+    data = data or snapshot()
+    w = _Writer()
+    for q in data.get("queues", []):
+        name = q.get("name", "")
+        w.metric("werss_queue_enqueued_total", "counter", "入队任务数", q.get("enqueued"), queue=name)
+        w.metric("werss_queue_enqueue_rate", "gauge", "最近1分钟入队速率(次/秒)", q.get("enqueue_rate"), queue=name)
+        w.metric("werss_queue_coalesced_total", "counter", "被合并的重复任务数", q.get("coalesced"), queue=name)
+        w.metric("werss_queue_done_total", "counter", "执行成功的任务数", q.get("done"), queue=name)
+        w.metric("werss_queue_failed_total", "counter", "执行失败的任务数", q.get("failed"), queue=name)
+        w.metric("werss_queue_pending", "gauge", "等待执行的任务数", q.get("pending"), queue=name)
+        w.metric("werss_queue_in_flight", "gauge", "正在执行的任务数", q.get("in_flight_count"), queue=name)
+        w.metric("werss_queue_workers", "gauge", "工作线程数", q.get("workers"), queue=name)
+        durable = q.get("durable") or {}
+        w.metric("werss_queue_dead", "gauge", "死信任务数", durable.get("dead"), queue=name)
+        w.summary("werss_queue_wait_seconds", "任务排队等待时间", q.get("wait"), queue=name)
+        w.summary("werss_queue_run_seconds", "任务执行时间", q.get("run"), queue=name)
+    for s in data.get("schedulers", []):
+        name = s.get("name", "")
+        w.metric("werss_scheduler_running", "gauge", "调度器是否运行", 1 if s.get("running") else 0, scheduler=name)
+        w.metric("werss_scheduler_leader", "gauge", "当前实例是否为主节点(执行定时任务)", 1 if s.get("leader") else 0, scheduler=name)
+        for job in s.get("jobs", []):
+            labels = {"scheduler": name, "job": job.get("id", "")}
+            w.metric("werss_scheduler_job_next_fire_timestamp", "gauge", "下次触发时间(Unix秒)", job.get("next_run_time"), **labels)
+            w.metric("werss_scheduler_job_runs_total", "counter", "任务触发次数", job.get("runs"), **labels)
+            w.metric("werss_scheduler_job_failures_total", "counter", "任务失败次数", job.get("failures"), **labels)
+            w.metric("werss_scheduler_job_skipped_total", "counter", "非主节点跳过的触发次数", job.get("skipped"), **labels)
+            w.summary("werss_scheduler_job_run_seconds", "定时任务执行时间", job.get("run"), **labels)
+    return w.render()
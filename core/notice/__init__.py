@@ -3,6 +3,71 @@ from .dingtalk import send_dingtalk_message
 from .feishu import send_feishu_message
 from .custom import send_custom_message
 
+# 各平台单条消息的大小上限(UTF-8字节数，留有余量)
+MESSAGE_LIMITS = {
+    'wechat': 4000,
+    'dingtalk': 18000,
+    'feishu': 28000,
+    'custom': 60000,
+}
+
+
+def notice_type_of(webhook_url):
+    """根据Webhook地址判断通知类型"""
+    webhook_url = str(webhook_url)
+    if 'qyapi.weixin.qq.com' in webhook_url:
+        return 'wechat'
+    if 'oapi.dingtalk.com' in webhook_url:
+        return 'dingtalk'
+    # 兼容企业本地化部署的飞书，如open.feishu.xxxx.com
+    if 'open.feishu.' in webhook_url:
+        return 'feishu'
+    return 'custom'
+
+
+def _cut(text, limit):
+    """按字节截断，不切断多字节字符"""
+    return text.encode('utf-8')[:limit].decode('utf-8', errors='ignore')
+
+
+def split_message(sections, limit):
+    """将多段消息合并为尽量少的若干条，每条不超过 limit 字节
+
+    段落整体放不下时按行拆分，单行仍超长时截断
+    """
+    chunks, current, size = [], [], 0
+    sep = len('\n'.encode('utf-8'))
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append('\n'.join(current))
+        current, size = [], 0
+
+    for section in sections:
+        parts = [section] if len(section.encode('utf-8')) <= limit else section.split('\n')
+        for part in parts:
+            part = _cut(part, limit)
+            length = len(part.encode('utf-8'))
+            if current and size + sep + length > limit:
+                flush()
+            size += (sep if current else 0) + length
+            current.append(part)
+    flush()
+    return chunks
+
+
+def notice_batch(webhook_url, title, sections):
+    """按平台消息大小上限分批发送多段消息，返回发送条数"""
+    if len(str(webhook_url)) == 0 or not sections:
+        return 0
+    chunks = split_message(sections, MESSAGE_LIMITS[notice_type_of(webhook_url)])
+    for i, chunk in enumerate(chunks):
+        part_title = title if len(chunks) == 1 else f"{title}({i + 1}/{len(chunks)})"
+        notice(webhook_url, part_title, chunk)
+    return len(chunks)
+
+
 def notice( webhook_url, title, text,notice_type: str=None):
     """
     公用通知方法，根据类型判断调用哪种通知
@@ -16,15 +81,7 @@ def notice( webhook_url, title, text,notice_type: str=None):
     if  len(str(webhook_url)) == 0:
         print('未提供webhook_url')
         return
-    if 'qyapi.weixin.qq.com' in webhook_url:
-        notice_type = 'wechat'
-    elif 'oapi.dingtalk.com' in webhook_url:
-        notice_type = 'dingtalk'
-    # 兼容企业本地化部署的飞书，如open.feishu.xxxx.com
-    elif 'open.feishu.' in webhook_url:  
-        notice_type = 'feishu'
-    else:
-        notice_type = 'custom'
+    notice_type = notice_type_of(webhook_url)
     
     if notice_type == 'wechat':
         send_wechat_message(webhook_url, title, text)
@@ -1,27 +1,19 @@
-import requests
-import json
+def build_custom_message(title, text):
+    """自定义 webhook 消息体"""
+    return {
+        "title": title,
+        "content": text
+    }
 
 
 def send_custom_message(webhook_url, title, text):
     """
-    发送微信消息
+    发送自定义webhook消息(写入发件箱后异步发送)
     
     参数:
     - webhook_url: 自定义Webhook地址
     - title: 消息标题
     - text: 消息内容
     """
-    headers = {'Content-Type': 'application/json'}
-    data = {
-        "title": title,
-        "content": text
-    }
-    try:
-        response = requests.post(
-            url=webhook_url,
-            headers=headers,
-            data=json.dumps(data)
-        )
-        print(response.text)
-    except Exception as e:
-        print('自定义webhook通知发送失败', e)
\ No newline at end of file
+    from .delivery import Delivery
+    return Delivery.enqueue(webhook_url, build_custom_message(title, text), kind="custom", title=title)
\ No newline at end of file
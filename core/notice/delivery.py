@@ -0,0 +1,349 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from typing import Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from core.config import cfg
+from core.metrics import metrics
+from core.monitor import RateCounter, Window, register_queue
+from core.print import print_error, print_success, print_warning
+
+# 发件箱任务名(queue_jobs 表中 queue=webhook)
+OUTBOX_TASK = "notice.deliver"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(data) -> str:
+    """序列化为JSON字符串，安装 orjson 时使用 orjson(非JSON类型如 datetime 转为字符串)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DeliveryError(Exception):
+    """发送失败，retry=False 表示重试也不会成功(如地址错误)"""
+
+    def __init__(self, message: str, retry: bool = True):
+        super().__init__(message)
+        self.retry = retry
+
+
+def endpoint_of(url: str) -> str:
+    """并发限制的粒度：同一主机的机器人共享限流"""
+    return urlsplit(url).netloc or url
+
+
+def check_response(response: httpx.Response, kind: str = "custom") -> None:
+    """HTTP错误或机器人接口返回错误码时抛出 DeliveryError"""
+    status = response.status_code
+    if status == 429 or status >= 500:
+        raise DeliveryError(f"HTTP {status}: {response.text[:200]}")
+    if status >= 400:
+        raise DeliveryError(f"HTTP {status}: {response.text[:200]}", retry=False)
+    if kind not in ("wechat", "dingtalk", "feishu"):
+        return
+    try:
+        data = response.json()
+    except Exception:
+        return
+    if not isinstance(data, dict):
+        return
+    # 钉钉/企业微信: errcode，飞书: code/StatusCode，限流时同样返回200
+    code = data.get("errcode", data.get("code", data.get("StatusCode", 0)))
+    if code not in (0, "0", None):
+        raise DeliveryError(f"{kind} 返回错误 {code}: {data.get('errmsg') or data.get('msg') or ''}")
+
+
+class WebhookDelivery:
+    """异步 webhook/通知发送服务
+
+    采集任务只负责把消息写入发件箱(queue_jobs 表，queue=webhook)后立即返回；
+    独立事件循环线程从发件箱领取消息，通过共享的 httpx.AsyncClient 连接池并发发送，
+    同一主机同时发送的请求数受 webhook.concurrency 限制(机器人接口限流)，
+    已领取的消息在等待并发名额和发送期间持续续约，不会因租约过期被重复发送。
+    失败按指数退避+抖动重试，超过 webhook.max_attempts 次进入死信，
+    进程重启后未发送的消息由任意实例继续发送。
+    """
+
+    def __init__(self, name: str = "webhook", durable: bool = None):
+        self.name = name
+        self.enabled = str(cfg.get("webhook.async", True)).lower() == "true"
+        if durable is None:
+            durable = str(cfg.get("webhook.durable", True)).lower() == "true"
+        self.durable = durable
+        self.timeout = float(cfg.get("webhook.timeout", 10) or 10)
+        self.concurrency = max(1, int(cfg.get("webhook.concurrency", 2) or 2))
+        self.max_in_flight = max(1, int(cfg.get("webhook.max_in_flight", 20) or 20))
+        self.max_attempts = max(1, int(cfg.get("webhook.max_attempts", 5) or 5))
+        self.retry_backoff = float(cfg.get("webhook.retry_backoff", 10) or 10)
+        self.poll = float(cfg.get("webhook.poll", 2) or 2)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{name}"
+        self._store = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight = 0
+        self.stats = {"done": 0, "failed": 0, "retried": 0, "dead": 0}
+        self._enqueued = RateCounter()
+        self._run = Window()
+        register_queue(self)
+
+    @property
+    def store(self):
+        if self._store is None:
+            from core.queue.lease import LeaseQueue
+
+            store = LeaseQueue(self.name)
+            store.max_attempts = self.max_attempts
+            store.retry_backoff = self.retry_backoff
+            store.lease = max(60, int(self.timeout * 6))
+            self._store = store
+        return self._store
+
+    # ---------------------------------------------------------------- 生命周期
+    def start(self) -> None:
+        """启动事件循环线程(幂等)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="webhook发送服务", daemon=True)
+            self._thread.start()
+        self._ready.wait(10)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+        )
+        if self.durable:
+            loop.create_task(self._dispatch())
+        print_success(f"webhook发送服务已启动: 同主机并发{self.concurrency} 总并发{self.max_in_flight}")
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                tasks = asyncio.all_tasks(loop)
+                for task in tasks:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                loop.run_until_complete(self._client.aclose())
+            except Exception:
+                pass
+            loop.close()
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(10)
+        self._thread = None
+        self._loop = None
+
+    def _wakeup(self) -> None:
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ---------------------------------------------------------------- 投递
+    def enqueue(self, url: str, body: Union[str, dict, list], headers: dict = None, kind: str = "custom",
+                title: str = "") -> Optional[int]:
+        """写入发件箱并立即返回(发件箱ID，未持久化时为None)，由后台线程异步发送"""
+        if not url:
+            print_warning("未提供webhook_url")
+            return None
+        if not isinstance(body, str):
+            body = dumps(body)
+        job = {"args": [url, body, headers or JSON_HEADERS, kind, title], "attempts": 0}
+        self._enqueued.inc()
+        if not self.enabled:
+            # 关闭异步发送时在调用线程中直接发送(不重试)
+            self.send_now(*job["args"][:4])
+            return None
+        if self.durable:
+            try:
+                job_id = self.store.enqueue(OUTBOX_TASK, job["args"], tag=kind, max_attempts=self.max_attempts)
+                self.start()
+                self._wakeup()
+                return job_id
+            except Exception as e:
+                print_warning(f"写入webhook发件箱失败，改为仅内存发送: {e}")
+        self.start()
+        asyncio.run_coroutine_threadsafe(self._deliver_memory(job), self._loop)
+        return None
+
+    def send_now(self, url: str, body: str, headers: dict = None, kind: str = "custom") -> bool:
+        """同步发送一次(不经过发件箱)，返回是否成功"""
+        try:
+            response = httpx.post(url, content=body.encode("utf-8"), headers=headers or JSON_HEADERS,
+                                  timeout=self.timeout)
+            check_response(response, kind)
+            return True
+        except Exception as e:
+            print_error(f"{kind}通知发送失败: {e}")
+            return False
+
+    # ---------------------------------------------------------------- 发送
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        key = endpoint_of(url)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[key]
+
+    async def _send(self, url: str, body: str, headers: dict, kind: str, title: str = "") -> None:
+        async with self._semaphore(url):
+            start = time.time()
+            try:
+                response = await self._client.post(url, content=body.encode("utf-8"), headers=headers or JSON_HEADERS)
+                check_response(response, kind)
+            except httpx.HTTPError as e:
+                raise DeliveryError(f"{type(e).__name__}: {e}")
+            finally:
+                self._run.add(time.time() - start)
+                metrics.observe("webhook.send", time.time() - start)
+
+    def _backoff(self, attempts: int) -> float:
+        return min(3600.0, self.retry_backoff * (2 ** max(0, attempts - 1))) * random.uniform(0.8, 1.2)
+
+    async def _deliver_memory(self, job: dict) -> None:
+        """未持久化的消息在事件循环内重试"""
+        url, body, headers, kind, title = job["args"]
+        while True:
+            job["attempts"] += 1
+            try:
+                await self._send(url, body, headers, kind, title)
+                self.stats["done"] += 1
+                return
+            except DeliveryError as e:
+                self.stats["failed"] += 1
+                if not e.retry or job["attempts"] >= self.max_attempts:
+                    self.stats["dead"] += 1
+                    print_error(f"{kind}通知发送失败({title}): {e}")
+                    return
+                self.stats["retried"] += 1
+                await asyncio.sleep(self._backoff(job["attempts"]))
+
+    async def _keepalive(self, job_id: int) -> None:
+        """等待主机并发名额及发送期间定期续约，避免租约过期后被重新领取、重复发送"""
+        while True:
+            await asyncio.sleep(max(1.0, self.store.lease / 3))
+            try:
+                if not await asyncio.to_thread(self.store.heartbeat, job_id, self.worker_id):
+                    print_warning(f"webhook发件箱消息#{job_id}租约已丢失，可能被其它实例接管")
+                    return
+            except Exception as e:
+                print_warning(f"webhook发件箱消息#{job_id}续约失败: {e}")
+
+    async def _complete(self, job_id: int) -> None:
+        """标记已发送；消息已发出，失败时仅重试更新状态(续约仍在进行)，不重新发送"""
+        for attempt in range(3):
+            try:
+                if not await asyncio.to_thread(self.store.complete, job_id, self.worker_id):
+                    print_warning(f"webhook发件箱消息#{job_id}已发送，但租约已被其它实例接管")
+                return
+            except Exception as e:
+                if attempt == 2:
+                    print_error(f"webhook发件箱消息#{job_id}已发送，更新状态失败: {e}")
+                    return
+                await asyncio.sleep(1)
+
+    async def _deliver_job(self, job: dict) -> None:
+        args = job["args"]
+        beat = asyncio.get_running_loop().create_task(self._keepalive(job["id"]))
+        try:
+            try:
+                await self._send(*args)
+            except Exception as e:
+                self.stats["failed"] += 1
+                retry = getattr(e, "retry", True)
+                try:
+                    result = await asyncio.to_thread(self.store.fail, job["id"], self.worker_id, str(e), retry)
+                except Exception as store_error:
+                    print_error(f"更新webhook发件箱失败: {store_error}")
+                    result = "retry"
+                if result == "lost":
+                    print_warning(f"{args[3]}通知发送失败({args[4]})#{job['id']}，租约已被其它实例接管: {e}")
+                    return
+                self.stats["retried" if result == "retry" else "dead"] += 1
+                print_warning(f"{args[3]}通知发送失败({args[4]})#{job['id']}，{'稍后重试' if result == 'retry' else '已转入死信'}: {e}")
+                return
+            self.stats["done"] += 1
+            await self._complete(job["id"])
+        finally:
+            beat.cancel()
+            self._in_flight -= 1
+            self._wake.set()
+
+    async def _dispatch(self) -> None:
+        """从发件箱领取消息，保持最多 max_in_flight 个并发发送"""
+        while True:
+            job = None
+            if self._in_flight < self.max_in_flight:
+                try:
+                    job = await asyncio.to_thread(self.store.claim, self.worker_id, [OUTBOX_TASK])
+                except Exception as e:
+                    print_error(f"读取webhook发件箱失败: {e}")
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            self._in_flight += 1
+            asyncio.get_running_loop().create_task(self._deliver_job(job))
+
+    # ---------------------------------------------------------------- 管理
+    def replay_dead(self, ids=None) -> int:
+        count = self.store.replay_dead(ids)
+        self._wakeup()
+        return count
+
+    def get_metrics(self) -> dict:
+        data = {
+            "name": self.name,
+            "tag": "webhook发送",
+            "running": self._thread is not None and self._thread.is_alive(),
+            "enqueued": self._enqueued.total,
+            "enqueue_rate": self._enqueued.rate(),
+            "done": self.stats["done"],
+            "failed": self.stats["failed"],
+            "retried": self.stats["retried"],
+            "in_flight_count": self._in_flight,
+            "workers": self.max_in_flight,
+            "run": self._run.snapshot(),
+        }
+        if self.durable:
+            try:
+                data["durable"] = self.store.stats()
+                data["pending"] = data["durable"]["pending"]
+            except Exception as e:
+                data["durable"] = {"error": str(e)}
+        return data
+
+
+# 进程内共享的发送服务
+Delivery = WebhookDelivery()
@@ -1,8 +1,21 @@
-import requests
-import json
+def build_dingtalk_message(title, text, is_at_all=False, at_mobiles=None):
+    """钉钉 Markdown 消息体"""
+    return {
+        "msgtype": "markdown",
+        "markdown": {
+            "title": title,
+            "text": text
+        },
+        "at": {
+            "atMobiles": at_mobiles or [],
+            "isAtAll": is_at_all
+        }
+    }
+
+
 def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=[]):
     """
-    发送Markdown格式消息
+    发送Markdown格式消息(写入发件箱后异步发送)
     
     参数:
     - webhook_url: 机器人Webhook地址
@@ -11,27 +24,9 @@ def send_dingtalk_message(webhook_url, title, text, is_at_all=False, at_mobiles=
     - is_at_all: 是否@所有人
     - at_mobiles: 要@的手机号列表
     """
-    headers = {'Content-Type': 'application/json'}
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "title": title,
-            "text": text
-        },
-        "at": {
-            "atMobiles": at_mobiles,
-            "isAtAll": is_at_all
-        }
-    }
-    try:
-        response = requests.post(
-            url=webhook_url,
-            headers=headers,
-            data=json.dumps(data)
-        )
-        print(response.text)
-    except Exception as e:
-        print('通知发送失败', e)
+    from .delivery import Delivery
+    return Delivery.enqueue(webhook_url, build_dingtalk_message(title, text, is_at_all, at_mobiles),
+                            kind="dingtalk", title=title)
 # 使用示例
 # markdown_text = """### 项目状态报告  
 # - **项目名称**: XX系统升级  
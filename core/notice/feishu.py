@@ -1,17 +1,6 @@
-import requests
-import json
-
-def send_feishu_message(webhook_url, title, text):
-    """
-    发送飞书 Markdown 格式消息
-    
-    参数:
-    - webhook_url: 飞书机器人 Webhook 地址
-    - title: 消息标题
-    - text: Markdown 格式内容
-    """
-    headers = {'Content-Type': 'application/json'}
-    data = {
+def build_feishu_message(title, text):
+    """飞书卡片消息体"""
+    return {
         "msg_type": "interactive",
         "card": {
             "config": {
@@ -36,12 +25,16 @@ def send_feishu_message(webhook_url, title, text):
             }
         }
     }
-    try:
-        response = requests.post(
-            url=webhook_url,
-            headers=headers,
-            data=json.dumps(data)
-        )
-        print(response.text)
-    except Exception as e:
-        print('飞书通知发送失败', e)
\ No newline at end of file
+
+
+def send_feishu_message(webhook_url, title, text):
+    """
+    发送飞书 Markdown 格式消息(写入发件箱后异步发送)
+    
+    参数:
+    - webhook_url: 飞书机器人 Webhook 地址
+    - title: 消息标题
+    - text: Markdown 格式内容
+    """
+    from .delivery import Delivery
+    return Delivery.enqueue(webhook_url, build_feishu_message(title, text), kind="feishu", title=title)
\ No newline at end of file
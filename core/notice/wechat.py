@@ -1,31 +1,23 @@
-import requests
-import json
+def build_wechat_message(title, text):
+    """企业微信 Markdown 消息体"""
+    # 截取 text 确保不超过 4096 字节(企业微信 markdown 内容上限)
+    text = text.encode("utf-8")[:4096].decode("utf-8", errors="ignore")
+    return {
+        "msgtype": "markdown",
+        "markdown": {
+            "content": f"{text}"
+        }
+    }
 
 
 def send_wechat_message(webhook_url, title, text):
     """
-    发送微信消息
+    发送微信消息(写入发件箱后异步发送)
     
     参数:
     - webhook_url: 微信机器人Webhook地址
     - title: 消息标题
     - text: 消息内容
     """
-    # 截取 text 确保字符数不超过 4096 个
-    text = text[:2048]
-    headers = {'Content-Type': 'application/json'}
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "content": f"{text}"
-        }
-    }
-    try:
-        response = requests.post(
-            url=webhook_url,
-            headers=headers,
-            data=json.dumps(data)
-        )
-        print(response.text)
-    except Exception as e:
-        print('微信通知发送失败', e)
\ No newline at end of file
+    from .delivery import Delivery
+    return Delivery.enqueue(webhook_url, build_wechat_message(title, text), kind="wechat", title=title)
\ No newline at end of file
@@ -1 +1,3 @@
-from .queue import *
\ No newline at end of file
+from .queue import *
+from .lease import LeaseQueue
+from .registry import register_task
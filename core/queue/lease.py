@@ -0,0 +1,371 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import Index, and_, func, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from core.config import cfg
+from core.models.queue_job import QueueJob
+from core.print import print_warning
+
+PENDING = 0
+RUNNING = 1
+DONE = 2
+DEAD = 9
+
+# 同一队列中等待中的任务去重键唯一(部分索引，仅 SQLite/PostgreSQL 支持；MySQL 只能依赖查询去重)
+PENDING_DEDUPE_INDEX = Index(
+    "uq_queue_jobs_pending_dedupe",
+    QueueJob.queue,
+    QueueJob.dedupe_key,
+    unique=True,
+    sqlite_where=and_(QueueJob.status == PENDING, QueueJob.dedupe_key.isnot(None)),
+    postgresql_where=and_(QueueJob.status == PENDING, QueueJob.dedupe_key.isnot(None)),
+)
+
+
+class LeaseQueue:
+    """基于数据库表(queue_jobs)的租约队列
+
+    多个进程/节点通过条件更新(UPDATE ... WHERE status/lease)抢占任务，
+    领取后在租约期内需定期 heartbeat 续约；进程崩溃时租约过期，
+    任务对其它 worker 重新可见(至少执行一次)。失败按指数退避重试，
+    超过最大次数进入死信，可通过 replay_dead 重新投递。
+    """
+
+    def __init__(self, name: str = "default", db=None):
+        self.name = name
+        self._db = db
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self.lease = int(cfg.get("worker.lease", 300) or 300)
+        self.max_attempts = int(cfg.get("worker.max_attempts", 3) or 3)
+        self.retry_backoff = float(cfg.get("worker.retry_backoff", 30) or 30)
+        self.retry_backoff_max = float(cfg.get("worker.retry_backoff_max", 3600) or 3600)
+
+    # ---------------------------------------------------------------- 内部
+    @property
+    def db(self):
+        if self._db is None:
+            from core.db import DB
+            self._db = DB
+        return self._db
+
+    def _session(self):
+        if not self._table_ready:
+            with self._lock:
+                if not self._table_ready:
+                    engine = self.db.get_engine()
+                    QueueJob.__table__.create(bind=engine, checkfirst=True)
+                    if engine.dialect.name in ("sqlite", "postgresql"):
+                        try:
+                            PENDING_DEDUPE_INDEX.create(bind=engine, checkfirst=True)
+                        except Exception as e:
+                            # 已有重复的等待任务时无法建索引，退回查询去重
+                            print_warning(f"创建队列去重索引失败: {e}")
+                    self._table_ready = True
+        return self.db.get_session()
+
+    def _update(self, where, values: dict) -> int:
+        session = self._session()
+        try:
+            values = dict(values)
+            values["updated_at"] = datetime.now()
+            result = session.execute(update(QueueJob).where(where).values(**values))
+            session.commit()
+            return result.rowcount or 0
+        except Exception:
+            session.rollback()
+            raise
+
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次失败后的等待时间(指数退避+抖动)"""
+        delay = min(self.retry_backoff_max, self.retry_backoff * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def to_dict(job: QueueJob) -> dict:
+        payload = {}
+        try:
+            payload = json.loads(job.payload or "{}")
+        except Exception:
+            pass
+        return {
+            "id": job.id,
+            "queue": job.queue,
+            "name": job.name,
+            "args": payload.get("args", []),
+            "kwargs": payload.get("kwargs", {}),
+            "timeout": payload.get("timeout"),
+            "tag": job.tag or "",
+            "dedupe_key": job.dedupe_key,
+            "priority": job.priority,
+            "status": job.status,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "run_at": job.run_at,
+            "lease_until": job.lease_until,
+            "worker_id": job.worker_id,
+            "last_error": job.last_error,
+        }
+
+    # ---------------------------------------------------------------- 生产者
+    def enqueue(self, name: str, args: Iterable[Any] = (), kwargs: dict = None, priority: int = 100,
+                delay: float = 0, max_attempts: int = None, dedupe_key: str = None, tag: str = "",
+                replace: bool = False, dedupe_running: bool = True, timeout: float = None) -> int:
+        """写入任务并返回任务ID，参数同 submit"""
+        return self.submit(name, args, kwargs, priority=priority, delay=delay, max_attempts=max_attempts,
+                           dedupe_key=dedupe_key, tag=tag, replace=replace, dedupe_running=dedupe_running,
+                           timeout=timeout)[0]
+
+    def submit(self, name: str, args: Iterable[Any] = (), kwargs: dict = None, priority: int = 100,
+               delay: float = 0, max_attempts: int = None, dedupe_key: str = None, tag: str = "",
+               replace: bool = False, dedupe_running: bool = True, timeout: float = None) -> tuple[int, bool]:
+        """写入任务，返回 (任务ID, 是否新写入)，args/kwargs 必须可JSON序列化
+
+        dedupe_key 相同且未完成的任务只保留一个，返回已有任务ID(是否新写入为False)：
+        等待中的任务会提升到两者中更高的优先级，replace=True 时以新参数覆盖(最新者为准)；
+        dedupe_running=False 时只与等待中的任务合并，执行中的任务不影响新任务写入。
+        timeout 为执行期限(秒)，不指定时由执行方按分组决定。
+        """
+        data = {"args": list(args or []), "kwargs": kwargs or {}}
+        if timeout is not None:
+            data["timeout"] = timeout
+        payload = json.dumps(data, ensure_ascii=False)
+        session = self._session()
+        statuses = [PENDING, RUNNING] if dedupe_running else [PENDING]
+        # 第二轮：并发写入同键任务时插入被唯一索引拒绝，重新查询并合并
+        for _ in range(2):
+            try:
+                if dedupe_key:
+                    existing = (
+                        session.query(QueueJob.id, QueueJob.status, QueueJob.priority)
+                        .filter(QueueJob.queue == self.name, QueueJob.dedupe_key == dedupe_key)
+                        .filter(QueueJob.status.in_(statuses))
+                        .first()
+                    )
+                    session.commit()
+                    if existing is not None:
+                        job_id, status, current = existing
+                        values = {}
+                        if status == PENDING and int(priority) < (current if current is not None else 100):
+                            values["priority"] = int(priority)
+                        if status == PENDING and replace:
+                            values["payload"] = payload
+                        if values:
+                            self._update(and_(QueueJob.id == job_id, QueueJob.status == PENDING), values)
+                        return job_id, False
+                now = datetime.now()
+                job = QueueJob(
+                    queue=self.name,
+                    name=name,
+                    payload=payload,
+                    tag=tag or "",
+                    dedupe_key=dedupe_key,
+                    priority=int(priority),
+                    status=PENDING,
+                    attempts=0,
+                    max_attempts=int(max_attempts or self.max_attempts),
+                    run_at=int(time.time() + (delay or 0)),
+                    created_at=now,
+                    updated_at=now,
+                )
+                session.add(job)
+                session.commit()
+                return job.id, True
+            except IntegrityError:
+                session.rollback()
+                if not dedupe_key:
+                    raise
+            except Exception:
+                session.rollback()
+                raise
+        raise RuntimeError(f"任务去重写入失败: {dedupe_key}")
+
+    # ---------------------------------------------------------------- 消费者
+    def _reap(self, now: int) -> None:
+        """租约过期且已达最大重试次数的任务转入死信"""
+        self._update(
+            and_(
+                QueueJob.queue == self.name,
+                QueueJob.status == RUNNING,
+                QueueJob.lease_until < now,
+                QueueJob.attempts >= QueueJob.max_attempts,
+            ),
+            {"status": DEAD, "last_error": "租约过期(worker失联)", "finished_at": datetime.now()},
+        )
+
+    def _claimable(self, now: int):
+        return and_(
+            QueueJob.queue == self.name,
+            or_(
+                and_(QueueJob.status == PENDING, QueueJob.run_at <= now),
+                and_(QueueJob.status == RUNNING, QueueJob.lease_until < now),
+            ),
+        )
+
+    def claim(self, worker_id: str, names: Iterable[str] = None, lease: int = None,
+              exclude_tags: Iterable[str] = None, max_priority: int = None) -> Optional[dict]:
+        """领取一个可执行任务，返回任务字典；没有任务时返回None
+
+        exclude_tags 跳过已达并发上限的分组，max_priority 只领取优先级数值小于该值的任务
+        """
+        now = int(time.time())
+        lease = int(lease or self.lease)
+        self._reap(now)
+        session = self._session()
+        query = session.query(QueueJob.id).filter(self._claimable(now))
+        if names:
+            query = query.filter(QueueJob.name.in_(list(names)))
+        if exclude_tags:
+            query = query.filter(QueueJob.tag.notin_(list(exclude_tags)))
+        if max_priority is not None:
+            query = query.filter(QueueJob.priority < int(max_priority))
+        candidates = [row[0] for row in query.order_by(QueueJob.priority.asc(), QueueJob.id.asc()).limit(10).all()]
+        session.commit()
+        for job_id in candidates:
+            # 条件更新保证同一任务只会被一个 worker 抢到
+            claimed = self._update(
+                and_(QueueJob.id == job_id, self._claimable(now)),
+                {
+                    "status": RUNNING,
+                    "worker_id": worker_id,
+                    "lease_until": now + lease,
+                    "attempts": QueueJob.attempts + 1,
+                },
+            )
+            if claimed:
+                job = session.query(QueueJob).filter(QueueJob.id == job_id).first()
+                data = self.to_dict(job)
+                session.commit()
+                return data
+        return None
+
+    def heartbeat(self, job_id: int, worker_id: str, lease: int = None) -> bool:
+        """续约，返回False表示任务已被其它 worker 接管"""
+        lease = int(lease or self.lease)
+        return self._update(
+            and_(QueueJob.id == job_id, QueueJob.worker_id == worker_id, QueueJob.status == RUNNING),
+            {"lease_until": int(time.time()) + lease},
+        ) > 0
+
+    def keepalive(self, job_id: int, worker_id: str, lease: int = None) -> threading.Event:
+        """启动后台续约线程(每1/3租约续约一次)，任务结束时对返回的 Event 调用 set()"""
+        lease = int(lease or self.lease)
+        finished = threading.Event()
+
+        def _beat():
+            while not finished.wait(max(1.0, lease / 3)):
+                try:
+                    if not self.heartbeat(job_id, worker_id, lease):
+                        print_warning(f"任务#{job_id}租约已丢失，可能被其它worker接管")
+                        return
+                except Exception as e:
+                    print_warning(f"任务#{job_id}续约失败: {e}")
+
+        threading.Thread(target=_beat, name=f"heartbeat-{job_id}", daemon=True).start()
+        return finished
+
+    def complete(self, job_id: int, worker_id: str = None) -> bool:
+        where = and_(QueueJob.id == job_id, QueueJob.status == RUNNING)
+        if worker_id:
+            where = and_(where, QueueJob.worker_id == worker_id)
+        return self._update(where, {"status": DONE, "lease_until": None, "finished_at": datetime.now()}) > 0
+
+    def fail(self, job_id: int, worker_id: str = None, error: str = "", retry: bool = True) -> str:
+        """标记失败，未超过最大次数时按退避时间重新排队，返回 retry/dead
+
+        任务已不属于 worker_id(租约过期后被其它 worker 接管)时不做修改，返回 lost
+        """
+        session = self._session()
+        job = session.query(QueueJob).filter(QueueJob.id == job_id).first()
+        session.commit()
+        if job is None:
+            return "dead"
+        where = and_(QueueJob.id == job_id, QueueJob.status == RUNNING)
+        if worker_id:
+            where = and_(where, QueueJob.worker_id == worker_id)
+        error = str(error or "")[:2000]
+        if retry and (job.attempts or 0) < (job.max_attempts or 1):
+            try:
+                updated = self._update(where, {
+                    "status": PENDING,
+                    "run_at": int(time.time() + self.backoff(job.attempts or 1)),
+                    "lease_until": None,
+                    "last_error": error,
+                })
+            except IntegrityError:
+                # 执行期间已有同键任务重新入队，由它完成重试
+                updated = self._update(where, {"status": DONE, "lease_until": None, "finished_at": datetime.now(),
+                                               "last_error": f"已合并到等待中的同键任务: {error}"[:2000]})
+            return "retry" if updated else "lost"
+        if not self._update(where, {"status": DEAD, "lease_until": None, "last_error": error,
+                                    "finished_at": datetime.now()}):
+            return "lost"
+        print_warning(f"任务进入死信: {job.name}#{job_id} {error}")
+        return "dead"
+
+    # ---------------------------------------------------------------- 管理
+    def replay_dead(self, ids: Iterable[int] = None) -> int:
+        """将死信任务重新投递(已有等待中的同键任务时跳过)"""
+        where = and_(QueueJob.queue == self.name, QueueJob.status == DEAD)
+        if ids:
+            where = and_(where, QueueJob.id.in_(list(ids)))
+        session = self._session()
+        job_ids = [row[0] for row in session.query(QueueJob.id).filter(where).all()]
+        session.commit()
+        count = 0
+        for job_id in job_ids:
+            try:
+                count += self._update(
+                    and_(QueueJob.id == job_id, QueueJob.status == DEAD),
+                    {"status": PENDING, "attempts": 0, "run_at": int(time.time()), "last_error": None},
+                )
+            except IntegrityError:
+                continue
+        return count
+
+    def cancel_pending(self) -> int:
+        """丢弃尚未开始执行的任务(直接转入死信，可用 replay_dead 恢复)"""
+        return self._update(
+            and_(QueueJob.queue == self.name, QueueJob.status == PENDING),
+            {"status": DEAD, "last_error": "已取消", "finished_at": datetime.now()},
+        )
+
+    def purge(self, older_than_days: int = 7) -> int:
+        """删除已完成的旧任务"""
+        session = self._session()
+        try:
+            threshold = datetime.fromtimestamp(time.time() - older_than_days * 86400)
+            count = (
+                session.query(QueueJob)
+                .filter(QueueJob.queue == self.name, QueueJob.status == DONE, QueueJob.finished_at < threshold)
+                .delete(synchronize_session=False)
+            )
+            session.commit()
+            return count
+        except Exception:
+            session.rollback()
+            raise
+
+    def stats(self) -> dict:
+        session = self._session()
+        rows = (
+            session.query(QueueJob.status, func.count(QueueJob.id))
+            .filter(QueueJob.queue == self.name)
+            .group_by(QueueJob.status)
+            .all()
+        )
+        session.commit()
+        counts = {status: count for status, count in rows}
+        return {
+            "queue": self.name,
+            "pending": counts.get(PENDING, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "dead": counts.get(DEAD, 0),
+        }
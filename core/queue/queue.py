@@ -1,121 +1,573 @@
-import queue
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import socket
 import threading
 import time
-import gc
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Optional, Union
+from core.cancel import CancelToken, TaskCancelled, bind
+from core.monitor import RateCounter, Window, register_queue
 from core.print import print_error, print_info, print_warning, print_success
+from .registry import resolve_task, task_name, task_tag
+
+# 优先级分类，数值越小越先执行：交互(用户手动触发) > 默认 > 批量(回填/预热)
+PRIORITY_INTERACTIVE = 10
+PRIORITY_DEFAULT = 100
+PRIORITY_BULK = 300
+PRIORITIES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "default": PRIORITY_DEFAULT,
+    "bulk": PRIORITY_BULK,
+}
+
+# 各分组默认的并发上限(0表示不限，仅受工作线程数约束)，可通过 queue.limits.<tag> 覆盖
+DEFAULT_TAG_LIMITS = {
+    "crawl": 1,
+    "content": 1,
+    "insights": 2,
+}
+
+# 各分组默认的执行期限(秒，0表示不限)，可通过 queue.timeouts.<tag> 覆盖，其它分组使用 queue.timeout
+DEFAULT_TAG_TIMEOUTS = {
+    "crawl": 1800,
+    "content": 3600,
+    "insights": 600,
+}
+
+
+def tag_timeout(tag: str) -> float:
+    """分组默认执行期限(秒)，0表示不限"""
+    from core.config import cfg
+    default=DEFAULT_TAG_TIMEOUTS.get(tag,cfg.get("queue.timeout",1800))
+    return float(cfg.get(f"queue.timeouts.{tag}",default) or 0)
+
+
 class TaskQueueManager:
-    """任务队列管理器，用于管理和执行排队任务"""
-    
-    def __init__(self,maxsize=0,tag:str=""):
-        """初始化任务队列"""
-        self._queue = queue.Queue(maxsize=maxsize)
+    """任务队列管理器，用于管理和执行排队任务
+
+    由多个工作线程并发执行，按优先级取任务，同一分组(tag)同时执行的任务数受并发上限约束，
+    避免批量回填占满线程导致用户手动触发的任务长时间等待。
+
+    已注册(core.queue.register_task)且参数可JSON序列化的任务写入数据库队列(queue_jobs)，
+    进程重启后继续执行，失败按退避重试，超过最大次数进入死信；
+    其余任务(如参数为回调函数、ORM对象)仍在进程内存中排队执行。
+
+    相同幂等键(_key，已注册任务默认取任务名+参数)的任务在等待期间只保留一个，
+    重复添加时合并(并提升到更高的优先级)；_latest=True 时以最后一次添加的参数为准。
+
+    每个任务有执行期限(_timeout 或按分组配置)，执行时向线程绑定取消令牌(core.cancel)，
+    采集/抓取循环据此提前退出；超过期限仍未返回的任务由看门狗回收：
+    释放分组名额、持久化任务按失败重试，并启动新的工作线程替换卡住的线程。
+    """
+
+    def __init__(self,maxsize=0,tag:str="",name:str=None,durable:bool=None,workers:int=None):
+        """初始化任务队列
+
+        Args:
+            maxsize: 内存队列容量
+            tag: 日志显示的队列名称
+            name: 数据库队列名称，不同名称的队列互不影响
+            durable: 是否启用持久化，默认读取配置 queue.durable
+            workers: 工作线程数，默认读取配置 queue.workers
+        """
+        from core.config import cfg
+        self.maxsize = maxsize
+        self._heap = []
+        # 幂等键 -> 等待中的内存任务条目
+        self._pending_keys = {}
+        self._seq = itertools.count()
         self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
         self._is_running = False
+        self._running_tags = {}
+        self._limits = {}
         self.tag=tag
-        
-    def add_task(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self.name=name or "default"
+        if durable is None:
+            durable=str(cfg.get("queue.durable",True)).lower()=="true"
+        self.durable=durable
+        self.workers=max(1,int(workers or cfg.get("queue.workers",4) or 4))
+        self.poll=float(cfg.get("queue.poll",2) or 2)
+        # 超过期限后再等待多久仍未返回则回收工作线程
+        self.grace=float(cfg.get("queue.watchdog_grace",60) or 0)
+        self._timeouts={}
+        self._worker_seq=itertools.count()
+        self.worker_id=f"{socket.gethostname()}-{os.getpid()}-{self.name}"
+        self._store=None
+        # 数据库队列最近一次为空的截止时间，期间工作线程不再查询数据库
+        self._db_idle_until=0.0
+        self._db_blocked=False
+        # 同一时间只有一个工作线程访问数据库领取任务(领取时不持有 _cond)
+        self._claiming=False
+        self.stats={"done":0,"failed":0,"coalesced":0}
+        # 运行指标：入队速率、排队等待/执行耗时分位数、正在执行的任务
+        self._enqueued=RateCounter()
+        self._wait=Window()
+        self._run=Window()
+        self._in_flight={}
+        # 工作线程名 -> 当前任务的取消令牌
+        self._tokens={}
+        self.recycled=0
+        register_queue(self)
+
+    @property
+    def store(self):
+        """数据库租约队列(延迟创建，避免导入时连接数据库)"""
+        if self._store is None:
+            from .lease import LeaseQueue
+            self._store=LeaseQueue(self.name)
+        return self._store
+
+    def limit(self, tag: str) -> int:
+        """分组并发上限，0表示不限"""
+        if tag not in self._limits:
+            from core.config import cfg
+            self._limits[tag]=int(cfg.get(f"queue.limits.{tag}",DEFAULT_TAG_LIMITS.get(tag,0)) or 0)
+        return self._limits[tag]
+
+    def timeout(self, tag: str) -> float:
+        """分组默认执行期限(秒)，0表示不限"""
+        if tag not in self._timeouts:
+            self._timeouts[tag]=tag_timeout(tag)
+        return self._timeouts[tag]
+
+    @staticmethod
+    def priority(value: Union[int, str, None]) -> int:
+        if value is None:
+            return PRIORITY_DEFAULT
+        if isinstance(value, str):
+            return PRIORITIES.get(value, PRIORITY_DEFAULT)
+        return int(value)
+
+    def _durable_payload(self, name: Optional[str], args: tuple, kwargs: dict) -> bool:
+        """任务已注册且参数可序列化时写入数据库队列"""
+        if not self.durable or not name:
+            return False
+        try:
+            json.dumps({"args":list(args),"kwargs":kwargs})
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    @staticmethod
+    def task_key(name: Optional[str], args: tuple, kwargs: dict) -> Optional[str]:
+        """已注册任务的默认幂等键：任务名+参数，参数不可序列化时返回None"""
+        if not name:
+            return None
+        try:
+            params=json.dumps([list(args),kwargs],sort_keys=True,ensure_ascii=False,separators=(",",":"))
+        except (TypeError, ValueError):
+            return None
+        key=f"{name}:{params}"
+        if len(key)>200:
+            key=f"{name}:{hashlib.md5(params.encode('utf-8')).hexdigest()}"
+        return key
+
+    def add_task(self, task: Callable[..., Any], *args: Any, _priority: Union[int, str] = None,
+                 _tag: str = None, _key: Union[str, bool] = None, _latest: bool = False,
+                 _timeout: float = None, **kwargs: Any) -> bool:
         """添加任务到队列
-        
+
         Args:
             task: 要执行的任务函数
             *args: 任务函数的参数
+            _priority: 优先级，interactive/default/bulk 或数值(越小越先执行)
+            _tag: 并发分组，默认取注册任务的分组，未注册任务为 default
+            _key: 幂等键，已注册任务默认取任务名+参数，传 False 不去重
+            _latest: 与等待中的同键任务合并时以本次参数为准(适用于刷新类任务)
+            _timeout: 执行期限(秒)，默认按分组配置，0表示不限
             **kwargs: 任务函数的关键字参数
+
+        返回:
+            bool: 新增任务返回True，与等待中的任务合并返回False
         """
-        with self._lock:
-            self._queue.put((task, args, kwargs))
+        priority=self.priority(_priority)
+        name=task_name(task)
+        tag=_tag or task_tag(name)
+        key=None if _key is False else (_key or self.task_key(name,args,kwargs))
+        if self._durable_payload(name,args,kwargs):
+            try:
+                # 只与等待中的任务合并：执行中的任务可能读到的是旧数据，需要再执行一次
+                job_id,created=self.store.submit(name,args=args,kwargs=kwargs,priority=priority,tag=tag,
+                                                 dedupe_key=key,replace=_latest,dedupe_running=False,timeout=_timeout)
+                if not created:
+                    # 与等待中的同键任务合并(可能提升了优先级)，唤醒调度重新取任务
+                    with self._cond:
+                        self.stats["coalesced"]+=1
+                        self._db_idle_until=0.0
+                        self._cond.notify()
+                    return False
+                self._enqueued.inc()
+                with self._cond:
+                    self._db_idle_until=0.0
+                    self._cond.notify()
+                print_success(f"{self.tag}队列任务添加成功 {name}#{job_id}\n")
+                return True
+            except Exception as e:
+                print_warning(f"{self.tag}持久化任务写入失败，改为内存队列: {e}")
+        with self._cond:
+            entry=self._pending_keys.get(key) if key else None
+            if entry is not None:
+                if _latest:
+                    entry[3],entry[4],entry[5]=task,args,kwargs
+                if priority<entry[0]:
+                    entry[0]=priority
+                    heapq.heapify(self._heap)
+                self.stats["coalesced"]+=1
+                self._cond.notify_all()
+                return False
+            while self.maxsize and len(self._heap)>=self.maxsize:
+                self._cond.wait()
+            entry=[priority,next(self._seq),tag,task,args,kwargs,key,time.time(),_timeout]
+            heapq.heappush(self._heap,entry)
+            if key:
+                self._pending_keys[key]=entry
+            self._cond.notify_all()
+        self._enqueued.inc()
         print_success(f"{self.tag}队列任务添加成功\n")
+        return True
+
     def run_task_background(self)->None:
-        threading.Thread(target=self.run_tasks, daemon=True).start()  
+        threading.Thread(target=self.run_tasks, daemon=True).start()
         print_warning("队列任务后台运行")
+
+    # ---------------------------------------------------------------- 调度
+    def _available(self, tag: str) -> bool:
+        limit=self.limit(tag)
+        return not limit or self._running_tags.get(tag,0)<limit
+
+    def _blocked_tags(self) -> list:
+        return [tag for tag in self._running_tags if not self._available(tag)]
+
+    def _peek_memory(self) -> Optional[int]:
+        """返回可执行的最高优先级内存任务下标(需持有锁)"""
+        if not self._heap:
+            return None
+        if self._available(self._heap[0][2]):
+            return 0
+        best=None
+        for index,entry in enumerate(self._heap):
+            if self._available(entry[2]) and (best is None or entry[:2]<self._heap[best][:2]):
+                best=index
+        return best
+
+    def _pop_memory(self, index: int) -> list:
+        if index==0:
+            entry=heapq.heappop(self._heap)
+        else:
+            entry=self._heap[index]
+            self._heap[index]=self._heap[-1]
+            self._heap.pop()
+            heapq.heapify(self._heap)
+        if entry[6] and self._pending_keys.get(entry[6]) is entry:
+            del self._pending_keys[entry[6]]
+        return entry
+
+    def _next(self) -> Optional[tuple]:
+        """取下一个要执行的任务，返回 (类型, 任务, 分组)；暂无任务时等待后返回None"""
+        with self._cond:
+            index=self._peek_memory()
+            claim=self.durable and not self._claiming and time.time()>=self._db_idle_until
+            if claim:
+                max_priority=self._heap[index][0] if index is not None else None
+                blocked=self._blocked_tags()
+                self._claiming=True
+        if claim:
+            # 数据库I/O(回收过期租约+条件更新)不持有锁，避免 add_task/_release 等被慢查询阻塞
+            job=None
+            try:
+                job=self._claim(max_priority,blocked)
+            finally:
+                with self._cond:
+                    self._claiming=False
+                    if job is not None:
+                        tag=job["tag"] or "default"
+                        self._running_tags[tag]=self._running_tags.get(tag,0)+1
+                    else:
+                        self._db_idle_until=time.time()+self.poll
+                        self._db_blocked=bool(blocked)
+            if job is not None:
+                return ("durable",job,job["tag"] or "default")
+        with self._cond:
+            # 领取期间队列可能已变化，重新选择内存任务
+            index=self._peek_memory()
+            if index is not None:
+                entry=self._pop_memory(index)
+                self._running_tags[entry[2]]=self._running_tags.get(entry[2],0)+1
+                self._cond.notify_all()
+                return ("memory",entry,entry[2])
+            # 无任务时等待新任务写入/分组释放，或超时后重新检查数据库(重试/其它进程投递的任务)
+            self._cond.wait(self.poll)
+            return None
+
+    def _claim(self, max_priority: Optional[int], exclude_tags: list) -> Optional[dict]:
+        try:
+            return self.store.claim(self.worker_id,exclude_tags=exclude_tags,max_priority=max_priority)
+        except Exception as e:
+            print_error(f"{self.tag}领取持久化任务失败: {e}")
+            return None
+
+    def _release(self, tag: str) -> None:
+        with self._cond:
+            self._running_tags[tag]=max(0,self._running_tags.get(tag,0)-1)
+            if self._db_blocked:
+                # 有数据库任务因分组并发上限被跳过，分组释放后立即重新领取
+                self._db_idle_until=0.0
+                self._db_blocked=False
+            self._cond.notify_all()
+
+    def _run_memory(self, entry: list, token: CancelToken) -> None:
+        task,args,kwargs=entry[3],entry[4],entry[5]
+        try:
+            # 记录任务开始时间
+            start_time = time.time()
+            # 正常返回即视为完成(即使刚好超过期限)；只有抛出 TaskCancelled 才按取消处理
+            task(*args, **kwargs)
+            # 记录任务执行时间
+            duration = time.time() - start_time
+            self.stats["done"]+=1
+            print_info(f"\n任务执行完成，耗时: {duration:.2f}秒")
+        except Exception as e:
+            if self._abandoned(token):
+                return
+            self.stats["failed"]+=1
+            print_error(f"队列任务执行失败: {e}")
+
+    def _run_job(self, job: dict, token: CancelToken) -> None:
+        """执行数据库队列中的任务，执行期间续约，失败交由 LeaseQueue 重试/死信"""
+        finished=self.store.keepalive(job["id"],self.worker_id)
+        start_time = time.time()
+        try:
+            func=resolve_task(job["name"])
+            if func is None:
+                raise Exception(f"未注册的任务: {job['name']}")
+            # 正常返回即视为完成：按失败重试会重复执行采集/推送等副作用
+            func(*job["args"],**job["kwargs"])
+            if self._abandoned(token):
+                return
+            self.store.complete(job["id"],self.worker_id)
+            self.stats["done"]+=1
+            print_info(f"\n任务执行完成 {job['name']}#{job['id']}，耗时: {time.time() - start_time:.2f}秒")
+        except Exception as e:
+            if self._abandoned(token):
+                # 看门狗已按失败处理并重新排队
+                return
+            self.stats["failed"]+=1
+            result=self.store.fail(job["id"],self.worker_id,str(e))
+            print_error(f"队列任务执行失败 {job['name']}#{job['id']}({result}): {e}")
+        finally:
+            finished.set()
+
+    def _abandoned(self, token: CancelToken) -> bool:
+        return getattr(token, "abandoned", False)
+
+    def _worker_loop(self) -> None:
+        worker=threading.current_thread().name
+        while self._is_running:
+            item=self._next()
+            if item is None:
+                continue
+            kind,payload,tag=item
+            start_time=time.time()
+            if kind=="durable":
+                name=payload["name"]
+                queued_at=payload.get("run_at") or start_time
+                timeout=payload.get("timeout")
+            else:
+                name=task_name(payload[3]) or getattr(payload[3],"__qualname__",str(payload[3]))
+                queued_at=payload[7]
+                timeout=payload[8]
+            if timeout is None:
+                timeout=self.timeout(tag)
+            token=CancelToken(timeout,name=name)
+            token.abandoned=False
+            token.job=payload if kind=="durable" else None
+            self._wait.add(start_time-queued_at)
+            with self._lock:
+                self._in_flight[worker]={"task":name,"tag":tag,"started":int(start_time),"timeout":timeout}
+                self._tokens[worker]=token
+            previous=bind(token)
+            try:
+                if kind=="durable":
+                    self._run_job(payload,token)
+                else:
+                    self._run_memory(payload,token)
+            finally:
+                bind(previous)
+                self._run.add(time.time()-start_time)
+                with self._lock:
+                    abandoned=token.abandoned
+                    if not abandoned:
+                        self._in_flight.pop(worker,None)
+                        self._tokens.pop(worker,None)
+                if abandoned:
+                    # 已被看门狗回收(名额已释放、替换线程已启动)，本线程直接退出
+                    print_warning(f"{self.tag}已回收的工作线程 {worker} 任务 {name} 最终返回，线程退出")
+                    return
+                self._release(tag)
+
+    def _start_worker(self) -> threading.Thread:
+        thread=threading.Thread(target=self._worker_loop,name=f"{self.name}-worker-{next(self._worker_seq)}",daemon=True)
+        thread.start()
+        return thread
+
+    def _watchdog(self, interval: float = 5.0) -> None:
+        """检查执行中的任务：超过期限时取消，超过期限+宽限期仍未返回时回收工作线程"""
+        while self._is_running:
+            time.sleep(interval)
+            now=time.time()
+            with self._lock:
+                items=list(self._tokens.items())
+            for worker,token in items:
+                if not token.cancelled() or token.deadline is None:
+                    continue
+                if now<token.deadline+self.grace or token.abandoned:
+                    continue
+                with self._lock:
+                    if self._tokens.get(worker) is not token:
+                        continue
+                    token.abandoned=True
+                    info=self._in_flight.pop(worker,{})
+                    self._tokens.pop(worker,None)
+                    self.recycled+=1
+                self.stats["failed"]+=1
+                print_error(f"{self.tag}任务 {info.get('task')} 超过期限{int(now-token.started)}秒仍未结束，回收工作线程 {worker}")
+                if token.job is not None:
+                    try:
+                        self.store.fail(token.job["id"],self.worker_id,f"执行超时({token.reason})，工作线程已回收")
+                    except Exception as e:
+                        print_error(f"{self.tag}标记超时任务失败: {e}")
+                self._release(info.get("tag","default"))
+                if self._is_running:
+                    self._start_worker()
+
     def run_tasks(self, timeout: float = 1.0) -> None:
-        """执行队列中的所有任务，并持续运行以接收新任务
-        
+        """启动工作线程执行队列中的任务，并持续运行以接收新任务，直到 stop() 被调用
+
         Args:
-            timeout: 等待新任务的超时时间(秒)
+            timeout: 等待工作线程退出的检查间隔(秒)
         """
         with self._lock:
             if self._is_running:
                 return
             self._is_running = True
-            
+
         try:
-            while self._is_running:
-                time.sleep(0.1)  # 避免过于频繁的任务获取 
-                try:
-                    # 阻塞获取任务，避免CPU空转
-                    task, args, kwargs = self._queue.get(timeout=timeout)
-                    
-                    try:
-                        # 记录任务开始时间
-                        start_time = time.time()
-                        task(*args, **kwargs)
-                        # 记录任务执行时间
-                        duration = time.time() - start_time
-                        print_info(f"\n任务执行完成，耗时: {duration:.2f}秒")
-                    except Exception as e:
-                        print_error(f"队列任务执行失败: {e}")
-                        # raise
-                    finally:
-                        # 确保任务完成标记和资源释放
-                        self._queue.task_done()
-                        # 强制垃圾回收
-                        gc.collect()
-                    
-                except queue.Empty:
-                    # 超时无任务，继续检查运行状态
-                    continue
-                    
+            for _ in range(self.workers):
+                self._start_worker()
+            # 看门狗在当前线程运行，stop() 后退出
+            self._watchdog(max(timeout,1.0))
         finally:
-            # 确保停止状态设置和资源清理
+            # 确保停止状态设置
             with self._lock:
                 self._is_running = False
-            # 清理可能残留的资源
-            gc.collect()
-    
+
     def stop(self) -> None:
-        """停止任务执行"""
-        with self._lock:
+        """停止任务执行(正在执行的任务会执行完)"""
+        with self._cond:
             self._is_running = False
-    
+            self._cond.notify_all()
+
     def get_queue_info(self) -> dict:
         """
         获取队列的当前状态信息
-        
+
         返回:
             dict: 包含队列信息的字典，包括:
                 - is_running: 队列是否正在运行
-                - pending_tasks: 等待执行的任务数量
+                - pending_tasks: 等待执行的任务数量(内存+数据库)
+                - workers: 工作线程数
+                - running: 各分组正在执行的任务数
+                - durable: 数据库队列统计(pending/running/done/dead)
         """
+        durable = None
+        if self.durable:
+            try:
+                durable = self.store.stats()
+            except Exception as e:
+                durable = {"error": str(e)}
         with self._lock:
-            return {
-                'is_running': self._is_running,
-                'pending_tasks': self._queue.qsize()
-            }
-            
-    def clear_queue(self) -> None:
-        """清空队列中的所有任务"""
-        with self._lock:
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            print_success("队列已清空")
-            
+            pending = len(self._heap)
+            is_running = self._is_running
+            running = {tag: count for tag, count in self._running_tags.items() if count}
+        if durable and "pending" in durable:
+            pending += durable["pending"]
+        return {
+            'is_running': is_running,
+            'pending_tasks': pending,
+            'workers': self.workers,
+            'running': running,
+            'limits': {tag: self.limit(tag) for tag in set(DEFAULT_TAG_LIMITS) | set(running)},
+            'stats': dict(self.stats),
+            'durable': durable,
+        }
+
+    def get_metrics(self) -> dict:
+        """运行指标(供 core.monitor 汇总为 JSON/Prometheus)"""
+        info=self.get_queue_info()
+        now=time.time()
+        in_flight=[
+            dict(item,worker=worker,elapsed=round(now-item["started"],1))
+            for worker,item in list(self._in_flight.items())
+        ]
+        return {
+            "name":self.name,
+            "tag":self.tag,
+            "is_running":info["is_running"],
+            "workers":self.workers,
+            "pending":info["pending_tasks"],
+            "running":info["running"],
+            "in_flight_count":len(in_flight),
+            "in_flight":in_flight,
+            "enqueued":self._enqueued.total,
+            "enqueue_rate":self._enqueued.rate(),
+            "done":self.stats["done"],
+            "failed":self.stats["failed"],
+            "coalesced":self.stats["coalesced"],
+            "recycled":self.recycled,
+            "wait":self._wait.snapshot(),
+            "run":self._run.snapshot(),
+            "durable":info["durable"],
+        }
+
+    def replay_dead(self, ids: list = None) -> int:
+        """将死信任务重新投递，返回重新投递的数量"""
+        if not self.durable:
+            return 0
+        count = self.store.replay_dead(ids)
+        with self._cond:
+            self._db_idle_until = 0.0
+            self._cond.notify_all()
+        return count
+
+    def clear_queue(self, include_durable: bool = False) -> None:
+        """清空队列中的所有任务
+
+        Args:
+            include_durable: 是否同时丢弃数据库队列中未执行的任务(默认保留，重启后继续执行)
+        """
+        with self._cond:
+            self._heap.clear()
+            self._pending_keys.clear()
+            self._cond.notify_all()
+        if include_durable and self.durable:
+            try:
+                self.store.cancel_pending()
+            except Exception as e:
+                print_error(f"清空持久化队列失败: {e}")
+        print_success("队列已清空")
+
     def delete_queue(self) -> None:
         """删除队列(停止并清空所有任务)"""
-        with self._lock:
+        with self._cond:
             self._is_running = False
-            while not self._queue.empty():
-                try:
-                    self._queue.get_nowait()
-                    self._queue.task_done()
-                except queue.Empty:
-                    break
-            print_success("队列已删除")
-TaskQueue = TaskQueueManager(tag="默认队列")
+            self._heap.clear()
+            self._pending_keys.clear()
+            self._cond.notify_all()
+        print_success("队列已删除")
+TaskQueue = TaskQueueManager(tag="默认队列",name="default")
 TaskQueue.run_task_background()
 if __name__ == "__main__":
     def task1():
@@ -124,7 +576,7 @@ if __name__ == "__main__":
     def task2(name):
         print(f"执行任务2，参数: {name}")
 
-    manager = TaskQueueManager()
+    manager = TaskQueueManager(durable=False, workers=1)
     manager.add_task(task1)
-    manager.add_task(task2, "测试任务")
-    manager.run_tasks()  # 按顺序执行任务1和任务2
\ No newline at end of file
+    manager.add_task(task2, "测试任务", _priority="interactive")
+    manager.run_tasks()  # 先执行任务2(交互优先级)再执行任务1
@@ -0,0 +1,93 @@
+from typing import Any, Callable, Dict, Optional
+
+# 任务名 -> 可调用对象；持久化队列只保存任务名与JSON参数，执行时按名称找回函数
+_TASKS: Dict[str, Callable[..., Any]] = {}
+# 任务名 -> 并发分组标签(队列按标签限制同时执行的数量)
+_TAGS: Dict[str, str] = {}
+
+# 注册了任务的模块；重启后回放任务时若任务尚未注册，会先导入这些模块
+TASK_MODULES = [
+    "core.insights.service",
+    "jobs.worker",
+    "jobs.fetch_no_article",
+    "jobs.auto_update",
+    "apis.mps",
+]
+
+
+def register_task(name: str = None, tag: str = None):
+    """注册可持久化执行的任务
+
+    用法:
+        @register_task("insights.ensure_cached")
+        def ensure_cached(article_id): ...
+
+    也可注册类方法(执行时以无参构造的实例调用):
+        register_task("insights.ensure_cached")(InsightsService.ensure_cached)
+
+    tag 为并发分组，默认取任务名第一段(如 insights)。
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        _TASKS[task_name] = func
+        _TAGS[task_name] = tag or task_name.split(".", 1)[0]
+        try:
+            func.__task_name__ = task_name
+        except (AttributeError, TypeError):
+            pass
+        return func
+    return decorator
+
+
+def get_task(name: str) -> Optional[Callable[..., Any]]:
+    return _TASKS.get(name)
+
+
+def task_tag(name: str, default: str = "default") -> str:
+    return _TAGS.get(name or "", default)
+
+
+def task_name(task: Callable[..., Any]) -> Optional[str]:
+    """返回已注册任务的名称，未注册返回None；绑定方法按其函数查找"""
+    func = getattr(task, "__func__", task)
+    name = getattr(func, "__task_name__", None)
+    if name and _TASKS.get(name) is func:
+        return name
+    for key, value in _TASKS.items():
+        if value is func:
+            return key
+    return None
+
+
+def resolve_task(name: str) -> Optional[Callable[..., Any]]:
+    """按名称取得可直接调用的函数；类方法会构造一个新实例后绑定"""
+    func = _TASKS.get(name)
+    if func is None:
+        _autoload()
+        func = _TASKS.get(name)
+    if func is None:
+        return None
+    qualname = getattr(func, "__qualname__", "")
+    if "." in qualname and "<locals>" not in qualname:
+        import importlib
+
+        module = importlib.import_module(func.__module__)
+        owner = getattr(module, qualname.rsplit(".", 1)[0], None)
+        if isinstance(owner, type):
+            return getattr(owner(), func.__name__)
+    return func
+
+
+def _autoload() -> None:
+    import importlib
+
+    for module in TASK_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            from core.print import print_warning
+            print_warning(f"加载任务模块失败 {module}: {e}")
+
+
+def registered_tasks() -> list:
+    return sorted(_TASKS.keys())
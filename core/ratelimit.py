@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from core.config import cfg
+
+
+class TokenBucket:
+    """令牌桶限流器(线程安全)
+
+    rate 为每秒补充的令牌数，burst 为桶容量(允许的瞬时并发)。
+    rate<=0 表示不限流。
+    """
+
+    def __init__(self, rate: float, burst: int = 1, name: str = ""):
+        self.name = name
+        self.rate = float(rate or 0)
+        self.burst = max(1, int(burst or 1))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """尝试取令牌，成功返回0，否则返回还需等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """阻塞直到取得令牌，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                self.waited += time.monotonic() - start
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def consume(self, tokens: float) -> None:
+        """直接扣减令牌(可为负数表示退还)，用于事后按实际用量校正"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.burst, self._tokens - tokens)
+
+    def get_info(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "waited": round(self.waited, 2),
+            }
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str, rate: float = 1.0, burst: int = 3) -> TokenBucket:
+    """按名称获取进程内共享的限流器，参数优先读取配置 ratelimit.<name>.rate / burst"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = TokenBucket(
+                float(cfg.get(f"ratelimit.{name}.rate", rate) or 0),
+                int(cfg.get(f"ratelimit.{name}.burst", burst) or 1),
+                name=name,
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def get_limiters_info() -> dict:
+    with _limiters_lock:
+        return {name: limiter.get_info() for name, limiter in _limiters.items()}
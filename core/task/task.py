@@ -4,6 +4,8 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from typing import Callable, Any, Optional
 from core.log import logger
+from core.monitor import Window, register_scheduler
+import time
 import uuid
 # 设置日志
 
@@ -12,6 +14,10 @@ class TaskScheduler:
     线程调度器类，支持cron定时任务调度
     使用APScheduler作为底层调度引擎
 
+    多进程/多节点部署时每个实例都会触发定时任务，默认只有选举出的主节点
+    (core.leader.Leader)真正执行，其它实例跳过本次触发；主节点失联后由其它实例接管。
+    leader_only=False 的调度器(如各进程自身的维护任务)不受选举影响。
+
     Cron表达式说明:
     一个cron表达式有5个或6个空格分隔的时间字段，格式为:
         ┌───────────── 秒 (0 - 59) (6位格式)
@@ -44,11 +50,20 @@ class TaskScheduler:
         "0 0 9 * * MON" 每周一上午9点执行 (6位)
     """
     
-    def __init__(self):
-        """初始化调度器和线程锁"""
+    def __init__(self, name: str = "", leader_only: bool = True):
+        """初始化调度器和线程锁
+
+        :param name: 调度器名称(用于运行指标展示)
+        :param leader_only: 是否只在主节点执行任务
+        """
         self._scheduler = BackgroundScheduler()
         self._lock = threading.Lock()
         self._jobs = {}
+        self.name = name or f"scheduler-{id(self):x}"
+        self.leader_only = leader_only
+        # 任务ID -> 执行统计(次数/失败/耗时)
+        self._stats = {}
+        register_scheduler(self)
 
     def add_cron_job(self,
                      func: Callable,
@@ -142,14 +157,27 @@ class TaskScheduler:
                     day_of_week=day_of_week
                 )
                 
-                # 包装任务函数以捕获异常
+                stats = {"tag": tag, "runs": 0, "skipped": 0, "failures": 0, "last_run": None, "last_error": None, "run": Window(256)}
+                self._stats[str(job_id)] = stats
+
+                # 包装任务函数以捕获异常并记录执行统计
                 def wrapped_func(*args, **kwargs):
+                    if self.leader_only and not self._is_leader():
+                        stats["skipped"] += 1
+                        return None
+                    start = time.time()
+                    stats["runs"] += 1
+                    stats["last_run"] = int(start)
                     try:
                         # logger.info(f"Executing job {job_id or 'anonymous'}")
                         return func(*args, **kwargs)
                     except Exception as e:
+                        stats["failures"] += 1
+                        stats["last_error"] = str(e)
                         logger.error(f"Job {tag} {job_id or 'anonymous'} failed: {str(e)}")
                         raise
+                    finally:
+                        stats["run"].add(time.time() - start)
                 
                 job = self._scheduler.add_job(
                     wrapped_func,
@@ -176,6 +204,7 @@ class TaskScheduler:
             if job_id in self._jobs:
                 self._scheduler.remove_job(job_id)
                 del self._jobs[job_id]
+                self._stats.pop(job_id, None)
                 return True
             return False
     
@@ -198,11 +227,23 @@ class TaskScheduler:
                 # 清除所有计划任务
                 self._scheduler.remove_all_jobs()
                 self._jobs.clear()
+                self._stats.clear()
                 logger.info(f"Removed all {job_count} jobs")
             return job_count
     
+    @staticmethod
+    def _is_leader() -> bool:
+        from core.leader import Leader
+        return Leader.is_leader()
+
     def start(self) -> None:
-        """启动调度器"""
+        """启动调度器(同时参与主节点选举)"""
+        if self.leader_only:
+            try:
+                from core.leader import Leader
+                Leader.start()
+            except Exception as e:
+                logger.error(f"Failed to start leader election: {str(e)}")
         with self._lock:
             if self._scheduler.running:
                 logger.warning("Scheduler is already running")
@@ -257,6 +298,32 @@ class TaskScheduler:
                 ]
             }
 
+    def get_metrics(self) -> dict:
+        """运行指标：每个任务的下次触发时间、执行次数、失败次数与耗时分位数"""
+        with self._lock:
+            jobs = []
+            for job_id, job in self._jobs.items():
+                stats = self._stats.get(job_id, {})
+                next_run = getattr(job, "next_run_time", None)
+                jobs.append({
+                    "id": job_id,
+                    "tag": stats.get("tag", ""),
+                    "trigger": str(job.trigger),
+                    "next_run_time": int(next_run.timestamp()) if next_run else None,
+                    "runs": stats.get("runs", 0),
+                    "skipped": stats.get("skipped", 0),
+                    "failures": stats.get("failures", 0),
+                    "last_run": stats.get("last_run"),
+                    "last_error": stats.get("last_error"),
+                    "run": stats["run"].snapshot() if stats.get("run") else None,
+                })
+            return {
+                "name": self.name,
+                "running": self._scheduler.running,
+                "leader": self._is_leader() if self.leader_only else True,
+                "jobs": jobs,
+            }
+
     def get_job_details(self, job_id: str) -> dict:
         """
         获取任务详细信息
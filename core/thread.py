@@ -1,6 +1,9 @@
+import ctypes
 import threading
 import time
 
+from core import cancel
+
 class ThreadManager(threading.Thread):
     """多线程管理类，支持启动、停止和强制停止操作"""
     
@@ -16,6 +19,7 @@ class ThreadManager(threading.Thread):
         self._stop_event = threading.Event()  # 优雅停止标志
         self._force_stop = False  # 强制停止标志
         self._lock = threading.Lock()  # 线程安全锁
+        self.token = cancel.CancelToken(name=name or "")  # 协作式取消令牌，线程内通过 core.cancel 检查
         
     def start(self):
         """启动线程"""
@@ -23,22 +27,42 @@ class ThreadManager(threading.Thread):
             super().start()
         return self
     
+    @property
+    def stopped(self) -> bool:
+        """是否已请求停止"""
+        return self._stop_event.is_set()
+
     def stop(self):
         """优雅停止线程，等待线程完成当前任务"""
         with self._lock:
             self._stop_event.set()
+        self.token.cancel("已停止")
     
-    def force_stop(self):
-        """强制停止线程，不等待任务完成"""
+    def force_stop(self, timeout: float = 5):
+        """强制停止线程，不等待任务完成
+
+        先取消令牌(可取消的等待会立即返回)，timeout 秒后线程仍未退出时
+        向其注入 TaskCancelled 异常(在下一条Python字节码处生效，阻塞在C调用中时需等调用返回)
+        """
         with self._lock:
             self._force_stop = True
             self._stop_event.set()
+        self.token.cancel("已强制停止")
+        if not self.is_alive() or threading.current_thread() is self:
+            return
+        self.join(timeout)
+        if self.is_alive() and self.ident is not None:
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.ident),
+                                                       ctypes.py_object(cancel.TaskCancelled))
     
     def run(self):
         """线程运行逻辑"""
+        cancel.bind(self.token)
         try:
             if self._target:
                 self._target(*self._args, **self._kwargs)
+        except cancel.TaskCancelled:
+            print(f"线程 {self.name} 已取消")
         except Exception as e:
             print(f"线程 {self.name} 发生异常: {e}")
         finally:
@@ -11,6 +11,8 @@ from core.rss import RSS
 from driver.success import setStatus
 from driver.wxarticle import Web
 from core.wait import Wait
+from .seen import SeenArticles, article_key
+from driver.account_pool import Accounts
 import random
 # 定义一些常见的 User-Agent
 USER_AGENTS = [
@@ -37,20 +39,17 @@ USER_AGENTS = [
 ]
 # 定义基类
 class WxGather:
-    articles=[]
-    aids=[]
     def all_count(self):
-        if getattr(self, 'articles', None) is not None:
-            return len(self.articles)
-        return 0
-    def RecordAid(self,aid:str):
-        self.aids.append(aid)
-        pass
-    def HasGathered(self,aid:str):
-        if aid in self.aids:
-            return True
-        self.RecordAid(aid)
-        return False
+        return getattr(self, 'count', 0)
+    def add_sink(self,sink):
+        """注册文章回调，每采集成功一篇即调用 sink(art)，实例本身不保存文章列表"""
+        self._sinks.append(sink)
+        return self
+    def RecordAid(self,aid:str,mp_id:str=""):
+        SeenArticles.add(article_key(mp_id,aid))
+    def HasGathered(self,aid:str,mp_id:str=""):
+        # 有界LRU集合，已采集过返回True，否则记录并返回False
+        return not SeenArticles.add(article_key(mp_id,aid))
     def Model(self,type=None):
         type=type or cfg.get("gather.model","web")
         print(f"采集模式:{type}")
@@ -65,7 +64,9 @@ class WxGather:
             wx=MpsApi()
         return wx
     def __init__(self,is_add:bool=False):
-        self.articles=[]
+        self.count=0
+        self.last_mp_id=""
+        self._sinks=[]
         self.is_add=is_add
         self._cookies={}
         self.start_time = None  # 记录开始时间
@@ -74,12 +75,21 @@ class WxGather:
         session.timeout = timeout
         self.session=session
         self.get_token()
-    def get_token(self):
+    def get_token(self,lease:bool=False):
         cfg.reload()
         wx_cfg.reload()
         self.Gather_Content=cfg.get('gather.content',False)
-        self.cookies = wx_cfg.get('cookie', '')
-        self.token=wx_cfg.get('token','')
+        self.release_account()
+        # 从账号池中选择负载最低的健康账号，lease=True 时占用至 Over()
+        account=Accounts.acquire() if lease else Accounts.pick()
+        if account is not None:
+            self.account_id=account.id if lease else ""
+            self.cookies = account.cookie
+            self.token=account.token
+        else:
+            self.account_id=""
+            self.cookies = wx_cfg.get('cookie', '')
+            self.token=wx_cfg.get('token','')
         # 随机选择一个 User-Agent
         self.user_agent = cfg.get('user_agent', '')
         user_agent = random.choice(USER_AGENTS)
@@ -88,6 +98,31 @@ class WxGather:
             "Cookie":self.cookies,
             "User-Agent": user_agent
         }
+    def release_account(self):
+        if getattr(self,'account_id',""):
+            Accounts.release(self.account_id)
+        self.account_id=""
+    def switch_account(self,code:str)->bool:
+        """当前账号触发频率限制或会话失效时换用下一个健康账号，返回True表示可用新账号重试当前请求"""
+        account_id=getattr(self,'account_id',"")
+        if not account_id or code not in ("Frequency Control","Invalid Session"):
+            return False
+        if code=="Frequency Control":
+            Accounts.cooldown(account_id)
+        else:
+            Accounts.retire(account_id)
+        self.get_token(lease=True)
+        if not self.account_id:
+            return False
+        # 丢弃上一个账号的会话cookie
+        self.session.cookies.clear()
+        print_warning(f"已切换到账号 {self.account_id} 继续采集")
+        return True
+    def acquire_budget(self):
+        """请求公众号平台接口前按当前账号的请求预算等待"""
+        account_id=getattr(self,'account_id',"")
+        if account_id:
+            Accounts.throttle(account_id)
     def fix_header(self,url):
          user_agent = random.choice(USER_AGENTS)
           # 更新请求头
@@ -138,14 +173,23 @@ class WxGather:
                     art['description']=data['digest']
                 if CallBack(art):
                     art["ext"]=Ext_Data
-                    # art.pop("content")
-                    self.articles.append(art)
+                    self.count+=1
+                    self.last_mp_id=art['mp_id']
+                    for sink in self._sinks:
+                        try:
+                            sink(art)
+                        except Exception as e:
+                            print_error(f"文章回调处理失败: {e}")
                 Wait(min=1,max=5,tips=f"获取 {data['title']}...")
 
     #通过公众号码平台接口查询公众号
     def search_Biz(self,kw:str="",limit=10,offset=0):
-
-        self.get_token()
+        self.get_token(lease=True)
+        try:
+            return self._search_Biz(kw,limit,offset)
+        finally:
+            self.release_account()
+    def _search_Biz(self,kw:str="",limit=10,offset=0):
         url = "https://mp.weixin.qq.com/cgi-bin/searchbiz"
         params = {
             "action": "search_biz",
@@ -163,6 +207,7 @@ class WxGather:
             return
         data={}
         try:
+            self.acquire_budget()
             response = requests.get(
             url,
             params=params,
@@ -172,7 +217,7 @@ class WxGather:
             data = response.text  # 解析JSON数据
             msg = json.loads(data)  # 手动解析
             if msg['base_resp']['ret'] == 200013:
-                self.Error("frequencey control, stop at {}".format(str(kw)))
+                self.Error("frequencey control, stop at {}".format(str(kw)),code="Frequency Control")
                 return
             if msg['base_resp']['ret'] != 0:
                 self.Error("错误原因:{}:代码:{}".format(msg['base_resp']['err_msg'],msg['base_resp']['ret']),code="Invalid Session")
@@ -187,8 +232,9 @@ class WxGather:
     
     
     def Start(self,mp_id=None):
-        self.articles=[]
-        self.get_token()
+        self.count=0
+        self.last_mp_id=""
+        self.get_token(lease=True)
         if self.token=="" or self.token is None:
              self.Error("请先扫码登录公众号平台")
              return
@@ -208,8 +254,15 @@ class WxGather:
         self.Wait(tips=f"{item['mps_title']} 处理完成",min=3,max=10)
         pass
     def Error(self,error:str,code=None):
+        account_id=getattr(self,'account_id',"")
         self.Over()
+        if code=="Frequency Control" and account_id:
+            Accounts.cooldown(account_id)
         if code=="Invalid Session":
+            # 仅下线当前账号，仍有其它健康账号时保留队列由其它账号继续采集
+            if account_id and Accounts.retire(account_id)>0:
+                print_error(error)
+                return
             from jobs.failauth import send_wx_code
             import threading
             setStatus(False)
@@ -223,20 +276,15 @@ class WxGather:
 
     def Over(self,CallBack=None):
         import time
+        self.release_account()
         end_time = time.time()
         execution_time = 0
         if self.start_time is not None:
             execution_time = end_time - self.start_time
         
-        if getattr(self, 'articles', None) is not None:
-            print(f"成功{len(self.articles)}条")
-            rss=RSS()
-            mp_id=""
-            try:
-                mp_id=self.articles[0]['mp_id']
-            except:
-                pass
-            rss.clear_cache(mp_id=mp_id)  
+        print(f"成功{self.all_count()}条")
+        rss=RSS()
+        rss.clear_cache(mp_id=getattr(self, 'last_mp_id', ""))
         
         # 输出执行时间统计
         if execution_time > 0:
@@ -253,7 +301,7 @@ class WxGather:
                 print(f"执行耗时: {hours}小时{minutes}分{seconds:.2f}秒")
         
         if CallBack is not None:
-            CallBack(self.articles)
+            CallBack(self.all_count())
 
     def dateformat(self,timestamp:any):
         from datetime import datetime, timezone
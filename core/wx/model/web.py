@@ -6,7 +6,8 @@ import yaml
 import re
 from bs4 import BeautifulSoup
 from core.wx.base import WxGather
-from core.print import print_error
+from core.print import print_error, print_warning
+from core import cancel
 from core.log import logger
 # 继承 BaseGather 类
 class MpsWeb(WxGather):
@@ -14,8 +15,8 @@ class MpsWeb(WxGather):
     # 重写 content_extract 方法
     def content_extract(self,  url):
         try:
-            from driver.wxarticle import Web as App
-            r = App.get_article_content(url)
+            from driver.article_extract import ArticleExtractor
+            r = ArticleExtractor.extract(url)
             if r!=None:
                 text = r.get("content","")
                 text=self.remove_common_html_elements(text)
@@ -72,23 +73,36 @@ class MpsWeb(WxGather):
         while True:
             if i >= MaxPage:
                 break
+            # 任务被取消或超过执行期限时停止翻页
+            if cancel.cancelled():
+                print_warning(f"[{Mps_title}]采集任务已取消，停止在第{i+1}页")
+                break
             begin = i * count
             params["begin"] = str(begin)
             print(f"第{i+1}页开始爬取\n")
             # 随机暂停几秒，避免过快的请求导致过快的被查到
-            time.sleep(random.randint(0,interval))
+            if not cancel.sleep(random.randint(0,interval)):
+                continue
             try:
+                self.acquire_budget()
                 headers = self.fix_header(url)
-                resp = session.get(url, headers=headers, params = params, verify=False)
+                resp = session.get(url, headers=headers, params = params, verify=False, timeout=(10, 30))
                 
                 msg = resp.json()
                 self._cookies =resp.cookies
                 # 流量控制了, 退出
                 if msg['base_resp']['ret'] == 200013:
-                    super().Error("frequencey control, stop at {}".format(str(begin)))
+                    # 换用其它健康账号重试当前页
+                    if self.switch_account("Frequency Control"):
+                        params["token"]=self.token
+                        continue
+                    super().Error("frequencey control, stop at {}".format(str(begin)),code="Frequency Control")
                     break
                 
                 if msg['base_resp']['ret'] == 200003:
+                    if self.switch_account("Invalid Session"):
+                        params["token"]=self.token
+                        continue
                     super().Error("Invalid Session, stop at {}".format(str(begin)),code="Invalid Session")
                     break
                 if msg['base_resp']['ret'] != 0:
@@ -119,7 +133,7 @@ class MpsWeb(WxGather):
                                         stop_all = True
                                         break
                                     if Gather_Content:
-                                        if not super().HasGathered(item["aid"]):
+                                        if not super().HasGathered(item["aid"],Mps_id):
                                             item["content"] = self.content_extract(item['link'])
                                     else:
                                         item["content"] = ""
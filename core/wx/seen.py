@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from core.config import cfg
+from core.print import print_info, print_warning
+
+
+def article_key(mp_id: str, aid: str) -> str:
+    """与入库文章ID一致的键: {mp_id}-{aid}，去掉 MP_WXS_ 前缀"""
+    return f"{str(mp_id or '')}-{aid}".replace("MP_WXS_", "")
+
+
+class SeenSet:
+    """有界、线程安全的已采集文章集合(LRU)
+
+    超过容量时淘汰最久未访问的键，长期运行的进程内存保持平稳。
+    首次使用时从数据库预加载近 seed_days 天已采集到正文的文章。
+    """
+
+    def __init__(self, capacity: int = None, seed_days: int = None):
+        self.capacity = max(1, int(capacity or cfg.get("gather.seen.capacity", 50000) or 50000))
+        self.seed_days = int(seed_days if seed_days is not None else cfg.get("gather.seen.seed_days", 7) or 0)
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._seeded = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        self._ensure_seeded()
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return True
+            return False
+
+    def _put(self, key: str) -> None:
+        self._items[key] = None
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def add(self, key: str) -> bool:
+        """记录键，已存在返回False，新加入返回True"""
+        self._ensure_seeded()
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return False
+            self._put(key)
+            return True
+
+    def seed(self, keys: Iterable[str]) -> int:
+        count = 0
+        with self._lock:
+            for key in keys:
+                self._put(key)
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def _ensure_seeded(self) -> None:
+        if self._seeded:
+            return
+        with self._lock:
+            if self._seeded:
+                return
+            self._seeded = True
+        if self.seed_days <= 0:
+            return
+        try:
+            count = self.seed(self._load_recent_keys())
+            print_info(f"已从数据库预加载{count}条已采集文章")
+        except Exception as e:
+            print_warning(f"预加载已采集文章失败: {e}")
+
+    def _load_recent_keys(self) -> Iterable[str]:
+        from core.db import DB
+        from core.models.article import Article
+
+        threshold = int(time.time()) - self.seed_days * 86400
+        session = DB.get_session()
+        rows = (
+            session.query(Article.id)
+            .filter(Article.publish_time >= threshold)
+            .filter(Article.content.isnot(None), Article.content != "")
+            .order_by(Article.publish_time.desc())
+            .limit(self.capacity)
+            .all()
+        )
+        # 按发布时间从旧到新写入，最新的文章最后被淘汰
+        return [row[0] for row in reversed(rows)]
+
+
+SeenArticles = SeenSet()
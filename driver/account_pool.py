@@ -0,0 +1,323 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # 非POSIX系统没有跨进程文件锁，只能单进程修改账号池
+    fcntl = None
+
+from core.config import cfg
+from core.print import print_success, print_warning
+from core.ratelimit import TokenBucket
+
+from .store import KeyStore
+
+HEALTHY = "healthy"
+COOLDOWN = "cooldown"
+EXPIRED = "expired"
+
+# 保存到账号池文件的字段(其余为进程内的运行状态)
+_PERSISTED = ("token", "cookie", "name", "fingerprint", "expires_at", "status", "cooldown_until")
+
+
+def _account_id(data: dict, ext_data: dict = None) -> str:
+    """根据登录cookie中的 bizuin/slave_user 识别账号，缺失时退化为名称或token摘要"""
+    jar = SimpleCookie()
+    try:
+        jar.load(str(data.get("cookies_str", "") or ""))
+    except Exception:
+        pass
+    for key in ("bizuin", "slave_user", "data_bizuin"):
+        if key in jar and jar[key].value:
+            return str(jar[key].value)
+    name = str((ext_data or {}).get("wx_app_name", "") or "")
+    if name:
+        return name
+    return hashlib.md5(str(data.get("token", "")).encode("utf-8")).hexdigest()[:12]
+
+
+class WxAccount:
+    """公众号平台登录账号(token+cookie)及其健康状态与请求预算"""
+
+    def __init__(self, id: str, token: str, cookie: str, name: str = "", fingerprint: str = "",
+                 expires_at: int = 0, status: str = HEALTHY, cooldown_until: float = 0):
+        self.id = id
+        self.token = token
+        self.cookie = cookie
+        self.name = name
+        self.fingerprint = fingerprint
+        self.expires_at = int(expires_at or 0)
+        self.status = status
+        self.cooldown_until = float(cooldown_until or 0)
+        self.in_flight = 0
+        self.requests = 0
+        self.last_used = 0.0
+        self.limiter = TokenBucket(
+            float(cfg.get("wx_accounts.rate", 0.2) or 0),
+            int(cfg.get("wx_accounts.burst", 3) or 1),
+            name=f"wx_account:{id}",
+        )
+
+    def is_available(self, now: float = None) -> bool:
+        now = now or time.time()
+        if self.status == EXPIRED:
+            return False
+        if self.expires_at and self.expires_at <= now:
+            self.status = EXPIRED
+            return False
+        if self.status == COOLDOWN:
+            if self.cooldown_until > now:
+                return False
+            self.status = HEALTHY
+        return True
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "token": self.token,
+            "cookie": self.cookie,
+            "name": self.name,
+            "fingerprint": self.fingerprint,
+            "expires_at": self.expires_at,
+            "status": self.status,
+            "cooldown_until": self.cooldown_until,
+        }
+
+    def get_info(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "expires_at": self.expires_at,
+            "cooldown_until": int(self.cooldown_until),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "last_used": int(self.last_used),
+        }
+
+
+class AccountPool:
+    """多账号登录池
+
+    每次扫码登录成功的账号都加入池中并加密保存(driver/store.KeyStore)。
+    采集任务开始时分配给当前负载最低的健康账号，结束时归还；
+    账号触发频率限制时进入冷却，会话失效时下线，队列中的任务由其它账号继续执行。
+
+    API 进程与独立 worker 共用同一个账号池文件：文件变化时重新读取合并，
+    修改时持有文件锁(.lock)，先合并其它进程的修改再整体保存，不会覆盖其它进程登记的账号。
+    """
+
+    def __init__(self, key_file: str = "data/accounts.lic"):
+        self.store = KeyStore(key_file)
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, WxAccount] = {}
+        self._loaded = False
+        self._stamp = None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            self._refresh()
+            return
+        self._loaded = True
+        self._reload()
+        # 兼容旧版单账号配置
+        try:
+            from driver.token import wx_cfg
+            token = str(wx_cfg.get("token", "") or "")
+            cookie = str(wx_cfg.get("cookie", "") or "")
+            if token and cookie:
+                with self._writing():
+                    if not any(a.token == token for a in self._accounts.values()):
+                        self._upsert({"token": token, "cookies_str": cookie,
+                                      "fingerprint": wx_cfg.get("fingerprint", ""),
+                                      "expiry": wx_cfg.get("expiry", {})}, wx_cfg.get("ext_data", {}))
+        except Exception as e:
+            print_warning(f"导入当前登录账号失败: {e}")
+
+    # ---------------------------------------------------------------- 文件同步
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.store.key_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _reload(self) -> None:
+        """读取账号池文件，合并到内存(文件中的字段为准，保留进程内的占用数与请求预算)"""
+        stamp = self._file_stamp()
+        if stamp is None:
+            return
+        items = self.store.load_data(None)
+        if not isinstance(items, list):
+            return
+        seen = set()
+        for item in items:
+            account_id = str(item.get("id") or "")
+            if not account_id:
+                continue
+            seen.add(account_id)
+            account = self._accounts.get(account_id)
+            if account is None:
+                try:
+                    self._accounts[account_id] = WxAccount(**item)
+                except Exception as e:
+                    print_warning(f"加载账号失败: {e}")
+                continue
+            for key in _PERSISTED:
+                if key in item:
+                    setattr(account, key, item[key])
+        # 文件中已不存在的账号(执行中的除外)
+        for account_id in [k for k, a in self._accounts.items() if k not in seen and not a.in_flight]:
+            del self._accounts[account_id]
+        self._stamp = stamp
+
+    def _refresh(self) -> None:
+        if self._file_stamp() != self._stamp:
+            self._reload()
+
+    @contextmanager
+    def _writing(self):
+        """持有跨进程文件锁：先合并文件中其它进程的修改，退出时整体保存"""
+        lock_file = None
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.store.key_file) or ".", exist_ok=True)
+            lock_file = open(f"{self.store.key_file}.lock", "a")
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._refresh()
+            yield
+            self._save()
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _save(self) -> None:
+        try:
+            self.store.save_data([a.to_dict() for a in self._accounts.values()])
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            print_warning(f"保存账号池失败: {e}")
+
+    def _upsert(self, data: dict, ext_data: dict = None) -> WxAccount:
+        account_id = _account_id(data, ext_data)
+        expires_at = 0
+        try:
+            remaining = int((data.get("expiry") or {}).get("remaining_seconds") or 0)
+            if remaining > 0:
+                expires_at = int(time.time()) + remaining
+        except Exception:
+            expires_at = 0
+        account = self._accounts.get(account_id)
+        if account is None:
+            account = WxAccount(account_id, "", "")
+            self._accounts[account_id] = account
+        account.token = str(data.get("token", "") or "")
+        account.cookie = str(data.get("cookies_str", "") or "")
+        account.fingerprint = str(data.get("fingerprint", "") or "")
+        account.name = str((ext_data or {}).get("wx_app_name", "") or account.name)
+        account.expires_at = expires_at
+        account.status = HEALTHY
+        account.cooldown_until = 0
+        return account
+
+    # ---------------------------------------------------------------- 对外接口
+    def add(self, data: dict, ext_data: dict = None) -> Optional[WxAccount]:
+        """登录成功后登记账号(同一账号重复登录会刷新token/cookie)"""
+        if not data or not data.get("token"):
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            with self._writing():
+                account = self._upsert(data, ext_data)
+        print_success(f"账号池已登记账号: {account.name or account.id} 可用账号数:{self.healthy_count()}")
+        return account
+
+    def _least_loaded(self) -> Optional[WxAccount]:
+        now = time.time()
+        candidates = [a for a in self._accounts.values() if a.is_available(now)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda a: (a.in_flight, a.last_used))
+
+    def pick(self) -> Optional[WxAccount]:
+        """查看当前负载最低的健康账号(不占用)"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._least_loaded()
+
+    def acquire(self) -> Optional[WxAccount]:
+        """分配负载最低的健康账号，没有可用账号时返回None"""
+        with self._lock:
+            self._ensure_loaded()
+            account = self._least_loaded()
+            if account is not None:
+                account.in_flight += 1
+                account.last_used = time.time()
+            return account
+
+    def release(self, account_id: str) -> None:
+        with self._lock:
+            account = self._accounts.get(account_id)
+            if account is not None and account.in_flight > 0:
+                account.in_flight -= 1
+
+    def throttle(self, account_id: str) -> None:
+        """按账号的请求预算等待令牌"""
+        account = self._accounts.get(account_id)
+        if account is None:
+            return
+        account.limiter.acquire()
+        account.requests += 1
+
+    def cooldown(self, account_id: str, seconds: float = None) -> None:
+        """账号触发频率限制，暂停分配一段时间"""
+        seconds = float(seconds or cfg.get("wx_accounts.cooldown", 3600) or 3600)
+        with self._lock:
+            self._ensure_loaded()
+            with self._writing():
+                account = self._accounts.get(account_id)
+                if account is None:
+                    return
+                account.status = COOLDOWN
+                account.cooldown_until = time.time() + seconds
+        print_warning(f"账号 {account.name or account.id} 触发频率限制，冷却{int(seconds)}秒")
+
+    def retire(self, account_id: str) -> int:
+        """账号会话失效，下线并返回剩余健康账号数"""
+        with self._lock:
+            self._ensure_loaded()
+            with self._writing():
+                account = self._accounts.get(account_id)
+                if account is not None and account.status != EXPIRED:
+                    account.status = EXPIRED
+                    print_warning(f"账号 {account.name or account.id} 会话已失效，已下线")
+        return self.healthy_count()
+
+    def healthy_count(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            now = time.time()
+            return sum(1 for a in self._accounts.values() if a.is_available(now))
+
+    def get_info(self) -> dict:
+        with self._lock:
+            self._ensure_loaded()
+            now = time.time()
+            for a in self._accounts.values():
+                a.is_available(now)
+            accounts = [a.get_info() for a in self._accounts.values()]
+        return {
+            "total": len(accounts),
+            "healthy": sum(1 for a in accounts if a["status"] == HEALTHY),
+            "accounts": accounts,
+        }
+
+
+Accounts = AccountPool()
@@ -0,0 +1,239 @@
+import asyncio
+import base64
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+from lxml import etree, html as lxml_html
+
+from core import cancel
+from core.config import cfg
+from core.metrics import metrics
+from core.print import print_error, print_info, print_warning
+from core.ratelimit import get_limiter
+
+from .wxarticle import VERIFY_MARKER, Web, detect_unavailable
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+def _meta(doc, prop: str) -> str:
+    for attr in ("property", "name"):
+        found = doc.xpath(f'//meta[@{attr}="{prop}"]/@content')
+        if found and str(found[0]).strip():
+            return str(found[0]).strip()
+    return ""
+
+
+def _js_var(source: str, name: str) -> str:
+    """提取页面脚本中 var name = "xxx" 形式的字符串变量"""
+    match = re.search(r'var\s+%s\s*=\s*([^;\n]*)' % re.escape(name), source)
+    if not match:
+        return ""
+    # 兼容 var biz = "" || "MzA5..."; 这类写法，取第一个非空字符串
+    for _quote, value in re.findall(r'(["\'])(.*?)\1', match.group(1)):
+        if value.strip():
+            return value.strip()
+    return ""
+
+
+def _inner_html(el) -> str:
+    parts = [el.text or ""]
+    for child in el:
+        parts.append(etree.tostring(child, encoding="unicode", method="html"))
+    return "".join(parts)
+
+
+def parse_article_html(source: str, url: str = "") -> Dict:
+    """使用lxml解析公众号文章HTML，返回与 get_article_content 一致的数据结构
+
+    解析失败或页面需要浏览器时返回 content 为空的结果，由调用方决定是否回退到浏览器。
+    页面已删除/不可查看时 content 为 "DELETED"。
+    """
+    info = {
+        "id": Web.extract_id_from_url(url),
+        "title": "",
+        "publish_time": "",
+        "content": "",
+        "images": [],
+        "mp_info": {
+            "mp_name": "",
+            "logo": "",
+            "biz": "",
+        },
+    }
+    if not source:
+        return info
+    doc = lxml_html.fromstring(source)
+    body_text = doc.text_content() if doc is not None else ""
+    if VERIFY_MARKER in body_text:
+        info["verify"] = True
+        return info
+    reason = detect_unavailable(body_text)
+    if reason and not doc.xpath('//*[@id="js_content"]'):
+        info["content"] = "DELETED"
+        info["reason"] = reason
+        return info
+
+    content = ""
+    nodes = doc.xpath('//*[@id="js_content"]')
+    if nodes:
+        node = nodes[0]
+        # 纯文字为空且没有图片/视频时视为未取到正文
+        if node.text_content().strip() or node.xpath(".//img|.//video|.//iframe"):
+            content = _inner_html(node)
+
+    title = _meta(doc, "og:title") or _js_var(source, "msg_title") or (doc.findtext(".//title") or "").strip()
+    publish_time = ""
+    ct = _js_var(source, "ct")
+    if ct.isdigit():
+        publish_time = int(ct)
+    else:
+        create_time = _js_var(source, "createTime")
+        if create_time:
+            publish_time = Web.convert_publish_time_to_timestamp(create_time)
+
+    biz = _js_var(source, "biz")
+    if not biz:
+        match = re.search(r'[?&]__biz=([^&#]+)', url or "")
+        biz = match.group(1) if match else ""
+    nickname = _js_var(source, "nickname")
+    if not nickname:
+        names = doc.xpath('//*[@id="js_name"]')
+        nickname = names[0].text_content().strip() if names else ""
+
+    info["title"] = title
+    info["publish_time"] = publish_time
+    info["content"] = Web.clean_article_content(content) if content else ""
+    info["author"] = _meta(doc, "og:article:author") or _meta(doc, "author")
+    info["description"] = _meta(doc, "og:description") or _js_var(source, "msg_desc")
+    info["topic_image"] = _meta(doc, "twitter:image") or _meta(doc, "og:image") or _js_var(source, "msg_cdn_url")
+    info["mp_info"] = {
+        "mp_name": nickname,
+        "logo": _js_var(source, "round_head_img") or _js_var(source, "ori_head_img_url"),
+        "biz": biz,
+    }
+    if biz:
+        try:
+            info["mp_id"] = "MP_WXS_" + base64.b64decode(biz).decode("utf-8")
+        except Exception:
+            pass
+    return info
+
+
+class TieredArticleExtractor:
+    """分级文章提取器
+
+    先用 httpx 直接请求文章页并用 lxml 解析正文/作者/发布时间/biz/封面，
+    仅当遇到环境验证页或未解析到正文时才回退到浏览器抓取服务。
+    命中与回退次数记录在 core.metrics 中(article_extract.*)。
+    """
+
+    def __init__(self, timeout: float = None, browser_fallback: bool = None):
+        self.timeout = float(timeout or cfg.get("gather.http.timeout", 15) or 15)
+        if browser_fallback is None:
+            browser_fallback = bool(cfg.get("gather.http.browser_fallback", True))
+        self.browser_fallback = browser_fallback
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                    headers={
+                        "User-Agent": DEFAULT_USER_AGENT,
+                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+                    },
+                )
+            return self._client
+
+    def fetch_http(self, url: str) -> Dict:
+        """仅使用HTTP请求+lxml解析，不回退浏览器"""
+        start = time.time()
+        try:
+            resp = self._get_client().get(url)
+            if resp.status_code != 200:
+                metrics.inc("article_extract.http_error")
+                # 标记状态码，调用方据此区分请求失败与空页面
+                info = parse_article_html("", url)
+                info["http_status"] = resp.status_code
+                return info
+            return parse_article_html(resp.text, url)
+        finally:
+            metrics.observe("article_extract.http", time.time() - start)
+
+    @staticmethod
+    def _acquire(limiter) -> None:
+        """等待限流令牌，等待时间不超过所在任务的剩余期限"""
+        cancel.check()
+        token = cancel.current()
+        limiter.acquire(timeout=token.remaining() if token is not None else None)
+        cancel.check()
+
+    def extract(self, url: str) -> Dict:
+        """获取文章内容，HTTP优先，必要时回退浏览器"""
+        metrics.inc("article_extract.total")
+        # 所有访问公众号文章页的请求共用同一个限流器
+        limiter = get_limiter("wx")
+        info = None
+        # 所在任务被取消/超过期限时不再发起请求
+        self._acquire(limiter)
+        try:
+            info = self.fetch_http(url)
+        except Exception as e:
+            metrics.inc("article_extract.http_error")
+            print_warning(f"HTTP提取失败: {url} {e}")
+
+        if info is not None and info.get("content"):
+            metrics.inc("article_extract.http_hit")
+            if info.get("content") == "DELETED":
+                print_warning(f"{info.get('reason', '文章不可用')}: {url}")
+            info["source"] = "http"
+            return info
+
+        if info is not None and info.get("verify"):
+            metrics.inc("article_extract.verify")
+            print_info(f"{VERIFY_MARKER}，转为浏览器抓取: {url}")
+        else:
+            metrics.inc("article_extract.missing")
+
+        if not self.browser_fallback:
+            return info or parse_article_html("", url)
+
+        metrics.inc("article_extract.browser_fallback")
+        from driver.fetch_service import FetchService
+
+        self._acquire(limiter)
+        start = time.time()
+        try:
+            info = FetchService.fetch(url)
+        except Exception as e:
+            metrics.inc("article_extract.browser_error")
+            print_error(f"浏览器抓取失败: {url} {e}")
+            raise
+        finally:
+            metrics.observe("article_extract.browser", time.time() - start)
+        info["source"] = "browser"
+        return info
+
+    async def extract_async(self, url: str) -> Dict:
+        return await asyncio.get_running_loop().run_in_executor(None, self.extract, url)
+
+    def get_stats(self) -> dict:
+        return {
+            "total": metrics.get("article_extract.total"),
+            "http_hit": metrics.get("article_extract.http_hit"),
+            "browser_fallback": metrics.get("article_extract.browser_fallback"),
+            "hit_rate": metrics.ratio("article_extract.http_hit", "article_extract.total"),
+            "fallback_rate": metrics.ratio("article_extract.browser_fallback", "article_extract.total"),
+        }
+
+
+ArticleExtractor = TieredArticleExtractor()
@@ -14,7 +14,7 @@ def auth():
     thread.start()
     thread.join()  # 可选：等待完成
 if os.getenv('WE_RSS.AUTH',False):
-    auth_task=TaskScheduler()
+    auth_task=TaskScheduler(name="授权更新")
     auth_task.clear_all_jobs()
     if os.getenv('DEBUG',False):
         auth_task.add_cron_job(auth, "*/1 * * * *",tag="授权定时更新")
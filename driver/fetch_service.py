@@ -0,0 +1,268 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from core.config import cfg
+from core.print import print_error, print_info, print_success, print_warning
+
+from core.metrics import metrics
+
+from .playwright_driver import ANTI_CRAWLER_INIT_SCRIPT, PlaywrightController, RequestBlockPolicy, browsers_name
+from .wxarticle import ARTICLE_EXTRACT_SCRIPT, EXTRACT_MARKERS, VERIFY_MARKER, Web, detect_unavailable, parse_mp_cookies
+
+
+class FetchTimeout(Exception):
+    """单篇文章抓取超时"""
+    pass
+
+
+class ArticleFetchService:
+    """基于异步Playwright的文章抓取服务
+
+    在独立事件循环线程中运行一个浏览器，维护多个上下文(context)，
+    由 M 个工作协程并发打开页面抓取文章。任务通过有界队列提交，
+    队列满时调用方会被阻塞(背压)，每个URL单独计算超时。
+
+    同步代码使用 fetch()，异步代码使用 fetch_async()，两者返回的数据结构与
+    WXArticleFetcher.get_article_content 一致。
+    """
+
+    def __init__(self, pages: int = None, contexts: int = None, queue_size: int = None, timeout: float = None):
+        self.pages = max(1, int(pages or cfg.get("gather.fetch.pages", 4) or 4))
+        self.contexts = max(1, min(self.pages, int(contexts or cfg.get("gather.fetch.contexts", 2) or 2)))
+        self.queue_size = max(1, int(queue_size or cfg.get("gather.fetch.queue_size", 100) or 100))
+        self.timeout = float(timeout or cfg.get("gather.fetch.timeout", 45) or 45)
+        self.idle_close = float(cfg.get("gather.fetch.idle_close", 300) or 300)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+        self._driver = None
+        self._browser = None
+        self._contexts: list = []
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._workers: list = []
+        self._active = 0
+        self._last_used = time.time()
+        self._stats = {"done": 0, "failed": 0, "timeout": 0}
+
+    # ---------------------------------------------------------------- 生命周期
+    def start(self) -> None:
+        """启动事件循环线程(幂等)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="文章抓取服务", daemon=True)
+            self._thread.start()
+        self._ready.wait(10)
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._browser_lock = asyncio.Lock()
+        self._workers = [loop.create_task(self._worker(i)) for i in range(self.pages)]
+        loop.create_task(self._idle_watcher())
+        print_success(f"文章抓取服务已启动: 并发页面{self.pages} 上下文{self.contexts} 队列{self.queue_size}")
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(self._close_browser())
+            except Exception:
+                pass
+            loop.close()
+
+    def close(self) -> None:
+        """关闭浏览器并停止服务"""
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return
+        for w in self._workers:
+            loop.call_soon_threadsafe(w.cancel)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(10)
+        self._thread = None
+        self._loop = None
+
+    # ---------------------------------------------------------------- 提交任务
+    def submit(self, url: str, timeout: float = None) -> Future:
+        """提交一个抓取任务，返回 concurrent.futures.Future"""
+        self.start()
+        timeout = float(timeout or self.timeout)
+        result: Future = Future()
+        put = asyncio.run_coroutine_threadsafe(self._queue.put((url, timeout, result)), self._loop)
+        try:
+            # 队列已满时等待空位，最多等待一个抓取超时时间
+            put.result(timeout)
+        except Exception:
+            put.cancel()
+            raise FetchTimeout(f"抓取队列已满: {url}")
+        return result
+
+    def fetch(self, url: str, timeout: float = None) -> Dict:
+        """同步抓取单篇文章(阻塞直到完成或超时)"""
+        timeout = float(timeout or self.timeout)
+        # 额外留出排队时间，真正的单URL超时在工作协程中控制
+        return self.submit(url, timeout).result(timeout * 3)
+
+    async def fetch_async(self, url: str, timeout: float = None) -> Dict:
+        """在其它事件循环(如FastAPI)中等待抓取结果"""
+        timeout = float(timeout or self.timeout)
+        future = await asyncio.get_running_loop().run_in_executor(None, self.submit, url, timeout)
+        return await asyncio.wrap_future(future)
+
+    def get_info(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "browser": self._browser is not None,
+            "pages": self.pages,
+            "contexts": self.contexts,
+            "active": self._active,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            **self._stats,
+        }
+
+    # ---------------------------------------------------------------- 浏览器
+    async def _ensure_browser(self) -> None:
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            await self._close_browser()
+            from playwright.async_api import async_playwright
+
+            self._driver = await async_playwright().start()
+            name = (browsers_name or "firefox").lower()
+            if name == "firefox":
+                browser_type = self._driver.firefox
+            elif name == "webkit":
+                browser_type = self._driver.webkit
+            else:
+                browser_type = self._driver.chromium
+            self._browser = await browser_type.launch(headless=True)
+            controller = PlaywrightController()
+            policy = RequestBlockPolicy.from_config()
+            self._contexts = []
+            for _ in range(self.contexts):
+                options = {"locale": "zh-CN"}
+                options.update(controller._get_anti_crawler_config(False))
+                context = await self._browser.new_context(**options)
+                await context.add_init_script(ANTI_CRAWLER_INIT_SCRIPT)
+                await context.route("**/*", policy.handle_async)
+                self._contexts.append(context)
+            print_info(f"抓取服务浏览器已启动: {name}")
+
+    async def _close_browser(self) -> None:
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._contexts = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._driver is not None:
+            try:
+                await self._driver.stop()
+            except Exception:
+                pass
+            self._driver = None
+
+    async def _idle_watcher(self) -> None:
+        """空闲一段时间后关闭浏览器释放内存，下次抓取时自动重启"""
+        while True:
+            await asyncio.sleep(30)
+            if self._browser is None or self._active > 0 or not self._queue.empty():
+                continue
+            if time.time() - self._last_used < self.idle_close:
+                continue
+            async with self._browser_lock:
+                await self._close_browser()
+            print_info("抓取服务空闲，浏览器已关闭")
+
+    # ---------------------------------------------------------------- 抓取
+    async def _worker(self, index: int) -> None:
+        while True:
+            url, timeout, result = await self._queue.get()
+            if result.set_running_or_notify_cancel():
+                self._active += 1
+                try:
+                    info = await asyncio.wait_for(self._fetch_one(index, url), timeout)
+                    self._stats["done"] += 1
+                    result.set_result(info)
+                except asyncio.TimeoutError:
+                    self._stats["timeout"] += 1
+                    print_error(f"抓取超时({timeout}s): {url}")
+                    result.set_exception(FetchTimeout(f"抓取超时: {url}"))
+                except Exception as e:
+                    self._stats["failed"] += 1
+                    result.set_exception(e)
+                finally:
+                    self._active -= 1
+                    self._last_used = time.time()
+            self._queue.task_done()
+
+    async def _fetch_one(self, index: int, url: str) -> Dict:
+        await self._ensure_browser()
+        context = self._contexts[index % len(self._contexts)]
+        try:
+            from driver.token import get as get_wx_cfg
+
+            cookies = parse_mp_cookies(get_wx_cfg("cookie", ""))
+            if cookies:
+                await context.add_cookies(cookies)
+        except Exception:
+            pass
+
+        page = await context.new_page()
+        try:
+            print_warning(f"Get:{url}")
+            start = time.time()
+            await page.goto(url, wait_until="domcontentloaded")
+            info = await self._extract(page, url)
+            metrics.observe("fetch.page", time.time() - start)
+            return info
+        finally:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    async def _extract(self, page, url: str) -> Dict:
+        info = {
+            "id": Web.extract_id_from_url(url),
+            "title": "",
+            "publish_time": "",
+            "content": "",
+            "images": "",
+            "mp_info": {
+                "mp_name": "",
+                "logo": "",
+                "biz": "",
+            },
+        }
+        data = (await page.evaluate(ARTICLE_EXTRACT_SCRIPT, EXTRACT_MARKERS)) or {}
+        marker = data.get("marker", "")
+        if marker == VERIFY_MARKER:
+            raise Exception(VERIFY_MARKER)
+        reason = detect_unavailable(marker)
+        if reason:
+            print_warning(f"{reason}: {url}")
+            info["content"] = "DELETED"
+            return info
+        return Web.apply_extract_result(info, data)
+
+
+FetchService = ArticleFetchService()
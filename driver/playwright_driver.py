@@ -18,6 +18,114 @@ os.environ['PLAYWRIGHT_BROWSERS_PATH'] = browsers_path
 from playwright.sync_api import sync_playwright
 from playwright.async_api import async_playwright
 
+from core.metrics import metrics
+
+# 隐藏自动化特征的初始化脚本(同步/异步浏览器共用)
+ANTI_CRAWLER_INIT_SCRIPT = """
+        // 隐藏webdriver属性
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => false,
+        });
+        
+        // 隐藏chrome属性
+        Object.defineProperty(window, 'chrome', {
+            get: () => false,
+        });
+        
+        // 修改plugins长度
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5],
+        });
+        
+        // 修改languages
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['zh-CN', 'zh', 'en'],
+        });
+        
+        // 隐藏自动化痕迹
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => false,
+        });
+        
+        // 修改permissions
+        const originalQuery = window.navigator.permissions.query;
+        window.navigator.permissions.query = (parameters) => (
+            parameters.name === 'notifications' ?
+                Promise.resolve({ state: Notification.permission }) :
+                originalQuery(parameters)
+        );
+"""
+
+# 默认拦截的资源类型(正文抓取不需要图片/视频/字体/样式/统计上报)
+DEFAULT_BLOCK_RESOURCE_TYPES = "image,media,font,stylesheet,ping,beacon,manifest,texttrack"
+# 默认允许访问的域名(含子域名)，其它域名的请求一律拦截
+DEFAULT_ALLOW_DOMAINS = "mp.weixin.qq.com,res.wx.qq.com"
+
+
+def _split_list(value) -> set:
+    if isinstance(value, (list, tuple, set)):
+        items = value
+    else:
+        items = str(value or "").split(",")
+    return {str(i).strip().lower() for i in items if str(i).strip()}
+
+
+class RequestBlockPolicy:
+    """浏览器请求拦截策略
+
+    按资源类型拦截(image/font/stylesheet等)，并只放行白名单域名的请求，
+    统计、上报等第三方请求直接中止。主文档(document)请求始终放行。
+    白名单为空时不限制域名。
+    """
+
+    def __init__(self, resource_types=None, allow_domains=None):
+        self.resource_types = _split_list(resource_types if resource_types is not None else DEFAULT_BLOCK_RESOURCE_TYPES)
+        self.allow_domains = _split_list(allow_domains if allow_domains is not None else DEFAULT_ALLOW_DOMAINS)
+
+    @classmethod
+    def from_config(cls) -> "RequestBlockPolicy":
+        from core.config import cfg
+        return cls(
+            cfg.get("gather.block.resource_types", DEFAULT_BLOCK_RESOURCE_TYPES),
+            cfg.get("gather.block.allow_domains", DEFAULT_ALLOW_DOMAINS),
+        )
+
+    def _domain_allowed(self, url: str) -> bool:
+        if not self.allow_domains:
+            return True
+        from urllib.parse import urlsplit
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            return True
+        return any(host == d or host.endswith("." + d) for d in self.allow_domains)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        resource_type = (resource_type or "").lower()
+        if resource_type == "document":
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return not self._domain_allowed(url)
+
+    def handle(self, route) -> None:
+        """同步Playwright路由回调"""
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            metrics.inc("fetch.blocked")
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route) -> None:
+        """异步Playwright路由回调"""
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            metrics.inc("fetch.blocked")
+            await route.abort()
+        else:
+            await route.continue_()
+
+
 class PlaywrightController:
     def __init__(self):
         self.system = platform.system().lower()
@@ -57,7 +165,7 @@ class PlaywrightController:
                 self.browser is not None and 
                 self.context is not None and 
                 self.page is not None)
-    def start_browser(self, headless=True, mobile_mode=False, dis_image=True, browser_name=browsers_name, language="zh-CN", anti_crawler=True):
+    def start_browser(self, headless=True, mobile_mode=False, dis_image=True, browser_name=browsers_name, language="zh-CN", anti_crawler=True, block_resources=False):
         try:
             # 使用线程锁确保线程安全
             if  os.getenv("NOT_HEADLESS",False)==True:
@@ -114,7 +222,10 @@ class PlaywrightController:
             # else:
             #     self.page.set_viewport_size({"width": 1920, "height": 1080})
 
-            if dis_image:
+            if block_resources:
+                # 按 gather.block 配置拦截资源类型与非白名单域名(仅用于文章抓取，登录页不启用)
+                self.context.route("**/*", RequestBlockPolicy.from_config().handle)
+            elif dis_image:
                 self.context.route("**/*.{png,jpg,jpeg}", lambda route: route.abort())
 
             # 应用反爬虫脚本
@@ -240,40 +351,7 @@ class PlaywrightController:
         
         """应用反爬虫脚本"""
         # 隐藏自动化特征
-        self.page.add_init_script("""
-        // 隐藏webdriver属性
-        Object.defineProperty(navigator, 'webdriver', {
-            get: () => false,
-        });
-        
-        // 隐藏chrome属性
-        Object.defineProperty(window, 'chrome', {
-            get: () => false,
-        });
-        
-        // 修改plugins长度
-        Object.defineProperty(navigator, 'plugins', {
-            get: () => [1, 2, 3, 4, 5],
-        });
-        
-        // 修改languages
-        Object.defineProperty(navigator, 'languages', {
-            get: () => ['zh-CN', 'zh', 'en'],
-        });
-        
-        // 隐藏自动化痕迹
-        Object.defineProperty(navigator, 'webdriver', {
-            get: () => false,
-        });
-        
-        // 修改permissions
-        const originalQuery = window.navigator.permissions.query;
-        window.navigator.permissions.query = (parameters) => (
-            parameters.name === 'notifications' ?
-                Promise.resolve({ state: Notification.permission }) :
-                originalQuery(parameters)
-        );
-        """)
+        self.page.add_init_script(ANTI_CRAWLER_INIT_SCRIPT)
       
         # 设置更真实的浏览器行为
         self.page.evaluate("""
@@ -1,10 +1,24 @@
 from core.file import FileCrypto
 from core.config import cfg
 import json
+import os
 class KeyStore:
     key_file= "data/key.lic"
-    def __init__(self):
+    def __init__(self,key_file:str=None):
+        if key_file:
+            self.key_file=key_file
         self.store = FileCrypto(cfg.get("safe.lic_key","store.csol.store.werss"))
+    def save_data(self,data):
+        """加密保存任意可JSON序列化的数据(先写临时文件再替换，其它进程不会读到写了一半的文件)"""
+        text=json.dumps(data,ensure_ascii=False)
+        tmp=f"{self.key_file}.tmp"
+        self.store.encrypt_to_file(tmp, text.encode("utf-8"))
+        os.replace(tmp,self.key_file)
+    def load_data(self,default=None):
+        try:
+            return json.loads(self.store.decrypt_from_file(self.key_file).decode("utf-8"))
+        except:
+            return default
     def save(self,text):
         items=[]
         if type(text) != str:
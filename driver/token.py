@@ -70,6 +70,9 @@ def set_token(data:any,ext_data:any=None):
         wx_cfg.set("ext_data", ext_data)
     wx_cfg.save_config()
     wx_cfg.reload()
+    # 同时登记到多账号池，采集任务按负载分配账号
+    from driver.account_pool import Accounts
+    Accounts.add(data, ext_data)
     from jobs.notice import sys_notice
     
 #     sys_notice(f"""WeRss授权成功
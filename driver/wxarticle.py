@@ -11,9 +11,125 @@ from bs4 import BeautifulSoup
 import os
 from datetime import datetime
 from core.config import cfg
+from core.metrics import metrics
 from http.cookies import SimpleCookie
 import json
 
+# 触发微信环境验证时页面提示
+VERIFY_MARKER = "当前环境异常，完成验证后即可继续访问"
+# 文章不可用提示 -> 原因
+UNAVAILABLE_MARKERS = [
+    ("该内容已被发布者删除", "该内容已被发布者删除"),
+    ("The content has been deleted by the author.", "该内容已被发布者删除"),
+    ("内容审核中", "内容审核中"),
+    ("该内容暂时无法查看", "该内容暂时无法查看"),
+    ("违规无法查看", "违规无法查看"),
+    ("发送失败无法查看", "发送失败无法查看"),
+    ("Unable to view this content because it violates regulation", "违规无法查看"),
+]
+
+
+# 单次 page.evaluate 提取文章全部字段，避免多次locator往返
+# 参数为需要检测的提示文本列表，命中时返回 marker 且不再提取其它字段
+ARTICLE_EXTRACT_SCRIPT = """
+(markers) => {
+    const body = document.body ? (document.body.textContent || "") : "";
+    const marker = (markers || []).find((m) => body.indexOf(m) !== -1) || "";
+    const hasContent = !!document.querySelector("#js_content");
+    if (marker && !hasContent) {
+        return { marker: marker, preview: body.trim().slice(0, 50) };
+    }
+    const meta = (prop) => {
+        const el = document.querySelector(`meta[property="${prop}"]`) || document.querySelector(`meta[name="${prop}"]`);
+        return el ? (el.getAttribute("content") || "") : "";
+    };
+    const text = (sel) => {
+        const el = document.querySelector(sel);
+        return el ? (el.textContent || "").trim() : "";
+    };
+    const html = (sel) => {
+        const el = document.querySelector(sel);
+        return el ? el.innerHTML : "";
+    };
+    let biz = "";
+    try { biz = window.biz || ""; } catch (e) {}
+    if (!biz) {
+        const m = location.href.match(/[?&]__biz=([^&#]+)/)
+            || document.documentElement.innerHTML.match(/var biz = "([^"]+)"/)
+            || document.documentElement.innerHTML.match(/window\\.__biz=([^&"']+)/);
+        biz = m ? m[1] : "";
+    }
+    const logo = document.querySelector("#js_like_profile_bar .wx_follow_avatar img");
+    return {
+        marker: marker,
+        preview: body.trim().slice(0, 50),
+        title: meta("og:title") || document.title || "",
+        author: meta("og:article:author"),
+        description: meta("og:description"),
+        topic_image: meta("twitter:image"),
+        content: html("#js_content") || html("#js_article"),
+        publish_time: text("#publish_time"),
+        logo: logo ? (logo.getAttribute("src") || "") : "",
+        mp_name: text("#js_wx_follow_nickname") || text("#js_name"),
+        biz: biz,
+    };
+}
+"""
+# 传给 ARTICLE_EXTRACT_SCRIPT 的检测文本
+EXTRACT_MARKERS = [VERIFY_MARKER] + [m for m, _ in UNAVAILABLE_MARKERS]
+
+
+def detect_unavailable(body: str) -> str:
+    """判断页面是否为已删除/不可查看的文章，返回原因，正常文章返回空字符串"""
+    for marker, reason in UNAVAILABLE_MARKERS:
+        if marker in (body or ""):
+            return reason
+    return ""
+
+
+def parse_mp_cookies(cookies_str: str) -> list:
+    """将公众号平台cookie(JSON列表或 k=v; 字符串)转换为Playwright cookie列表"""
+    s = (cookies_str or "").strip()
+    if not s:
+        return []
+    cookies: list[dict] = []
+    try:
+        if s.startswith("[") or s.startswith("{"):
+            obj = json.loads(s)
+            if isinstance(obj, dict) and "cookies" in obj:
+                obj = obj.get("cookies")
+            if isinstance(obj, list):
+                for c in obj:
+                    if not isinstance(c, dict):
+                        continue
+                    name = str(c.get("name") or "").strip()
+                    value = str(c.get("value") or "").strip()
+                    if not (name and value):
+                        continue
+                    cookie = dict(c)
+                    cookie.setdefault("name", name)
+                    cookie.setdefault("value", value)
+                    cookie.setdefault("url", "https://mp.weixin.qq.com")
+                    cookie.setdefault("path", "/")
+                    cookies.append(cookie)
+    except Exception:
+        cookies = []
+
+    if not cookies:
+        jar = SimpleCookie()
+        try:
+            jar.load(s)
+        except Exception:
+            return []
+        for k, morsel in jar.items():
+            name = str(k or "").strip()
+            value = str(morsel.value or "").strip()
+            if not (name and value):
+                continue
+            cookies.append({"name": name, "value": value, "url": "https://mp.weixin.qq.com", "path": "/"})
+    return cookies
+
+
 class WXArticleFetcher:
     """微信公众号文章获取器
     
@@ -221,12 +337,9 @@ class WXArticleFetcher:
         finally:
             self.Close() 
     async def async_get_article_content(self,url:str)->Dict:
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as pool:
-            future = loop.run_in_executor(pool, self.get_article_content, url)
-        return await future
+        """异步获取文章内容，交由共享的并发抓取服务处理"""
+        from driver.fetch_service import FetchService
+        return await FetchService.fetch_async(url)
     def get_article_content(self, url: str) -> Dict:
         """获取单篇文章详细内容
         
@@ -256,7 +369,7 @@ class WXArticleFetcher:
                 "biz": "",
                 }
             }
-        self.controller.start_browser()
+        self.controller.start_browser(block_resources=True)
        
         self.page = self.controller.page
         print_warning(f"Get:{url} Wait:{self.wait_timeout}")
@@ -267,167 +380,60 @@ class WXArticleFetcher:
         except Exception:
             pass
 
+        start = time.time()
         self.controller.open_url(url)
         page = self.page
-        content=""
-        
+        data = {}
         try:
-            # 等待页面加载
-            # page.wait_for_load_state("networkidle")
-            # body = page.evaluate('() => document.body.innerText')
-            body= page.locator("body").text_content().strip()
-            
-            info["content"]=body
-            if "当前环境异常，完成验证后即可继续访问" in body:
-                info["content"]=""
-                # try:
-                #     page.locator("#js_verify").click()
-                # except:
+            # 一次 evaluate 取回正文、标题、作者、发布时间、公众号信息等全部字段
+            data = page.evaluate(ARTICLE_EXTRACT_SCRIPT, EXTRACT_MARKERS) or {}
+            marker = data.get("marker", "")
+            if marker == VERIFY_MARKER:
                 self.controller.cleanup()
-                Wait(tips="当前环境异常，完成验证后即可继续访问")
-                raise Exception("当前环境异常，完成验证后即可继续访问")
-            if "该内容已被发布者删除" in body or "The content has been deleted by the author." in body:
-                info["content"]="DELETED"
-                raise Exception("该内容已被发布者删除")
-            if  "内容审核中" in body:
-                info['content']="DELETED"
-                raise Exception("内容审核中")
-            if "该内容暂时无法查看" in body:
-                info["content"]="DELETED"
-                raise Exception("该内容暂时无法查看")
-            if "违规无法查看" in body:
-                info["content"]="DELETED"
-                raise Exception("违规无法查看")
-            if "发送失败无法查看" in body:
-                info["content"]="DELETED"
-                raise Exception("发送失败无法查看")
-            if "Unable to view this content because it violates regulation" in body:     
-                info["content"]="DELETED"
-                raise Exception("违规无法查看")
-            
-
-            # 获取标题
-            title = page.locator('meta[property="og:title"]').get_attribute("content")
-            #获取作者
-            author = page.locator('meta[property="og:article:author"]').get_attribute("content")
-            #获取描述
-            description = page.locator('meta[property="og:description"]').get_attribute("content")
-            #获取题图
-            topic_image = page.locator('meta[property="twitter:image"]').get_attribute("content")
-
-            self.export_to_pdf(f"./data/{title}.pdf")
-            if title=="":
-                title = page.evaluate('() => document.title')
-            
-          
-         
-            # 获取正文内容和图片
-            content_element = page.locator("#js_content")
-            content = content_element.inner_html()
-
-            #获取图集内容 
-            if content=="":
-                content_element = page.locator("#js_article")
-                content = content_element.inner_html()
-
-            content=self.clean_article_content(str(content))
-            #获取图像资源
-            images = [
-                img.get_attribute("data-src") or img.get_attribute("src")
-                for img in content_element.locator("img").all()
-                if img.get_attribute("data-src") or img.get_attribute("src")
-            ]
-            images=[]
-            if images and len(images)>0:
-                info["pic_url"]=images[0]
-
-
-            try:
-
-                #获取发布时间
-                publish_time_str = page.locator("#publish_time").text_content().strip()
-                # 将发布时间转换为时间戳
-                publish_time = self.convert_publish_time_to_timestamp(publish_time_str)
-            except:
-                print_warning(f"获取作者和发布时间失败: {e}")
-                publish_time=""
-            info["title"]=title
-            info["publish_time"]=publish_time
-            info["content"]=content
-            info["images"]=images
-            info["author"]=author
-            info["description"]=description
-            info["topic_image"]=topic_image
+                Wait(tips=VERIFY_MARKER)
+                raise Exception(VERIFY_MARKER)
+            reason = detect_unavailable(marker)
+            if reason:
+                info["content"] = "DELETED"
+                raise Exception(reason)
 
+            self.apply_extract_result(info, data)
+            self.export_to_pdf(f"./data/{info['title']}.pdf")
         except Exception as e:
             print_error(f"文章内容获取失败: {str(e)}")
-            print_warning(f"页面内容预览: {body[:50]}...")
-            # raise e
+            print_warning(f"页面内容预览: {data.get('preview', '')}...")
             # 记录详细错误信息但继续执行
-
-        try:
-            if info["content"]!="DELETED":
-                # 等待关键元素加载
-                # 使用更精确的选择器避免匹配多个元素
-                ele_logo = page.locator('#js_like_profile_bar .wx_follow_avatar img')
-                # 获取<img>标签的src属性
-                logo_src = ele_logo.get_attribute('src')
-
-                # 获取公众号名称
-                title = page.evaluate('() => $("#js_wx_follow_nickname").text()')
-                biz = page.evaluate('() => window.biz')
-                info["mp_info"]={
-                    "mp_name":title,
-                    "logo":logo_src,
-                    "biz": biz or self.extract_biz_from_source(url, page), 
-                }
-                info["mp_id"]= "MP_WXS_"+base64.b64decode(info["mp_info"]["biz"]).decode("utf-8")
-        except Exception as e:
-            print_error(f"获取公众号信息失败: {str(e)}")   
-            pass
+        finally:
+            metrics.observe("fetch.page", time.time() - start)
         self.Close()
         return info
 
-    def _inject_mp_cookies(self, cookies_str: str) -> None:
-        s = (cookies_str or "").strip()
-        if not s:
-            return
-        cookies: list[dict] = []
-        try:
-            if s.startswith("[") or s.startswith("{"):
-                obj = json.loads(s)
-                if isinstance(obj, dict) and "cookies" in obj:
-                    obj = obj.get("cookies")
-                if isinstance(obj, list):
-                    for c in obj:
-                        if not isinstance(c, dict):
-                            continue
-                        name = str(c.get("name") or "").strip()
-                        value = str(c.get("value") or "").strip()
-                        if not (name and value):
-                            continue
-                        cookie = dict(c)
-                        cookie.setdefault("name", name)
-                        cookie.setdefault("value", value)
-                        cookie.setdefault("url", "https://mp.weixin.qq.com")
-                        cookie.setdefault("path", "/")
-                        cookies.append(cookie)
-        except Exception:
-            cookies = []
-
-        if not cookies:
-            jar = SimpleCookie()
+    def apply_extract_result(self, info: Dict, data: Dict) -> Dict:
+        """将 ARTICLE_EXTRACT_SCRIPT 的返回结果填充到文章信息字典"""
+        publish_time = ""
+        if data.get("publish_time"):
+            publish_time = self.convert_publish_time_to_timestamp(data["publish_time"])
+        info["title"] = data.get("title") or ""
+        info["publish_time"] = publish_time
+        info["content"] = self.clean_article_content(str(data.get("content") or ""))
+        info["images"] = []
+        info["author"] = data.get("author") or ""
+        info["description"] = data.get("description") or ""
+        info["topic_image"] = data.get("topic_image") or ""
+        info["mp_info"] = {
+            "mp_name": data.get("mp_name") or "",
+            "logo": data.get("logo") or "",
+            "biz": data.get("biz") or "",
+        }
+        if info["mp_info"]["biz"]:
             try:
-                jar.load(s)
-            except Exception:
-                return
-            for k, morsel in jar.items():
-                name = str(k or "").strip()
-                value = str(morsel.value or "").strip()
-                if not (name and value):
-                    continue
-                cookies.append({"name": name, "value": value, "url": "https://mp.weixin.qq.com", "path": "/"})
+                info["mp_id"] = "MP_WXS_" + base64.b64decode(info["mp_info"]["biz"]).decode("utf-8")
+            except Exception as e:
+                print_error(f"获取公众号信息失败: {str(e)}")
+        return info
 
+    def _inject_mp_cookies(self, cookies_str: str) -> None:
+        cookies = parse_mp_cookies(cookies_str)
         if not cookies:
             return
         try:
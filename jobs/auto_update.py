@@ -5,13 +5,14 @@ from typing import Any
 from core.config import cfg
 from core.db import DB
 from core.insights import InsightsService
+from core.models.feed import Feed
 from core.print import print_error, print_info, print_success, print_warning
-from core.queue import TaskQueue, TaskQueueManager
+from core.queue import TaskQueue, TaskQueueManager, register_task
 from core.task import TaskScheduler
 from core.wx import WxGather
 
 
-_AUTO_UPDATE_SCHEDULER = TaskScheduler()
+_AUTO_UPDATE_SCHEDULER = TaskScheduler(name="自动全量更新")
 _AUTO_UPDATE_QUEUE: TaskQueueManager | None = None
 
 
@@ -60,7 +61,7 @@ def _update_one_feed(feed) -> None:
     service = InsightsService()
     for aid in changed_article_ids:
         try:
-            TaskQueue.add_task(service.ensure_cached, aid)
+            TaskQueue.add_task(service.ensure_cached, aid, _priority="bulk")
         except Exception:
             # Fallback to sync best-effort in the worker thread.
             try:
@@ -69,6 +70,16 @@ def _update_one_feed(feed) -> None:
                 continue
 
 
+@register_task("auto_update.update_feed", tag="crawl")
+def _update_feed_by_id(mp_id: str) -> None:
+    """按公众号ID执行单个公众号更新(持久化队列只保存ID)"""
+    feed = DB.get_session().query(Feed).filter(Feed.id == mp_id).first()
+    if feed is None:
+        print_warning(f"全量更新跳过：公众号不存在 {mp_id}")
+        return
+    _update_one_feed(feed)
+
+
 def _run_full_update() -> None:
     """Enqueue a full refresh for all subscribed feeds."""
     feeds = []
@@ -82,15 +93,23 @@ def _run_full_update() -> None:
         print_warning("全量更新跳过：当前没有任何订阅公众号")
         return
 
+    from jobs.worker import distributed, enqueue_crawl
+    if distributed():
+        max_page = int(cfg.get("auto_update.max_page", cfg.get("max_page", 1) or 1) or 1)
+        for feed in feeds:
+            enqueue_crawl(str(getattr(feed, "id", "") or ""), max_page=max(1, min(50, max_page)))
+        print_success(f"全量更新任务已投递到 worker 队列：{len(feeds)} 个公众号")
+        return
+
     global _AUTO_UPDATE_QUEUE
     if _AUTO_UPDATE_QUEUE is None:
-        _AUTO_UPDATE_QUEUE = TaskQueueManager(tag="全量更新")
+        _AUTO_UPDATE_QUEUE = TaskQueueManager(tag="全量更新", name="auto_update")
         _AUTO_UPDATE_QUEUE.run_task_background()
 
     print_info(f"全量更新开始：共 {len(feeds)} 个公众号，MaxPage={cfg.get('auto_update.max_page', cfg.get('max_page', 1))}")
     for feed in feeds:
         try:
-            _AUTO_UPDATE_QUEUE.add_task(_update_one_feed, feed)
+            _AUTO_UPDATE_QUEUE.add_task(_update_feed_by_id, str(getattr(feed, "id", "") or ""), _priority="bulk")
         except Exception as e:
             print_error(f"全量更新入队失败：{getattr(feed, 'mp_name', '')}: {e}")
             continue
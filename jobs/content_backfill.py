@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+
+import core.db as db
+from core import cancel
+from core.config import cfg
+from core.models.article import Article, DATA_STATUS
+from core.print import print_error, print_info, print_success, print_warning
+
+DB = db.Db(tag="内容回填")
+
+# 回填顺序：先未读再已读，每个阶段内按发布时间从新到旧
+PHASES = ("unread", "read")
+
+
+class ContentBackfillWorker:
+    """文章正文回填任务
+
+    按 (发布时间, ID) 键集分页流式读取正文为空的文章，使用线程池并发抓取，
+    实际请求速率由全局限流器(core.ratelimit 的 wx)控制。
+    每批处理完成后写入检查点，重启后从上次位置继续。
+    """
+
+    def __init__(self, concurrency: int = None, batch_size: int = None, checkpoint: str = None):
+        self.concurrency = max(1, int(concurrency or cfg.get("gather.backfill.concurrency", 4) or 4))
+        self.batch_size = max(1, int(batch_size or cfg.get("gather.backfill.batch_size", 50) or 50))
+        self.checkpoint = checkpoint or os.path.join(cfg.get("cache.dir", "./data/cache"), "content_backfill.json")
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # api 模式的抓取客户端，每个抓取线程各自创建一个
+        self._local = threading.local()
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self.phase = 0
+        self.cursor = None
+        self.done = 0
+        self.failed = 0
+        self.deleted = 0
+        self.remaining = 0
+        self.started_at = None
+        self.finished_at = None
+
+    # ---------------------------------------------------------------- 检查点
+    def _load_checkpoint(self) -> None:
+        try:
+            with open(self.checkpoint, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.phase = int(data.get("phase", 0))
+            self.cursor = tuple(data["cursor"]) if data.get("cursor") else None
+        except FileNotFoundError:
+            self.phase, self.cursor = 0, None
+        except Exception as e:
+            print_warning(f"读取回填检查点失败，从头开始: {e}")
+            self.phase, self.cursor = 0, None
+
+    def _save_checkpoint(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint) or ".", exist_ok=True)
+            tmp = f"{self.checkpoint}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "phase": self.phase,
+                    "cursor": list(self.cursor) if self.cursor else None,
+                    "done": self.done,
+                    "failed": self.failed,
+                    "updated_at": int(time.time()),
+                }, f)
+            os.replace(tmp, self.checkpoint)
+        except Exception as e:
+            print_warning(f"保存回填检查点失败: {e}")
+
+    # ---------------------------------------------------------------- 查询
+    def _base_query(self, session, columns):
+        return (
+            session.query(*columns)
+            .filter(or_(Article.content.is_(None), Article.content == ""))
+            .filter(Article.status != DATA_STATUS.DELETED)
+        )
+
+    def _phase_filter(self, phase: int):
+        if PHASES[phase] == "unread":
+            return or_(Article.is_read.is_(None), Article.is_read != 1)
+        return Article.is_read == 1
+
+    def _candidates(self, session, limit: int) -> list:
+        publish_time = func.coalesce(Article.publish_time, 0)
+        query = self._base_query(session, (Article.id, Article.url, publish_time, Article.title)).filter(
+            self._phase_filter(self.phase)
+        )
+        if self.cursor:
+            last_time, last_id = self.cursor
+            query = query.filter(or_(
+                publish_time < last_time,
+                and_(publish_time == last_time, Article.id < last_id),
+            ))
+        return query.order_by(publish_time.desc(), Article.id.desc()).limit(limit).all()
+
+    def _count_remaining(self, session) -> int:
+        return self._base_query(session, (func.count(Article.id),)).scalar() or 0
+
+    # ---------------------------------------------------------------- 抓取
+    def _fetch(self, url: str) -> str:
+        if self._stop.is_set():
+            return ""
+        if cfg.get("gather.content_mode", "web") == "api":
+            ga = getattr(self._local, "ga", None)
+            if ga is None:
+                from core.wx.base import WxGather
+                ga = self._local.ga = WxGather().Model()
+            return ga.content_extract(url)
+        from driver.article_extract import ArticleExtractor
+        return ArticleExtractor.extract(url).get("content") or ""
+
+    def _save(self, session, article_id: str, title: str, content: str) -> None:
+        values = {"content": content}
+        if content == "DELETED":
+            values["status"] = DATA_STATUS.DELETED
+            self.deleted += 1
+            print_warning(f"文章 {title} 内容已被发布者删除")
+        session.query(Article).filter(Article.id == article_id).update(values, synchronize_session=False)
+        session.commit()
+
+    # ---------------------------------------------------------------- 执行
+    def run(self, max_items: int = None) -> dict:
+        """同步执行回填直到没有候选文章、被停止或达到 max_items"""
+        if not self._run_lock.acquire(blocking=False):
+            print_warning("正文回填任务正在运行")
+            return self.get_progress()
+        try:
+            self._run(max_items)
+        finally:
+            self._run_lock.release()
+        return self.get_progress()
+
+    def _run(self, max_items: int = None) -> None:
+        self._stop.clear()
+        # 在队列任务中执行时，任务取消/超时即停止回填(已完成的批次有检查点)
+        cancel.on_cancel(self.stop)
+        self._reset_state()
+        self._load_checkpoint()
+        self.started_at = time.time()
+        session = DB.get_session()
+        self.remaining = self._count_remaining(session)
+        if not self.remaining:
+            print_warning("暂无需要获取内容的文章")
+            return
+        print_info(f"开始回填文章正文: 待处理{self.remaining}篇 并发{self.concurrency}")
+        processed = 0
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="正文回填") as pool:
+            while not self._stop.is_set():
+                # 每批不超过 max_items 剩余的数量
+                limit = min(self.batch_size, max_items - processed) if max_items else self.batch_size
+                rows = self._candidates(session, limit)
+                if not rows:
+                    if self.phase + 1 < len(PHASES):
+                        self.phase, self.cursor = self.phase + 1, None
+                        continue
+                    # 全部处理完，下次从头开始(仅剩抓取失败的文章)
+                    self.phase, self.cursor = 0, None
+                    self._save_checkpoint()
+                    break
+                futures = {pool.submit(self._fetch, row[1] or f"https://mp.weixin.qq.com/s/{row[0]}"): row for row in rows}
+                for future in as_completed(futures):
+                    article_id, _url, _time, title = futures[future]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        print_error(f"获取文章 {title} 内容出错: {e}")
+                        content = ""
+                    if self._stop.is_set() and not content:
+                        continue
+                    if content:
+                        try:
+                            self._save(session, article_id, title, content)
+                            self.done += 1
+                        except Exception as e:
+                            session.rollback()
+                            print_error(f"保存文章 {title} 内容失败: {e}")
+                            self.failed += 1
+                    else:
+                        self.failed += 1
+                    self.remaining = max(0, self.remaining - 1)
+                if self._stop.is_set():
+                    # 本批未处理完，不推进游标；已回填的文章不会再被查询到
+                    break
+                self.cursor = (rows[-1][2], rows[-1][0])
+                self._save_checkpoint()
+                # 队列执行期限按批续期：整体可超过分组期限，单批卡住仍会超时
+                cancel.extend()
+                processed += len(rows)
+                progress = self.get_progress()
+                print_info(f"正文回填进度: 成功{self.done} 失败{self.failed} 剩余{self.remaining} 预计{progress['eta']}秒")
+                if max_items and processed >= max_items:
+                    break
+        self.finished_at = time.time()
+        print_success(f"正文回填结束: 成功{self.done} 失败{self.failed} 已删除{self.deleted}")
+
+    def start(self, max_items: int = None) -> bool:
+        """在后台线程中启动回填，已在运行时返回False"""
+        if self.is_running():
+            return False
+        self._thread = threading.Thread(target=self.run, args=(max_items,), name="正文回填", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self._run_lock.locked()
+
+    def get_progress(self) -> dict:
+        elapsed = 0.0
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        handled = self.done + self.failed
+        speed = handled / elapsed if elapsed > 0 else 0.0
+        return {
+            "running": self.is_running(),
+            "phase": PHASES[self.phase],
+            "done": self.done,
+            "failed": self.failed,
+            "deleted": self.deleted,
+            "remaining": self.remaining,
+            "elapsed": round(elapsed, 1),
+            "speed": round(speed, 3),
+            "eta": int(self.remaining / speed) if speed > 0 else None,
+            "concurrency": self.concurrency,
+        }
+
+
+ContentBackfill = ContentBackfillWorker()
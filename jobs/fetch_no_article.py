@@ -1,63 +1,29 @@
-from core.models.article import Article,DATA_STATUS
-import core.db as db
-from core.wait import Wait
-from core.wx.base import WxGather
-from time import sleep
-from core.print import print_success,print_error
-import random
-from driver.wxarticle import Web
-DB=db.Db(tag="内容修正")
-def fetch_articles_without_content():
+from jobs.content_backfill import ContentBackfill
+from core.queue import register_task
+@register_task("content.backfill", tag="content")
+def fetch_articles_without_content(max_items: int = None):
     """
-    查询content为空的文章，调用微信内容提取方法获取内容并更新数据库
+    查询content为空的文章，并发抓取内容并更新数据库(支持断点续传)
+
+    Args:
+        max_items: 本次最多处理的文章数，默认读取 gather.backfill.tick_items，0为处理到全部完成
     """
-    session = DB.get_session()
-    ga=WxGather().Model()
+    if max_items is None:
+        max_items = tick_items()
     try:
-        # 查询content为空的文章
-        from sqlalchemy import or_
-        articles = session.query(Article).filter(or_(Article.content.is_(None), Article.content == "")).limit(10).all()
-        
-        if not articles:
-            print_warning("暂无需要获取内容的文章")
-            return
-        
-        for article in articles:
-            # 构建URL
-            if article.url:
-                url = article.url
-            else:
-                url = f"https://mp.weixin.qq.com/s/{article.id}"
-            
-            print(f"正在处理文章: {article.title}, URL: {url}")
-            
-            # 获取内容
-            if cfg.get("gather.content_mode","web"):
-                content=Web.get_article_content(url).get("content")
-            else:
-                content = ga.content_extract(url)
-            if content:
-                # 更新内容
-                article.content = content
-                if  content=="DELETED":
-                    print_error(f"获取文章 {article.title} 内容已被发布者删除")
-                    article.status = DATA_STATUS.DELETED
-                session.commit()
-                print_success(f"成功更新文章 {article.title} 的内容")
-            else:
-                print_error(f"获取文章 {article.title} 内容失败")
-            Wait(min=5,max=10,tips=f"修正 {article.title}... 完成")   
+        ContentBackfill.run(max_items or None)
     except Exception as e:
         print(f"处理过程中发生错误: {e}")
-    finally:
-        Web.Close()
 from core.task import TaskScheduler
 from core.queue import TaskQueueManager
-scheduler=TaskScheduler()
-task_queue=TaskQueueManager()
+scheduler=TaskScheduler(name="内容同步")
+task_queue=TaskQueueManager(tag="内容同步",name="content")
 task_queue.run_task_background()
 from core.config import cfg
 from core.print import print_success,print_warning
+def tick_items() -> int:
+    """定时同步每次最多处理的文章数(0为不限)"""
+    return int(cfg.get("gather.backfill.tick_items", 10) or 0)
 def start_sync_content():
     """
     根据配置自动启动文章内容同步任务
@@ -72,6 +38,7 @@ def start_sync_content():
         无显式参数，从配置中读取以下设置：
         - gather.content_auto_check: 是否启用自动同步功能
         - gather.content_auto_interval: 同步间隔时间（分钟）
+        - gather.backfill.tick_items: 每次同步最多处理的文章数
     
     Returns:
         None
@@ -87,7 +54,11 @@ def start_sync_content():
     task_queue.clear_queue()
     scheduler.clear_all_jobs()
     def do_sync():
-        task_queue.add_task(fetch_articles_without_content)
+        from jobs.worker import distributed, enqueue_backfill
+        if distributed():
+            enqueue_backfill(tick_items() or None)
+        else:
+            task_queue.add_task(fetch_articles_without_content,_priority="bulk")
     job_id=scheduler.add_cron_job(do_sync,cron_expr=cron_exp)
     print_success(f"已添自动同步文章内容任务: {job_id}")
     scheduler.start()
@@ -0,0 +1,326 @@
+"""基础洞察批量回填
+
+为已有文章批量生成基础洞察(摘要/一级二级标题/内容哈希，以及本地抽取式关键信息)并写入相关文章索引。
+按文章ID键集分页流式读取，正文解析在进程池中并行(占满所有CPU核心)，结果按批批量写入 article_insights，
+每批完成后写入检查点(游标与累计计数)，重启后从上次位置继续。
+解析进程使用 forkserver/spawn 方式启动，避免从多线程的 API 进程 fork 出持有锁的子进程。
+
+命令行:
+  python -m jobs.insights_backfill [--workers N] [--batch-size N] [--max-items N] [--restart]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import core.db as db
+from core import cancel
+from core.config import cfg
+from core.insights import related
+from core.models.article import Article, DATA_STATUS
+from core.models.article_insight import ArticleInsight
+from core.print import print_error, print_info, print_success, print_warning
+
+DB = db.Db(tag="洞察回填")
+
+
+def build_basic_insight(row: tuple) -> dict:
+    """在子进程中执行：解析正文，返回基础洞察字段(与 InsightsService.get_or_create_basic 一致)"""
+    from core.insights import extractive, related
+    from core.insights.extract import compute_content_hash, parse_article
+
+    article_id, title, description, content, summary_max_len, headings_max_items, local_key_points, related_dim = row
+    parsed = parse_article(content)
+    summary = parsed.summary(description, max_len=summary_max_len)
+    if not (summary or "").strip():
+        summary = (title or "").strip()[:summary_max_len]
+    # 摘要为空的文章同时回填摘要，内容哈希与回填后的字段保持一致
+    if summary and not (description or "").strip():
+        description = summary
+        fill_description = True
+    else:
+        fill_description = False
+    key_points = None
+    if local_key_points and extractive.available():
+        # 本地抽取式关键信息(无需LLM)
+        data = extractive.summarize(parsed, title=title or "")
+        if data.get("points"):
+            key_points = json.dumps({**data, "source": "local"}, ensure_ascii=False)
+    return {
+        "article_id": article_id,
+        "summary": summary,
+        "key_points_json": key_points,
+        "headings_json": json.dumps(parsed.heading_items((1, 2), max_items=headings_max_items), ensure_ascii=False),
+        "content_hash": compute_content_hash(description, content),
+        "description": description if fill_description else None,
+        # 相关文章索引的词频向量(IDF在主进程中按全局文档频率计算)
+        "related_tf": related.hashed_tf(title or "", parsed.text or description or "", related_dim) if related_dim else None,
+    }
+
+
+def _mp_context():
+    """解析进程的启动方式：优先 forkserver(POSIX)，否则 spawn"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class InsightsBackfillWorker:
+    """基础洞察回填任务"""
+
+    def __init__(self, workers: int = None, batch_size: int = None, checkpoint: str = None,
+                 index: "related.RelatedIndex" = None):
+        self.workers = max(1, int(workers or cfg.get("insights.backfill.workers", 0) or os.cpu_count() or 1))
+        self.batch_size = max(1, int(batch_size or cfg.get("insights.backfill.batch_size", 500) or 500))
+        self.checkpoint = checkpoint or os.path.join(cfg.get("cache.dir", "./data/cache"), "insights_backfill.json")
+        self.db = DB
+        # 相关文章索引，默认为进程内共享的 related.Related
+        self.index = index if index is not None else related.Related
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self.cursor = None
+        self.scanned = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        # 从检查点继续时，之前各次运行累计的耗时
+        self.elapsed_before = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    # ---------------------------------------------------------------- 检查点
+    def _load_checkpoint(self) -> None:
+        """恢复未完成的回填：游标与累计计数(已完成的检查点游标为空，重新计数)"""
+        try:
+            with open(self.checkpoint, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print_warning(f"读取洞察回填检查点失败，从头开始: {e}")
+            return
+        self.cursor = data.get("cursor")
+        if not self.cursor:
+            return
+        self.scanned = int(data.get("scanned", 0))
+        self.created = int(data.get("created", 0))
+        self.updated = int(data.get("updated", 0))
+        self.skipped = int(data.get("skipped", 0))
+        self.failed = int(data.get("failed", 0))
+        self.elapsed_before = float(data.get("elapsed", 0.0))
+
+    def _save_checkpoint(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint) or ".", exist_ok=True)
+            tmp = f"{self.checkpoint}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "cursor": self.cursor,
+                    "scanned": self.scanned,
+                    "created": self.created,
+                    "updated": self.updated,
+                    "skipped": self.skipped,
+                    "failed": self.failed,
+                    "elapsed": round(self._elapsed(), 1),
+                    "updated_at": int(time.time()),
+                }, f)
+            os.replace(tmp, self.checkpoint)
+        except Exception as e:
+            print_warning(f"保存洞察回填检查点失败: {e}")
+
+    # ---------------------------------------------------------------- 查询
+    def _batch(self, session) -> list:
+        query = (
+            session.query(Article.id, Article.title, Article.description, Article.content,
+                          ArticleInsight.id, ArticleInsight.content_hash, Article.mp_id, Article.publish_time)
+            .outerjoin(ArticleInsight, ArticleInsight.article_id == Article.id)
+            .filter(Article.status != DATA_STATUS.DELETED)
+        )
+        if self.cursor:
+            query = query.filter(Article.id > self.cursor)
+        return query.order_by(Article.id.asc()).limit(self.batch_size).all()
+
+    def _write(self, session, rows: list, results: list) -> None:
+        """批量写入本批结果：新建/更新 article_insights，并回填缺失的文章摘要"""
+        existing = {row[0]: (row[4], row[5]) for row in rows}
+        self._index(rows, results)
+        provider = cfg.get("llm.provider", "siliconflow")
+        model = cfg.get("llm.siliconflow.model", "")
+        now = datetime.now()
+        inserts, updates, descriptions = [], [], []
+        for item in results:
+            insight_id, content_hash = existing[item["article_id"]]
+            if insight_id is not None and content_hash == item["content_hash"]:
+                self.skipped += 1
+                continue
+            values = {
+                "summary": item["summary"],
+                "headings_json": item["headings_json"],
+                "content_hash": item["content_hash"],
+                "status": 1,
+                "error": "",
+                "llm_provider": provider,
+                "llm_model": model,
+                "updated_at": now,
+            }
+            if item["key_points_json"] is not None:
+                values["key_points_json"] = item["key_points_json"]
+            if insight_id is None:
+                inserts.append({"article_id": item["article_id"], "created_at": now, **values})
+            else:
+                updates.append({"id": insight_id, **values})
+            if item["description"] is not None:
+                descriptions.append({"id": item["article_id"], "description": item["description"], "updated_at": now})
+        try:
+            if inserts:
+                session.bulk_insert_mappings(ArticleInsight, inserts)
+            if updates:
+                session.bulk_update_mappings(ArticleInsight, updates)
+            if descriptions:
+                session.bulk_update_mappings(Article, descriptions)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        self.created += len(inserts)
+        self.updated += len(updates)
+
+    def _index(self, rows: list, results: list) -> None:
+        """写入相关文章索引(新文章或内容变化的文章)，整批只加一次跨进程写锁"""
+        if all(item["related_tf"] is None for item in results):
+            return
+        meta = {row[0]: row for row in rows}
+        with self.index.writing():
+            for item in results:
+                if item["related_tf"] is None:
+                    continue
+                row = meta[item["article_id"]]
+                if item["article_id"] in self.index and row[5] == item["content_hash"]:
+                    continue
+                self.index.add_tf(row[0], row[6], row[7], *item["related_tf"])
+        self.index.flush()
+
+    # ---------------------------------------------------------------- 执行
+    def run(self, max_items: int = None, restart: bool = False) -> dict:
+        """同步执行回填直到处理完全部文章、被停止或达到 max_items"""
+        if not self._run_lock.acquire(blocking=False):
+            print_warning("洞察回填任务正在运行")
+            return self.get_progress()
+        try:
+            self._run(max_items, restart)
+        finally:
+            self._run_lock.release()
+        return self.get_progress()
+
+    def _run(self, max_items: int = None, restart: bool = False) -> None:
+        self._stop.clear()
+        cancel.on_cancel(self.stop)
+        self._reset_state()
+        if not restart:
+            self._load_checkpoint()
+        self.started_at = time.time()
+        # max_items 按本次运行计数，scanned 为包含检查点在内的累计值
+        scanned_start = self.scanned
+        session = self.db.get_session()
+        params = (
+            int(cfg.get("insights.summary_max_len", 200)),
+            int(cfg.get("insights.headings_max_items", 20)),
+            bool(cfg.get("insights.local_key_points", True)),
+            self.index.dim if related.available() else 0,
+        )
+        print_info(f"开始回填基础洞察: 进程{self.workers} 每批{self.batch_size}"
+                   + (f" 从 {self.cursor} 之后继续" if self.cursor else ""))
+        with ProcessPoolExecutor(self.workers, mp_context=_mp_context()) as pool:
+            chunksize = max(1, self.batch_size // (self.workers * 4))
+            while not self._stop.is_set():
+                rows = self._batch(session)
+                session.commit()
+                if not rows:
+                    # 全部处理完，下次从头开始
+                    self.cursor = None
+                    self._save_checkpoint()
+                    break
+                todo = [(row[0], row[1], row[2], row[3]) + params for row in rows]
+                try:
+                    results = list(pool.map(build_basic_insight, todo, chunksize=chunksize))
+                    self._write(session, rows, results)
+                except Exception as e:
+                    # 整批失败时不推进游标，下次从本批重新开始
+                    self.failed += len(rows)
+                    print_error(f"洞察回填批次失败({rows[0][0]}~{rows[-1][0]}): {e}")
+                    break
+                self.scanned += len(rows)
+                self.cursor = rows[-1][0]
+                self._save_checkpoint()
+                progress = self.get_progress()
+                print_info(f"洞察回填进度: 已扫描{self.scanned} 新建{self.created} 更新{self.updated} "
+                           f"未变化{self.skipped} {progress['speed']}篇/秒")
+                if max_items and self.scanned - scanned_start >= max_items:
+                    break
+        self.finished_at = time.time()
+        progress = self.get_progress()
+        print_success(f"洞察回填结束: 扫描{self.scanned} 新建{self.created} 更新{self.updated} "
+                      f"未变化{self.skipped} 失败{self.failed} 耗时{progress['elapsed']}秒 {progress['speed']}篇/秒")
+
+    def start(self, max_items: int = None, restart: bool = False) -> bool:
+        """在后台线程中启动回填，已在运行时返回False"""
+        if self.is_running():
+            return False
+        self._thread = threading.Thread(target=self.run, args=(max_items, restart), name="洞察回填", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self._run_lock.locked()
+
+    def _elapsed(self) -> float:
+        elapsed = self.elapsed_before
+        if self.started_at:
+            elapsed += (self.finished_at or time.time()) - self.started_at
+        return elapsed
+
+    def get_progress(self) -> dict:
+        elapsed = self._elapsed()
+        return {
+            "running": self.is_running(),
+            "cursor": self.cursor,
+            "scanned": self.scanned,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed": round(elapsed, 1),
+            "speed": round(self.scanned / elapsed, 1) if elapsed > 0 else 0.0,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+        }
+
+
+InsightsBackfill = InsightsBackfillWorker()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批量回填基础洞察(摘要/标题/内容哈希)")
+    parser.add_argument("--workers", type=int, default=None, help="解析进程数，默认CPU核心数")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批文章数")
+    parser.add_argument("--max-items", type=int, default=None, help="本次最多处理的文章数")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点从头开始")
+    args, _ = parser.parse_known_args()
+    worker = InsightsBackfillWorker(workers=args.workers, batch_size=args.batch_size)
+    print(json.dumps(worker.run(args.max_items, args.restart), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
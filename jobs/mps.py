@@ -23,7 +23,6 @@ def fetch_all_article():
                 wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
             except Exception as e:
                 print(e)
-        print(wx.articles) 
     except Exception as e:
         print(e)         
     finally:
@@ -37,12 +36,15 @@ from core.models.message_task import MessageTask
 # from core.queue import TaskQueue
 from .webhook import web_hook
 interval=int(cfg.get("interval",60)) # 每隔多少秒执行一次
-def do_job(mp=None,task:MessageTask=None):
+def do_job(mp=None,task:MessageTask=None,run_id:str=None):
         # TaskQueue.add_task(test,info=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         # print("执行任务", task.mps_id)
         print("执行任务")
         all_count=0
         wx=WxGather().Model()
+        # 仅收集本次任务新增的文章用于WebHook通知
+        articles=[]
+        wx.add_sink(articles.append)
         try:
             wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=1,Over_CallBack=Update_Over,interval=interval)
         except Exception as e:
@@ -51,22 +53,44 @@ def do_job(mp=None,task:MessageTask=None):
         finally:
             count=wx.all_count()
             all_count+=count
-            from jobs.webhook import MessageWebHook 
-            tms=MessageWebHook(task=task,feed=mp,articles=wx.articles)
-            web_hook(tms)
+            if run_id:
+                # 汇总模式：记录本公众号的新文章，全部公众号完成后统一发送
+                from jobs.notice_digest import Digest
+                Digest.add(run_id,task,mp,articles)
+            else:
+                from jobs.webhook import MessageWebHook 
+                tms=MessageWebHook(task=task,feed=mp,articles=articles)
+                web_hook(tms)
             print_success(f"任务({task.id})[{mp.mp_name}]执行成功,{count}成功条数")
 
 from core.queue import TaskQueue
 def add_job(feeds:list[Feed]=None,task:MessageTask=None,isTest=False):
     if isTest:
         TaskQueue.clear_queue()
+    from jobs.worker import distributed, enqueue_crawl, crawl_feed
+    from jobs.notice_digest import Digest
+    task_id=task.id if task is not None else None
+    # 本次运行所有公众号的新文章汇总后统一通知
+    run_id=Digest.start(task) if Digest.enabled(task) else None
+    count=0
     for feed in feeds:
-        TaskQueue.add_task(do_job,feed,task)
+        if distributed():
+            # 分布式模式下投递到数据库队列，由独立 worker 执行
+            enqueue_crawl(feed.id, task_id, run_id=run_id)
+        elif run_id:
+            # 与等待中的同一公众号任务合并，以本次运行为准
+            TaskQueue.add_task(crawl_feed,feed.id,task_id,run_id=run_id,_key=f"crawl:{feed.id}:{task_id}",_latest=True)
+        else:
+            # 按ID投递，任务可持久化并在重启后继续执行
+            TaskQueue.add_task(crawl_feed,feed.id,task_id)
+        count+=1
         if isTest:
             print(f"测试任务，{feed.mp_name}，加入队列成功")
             reload_job()
             break
         print(f"{feed.mp_name}，加入队列成功")
+    if run_id:
+        Digest.set_expected(run_id,count)
     print_success(TaskQueue.get_queue_info())
     pass
 import json
@@ -77,7 +101,7 @@ def get_feeds(task:MessageTask=None):
      if len(mps)==0:
         mps=wx_db.get_all_mps()
      return mps
-scheduler=TaskScheduler()
+scheduler=TaskScheduler(name="消息任务")
 def reload_job():
     print_success("重载任务")
     scheduler.clear_all_jobs()
@@ -119,12 +143,21 @@ def start_all_task():
     from jobs.fetch_no_article import start_sync_content
     start_sync_content()
     start_job()
+    # 启动通知发送服务，继续发送上次未发送完的消息
+    from core.notice.delivery import Delivery
+    Delivery.start()
     try:
         from jobs.auto_update import start_auto_update
 
         start_auto_update()
     except Exception as e:
         print_error(f"启动自动全量更新失败: {e}")
+    try:
+        from jobs.topics import start_topics
+
+        start_topics()
+    except Exception as e:
+        print_error(f"启动话题聚类失败: {e}")
 if __name__ == '__main__':
     # do_job()
     # start_all_task()
@@ -0,0 +1,175 @@
+"""消息任务运行汇总
+
+一次消息任务运行(add_job)会为每个公众号投递一个采集任务。启用汇总时，
+各采集任务把新文章写入 message_task_run_items，最后一个完成的采集任务
+(已完成的公众号数达到投递数)负责渲染并发送汇总消息，
+同一次运行的通知从"每个公众号一条"减少为按平台大小上限拆分的几条。
+"""
+import json
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import and_, func, update
+
+from core.config import cfg
+from core.models.feed import Feed
+from core.models.message_task import MessageTask
+from core.models.message_task_run import MessageTaskRun, MessageTaskRunItem
+from core.print import print_error, print_info, print_warning
+
+COLLECTING = 0
+SENT = 1
+
+
+class TaskRunDigest:
+    def __init__(self, db=None):
+        self._db = db
+        self._table_ready = False
+        self._lock = threading.Lock()
+        # 部分采集任务丢失(进程崩溃等)时，最多等待该时间后发送已收集的部分
+        self.timeout = float(cfg.get("webhook.digest_timeout", 1800) or 1800)
+
+    @property
+    def db(self):
+        if self._db is None:
+            from core.db import DB
+            self._db = DB
+        return self._db
+
+    def _session(self):
+        if not self._table_ready:
+            with self._lock:
+                if not self._table_ready:
+                    engine = self.db.get_engine()
+                    MessageTaskRun.__table__.create(bind=engine, checkfirst=True)
+                    MessageTaskRunItem.__table__.create(bind=engine, checkfirst=True)
+                    self._table_ready = True
+        return self.db.get_session()
+
+    @staticmethod
+    def enabled(task: MessageTask) -> bool:
+        """只汇总消息类通知(message_type=0)，webhook 的 JSON 模板描述的是单个公众号"""
+        if task is None or task.message_type != 0 or not task.web_hook_url:
+            return False
+        return str(cfg.get("webhook.digest", True)).lower() == "true"
+
+    # ---------------------------------------------------------------- 运行
+    def start(self, task: MessageTask) -> str:
+        """开始一次运行，返回 run_id；上一次未发送完的运行先发送已收集的部分"""
+        session = self._session()
+        previous = [row[0] for row in session.query(MessageTaskRun.id)
+                    .filter(MessageTaskRun.task_id == task.id, MessageTaskRun.status == COLLECTING).all()]
+        session.commit()
+        for run_id in previous:
+            self.flush(run_id)
+        run_id = uuid.uuid4().hex
+        try:
+            session.add(MessageTaskRun(id=run_id, task_id=task.id, expected=0, status=COLLECTING,
+                                       created_at=datetime.now()))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        timer = threading.Timer(self.timeout, self.flush, args=(run_id,))
+        timer.daemon = True
+        timer.start()
+        return run_id
+
+    def set_expected(self, run_id: str, expected: int) -> None:
+        """投递完成后记录本次的公众号数(采集可能已全部完成，需再检查一次)"""
+        session = self._session()
+        try:
+            session.execute(update(MessageTaskRun).where(MessageTaskRun.id == run_id).values(expected=expected))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if expected <= 0:
+            self.flush(run_id)
+        else:
+            self._check(run_id)
+
+    def add(self, run_id: str, task: MessageTask, feed: Feed, articles: list) -> None:
+        """记录单个公众号本次采集到的新文章(采集失败时 articles 为空也需调用)"""
+        from jobs.webhook import article_fields
+
+        rows = [article_fields(article) for article in articles]
+        # 模板不使用正文时不保存正文
+        if "content" not in (task.message_template or ""):
+            for row in rows:
+                row.pop("content", None)
+        session = self._session()
+        try:
+            # 重试时覆盖上次的记录
+            session.merge(MessageTaskRunItem(run_id=run_id, mp_id=feed.id,
+                                             articles=json.dumps(rows, ensure_ascii=False, default=str),
+                                             created_at=datetime.now()))
+            session.commit()
+            run = session.query(MessageTaskRun).filter(MessageTaskRun.id == run_id).first()
+            status = run.status if run is not None else None
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if status == COLLECTING:
+            self._check(run_id)
+        elif rows:
+            # 汇总已发送(超时或已开始下一次运行)，迟到的文章单独发送
+            from jobs.webhook import send_digest
+            send_digest(task, [(feed, rows)])
+
+    def _check(self, run_id: str) -> None:
+        session = self._session()
+        run = session.query(MessageTaskRun).filter(MessageTaskRun.id == run_id).first()
+        done = session.query(func.count(MessageTaskRunItem.mp_id)).filter(MessageTaskRunItem.run_id == run_id).scalar()
+        session.commit()
+        if run is not None and run.status == COLLECTING and run.expected and done >= run.expected:
+            self.flush(run_id)
+
+    def flush(self, run_id: str) -> int:
+        """发送汇总消息(每次运行只发送一次)，返回发送的消息条数"""
+        from jobs.webhook import send_digest
+
+        session = self._session()
+        try:
+            # 条件更新保证多个进程/线程中只有一个发送
+            claimed = session.execute(
+                update(MessageTaskRun)
+                .where(and_(MessageTaskRun.id == run_id, MessageTaskRun.status == COLLECTING))
+                .values(status=SENT, sent_at=datetime.now())
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return 0
+            run = session.query(MessageTaskRun).filter(MessageTaskRun.id == run_id).first()
+            task = session.query(MessageTask).filter(MessageTask.id == run.task_id).first()
+            items = session.query(MessageTaskRunItem).filter(MessageTaskRunItem.run_id == run_id).all()
+            feeds = {feed.id: feed for feed in
+                     session.query(Feed).filter(Feed.id.in_([item.mp_id for item in items])).all()}
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print_error(f"读取消息任务汇总失败({run_id}): {e}")
+            return 0
+        if task is None:
+            return 0
+        groups = []
+        for item in items:
+            feed = feeds.get(item.mp_id)
+            articles = json.loads(item.articles or "[]")
+            if feed is not None and articles:
+                groups.append((feed, articles))
+        if run.expected and len(items) < run.expected:
+            print_warning(f"任务({task.id})汇总超时，{run.expected - len(items)}个公众号未完成，先发送已收集的文章")
+        if not groups:
+            print_info(f"任务({task.id})本次没有新文章")
+            return 0
+        count = send_digest(task, groups)
+        print_info(f"任务({task.id})汇总发送: {len(groups)}个公众号 "
+                   f"{sum(len(a) for _, a in groups)}篇文章 {count}条消息")
+        return count
+
+
+# 进程内共享
+Digest = TaskRunDigest()
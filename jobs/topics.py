@@ -0,0 +1,38 @@
+"""话题聚类定时任务(跨公众号热点/预警)
+
+按 insights.topics.cron 周期性地把相关文章索引中新增的文章增量聚类到话题中，
+每轮受 insights.topics.cpu_budget 限制，处理不完的留到下一轮。
+"""
+from core.config import cfg
+from core.print import print_error, print_success, print_warning
+from core.task import TaskScheduler
+
+_TOPICS_SCHEDULER = TaskScheduler(name="话题聚类")
+
+
+def _run_cycle() -> None:
+    from core.insights.topics import Topics
+
+    try:
+        Topics.run_cycle()
+    except Exception as e:
+        print_error(f"话题聚类失败: {e}")
+
+
+def start_topics() -> None:
+    from core.insights import topics
+
+    if not topics.available():
+        print_warning("话题聚类未启用(需开启 insights.related 和 insights.topics 并安装numpy)")
+        return
+
+    # 避免重复调用 start_all_task() 时重复添加任务
+    try:
+        _TOPICS_SCHEDULER.clear_all_jobs()
+    except Exception:
+        pass
+
+    cron = str(cfg.get("insights.topics.cron", "*/10 * * * *") or "*/10 * * * *")
+    _TOPICS_SCHEDULER.add_cron_job(_run_cycle, cron_expr=cron, job_id="topics-cluster", tag="话题聚类")
+    _TOPICS_SCHEDULER.start()
+    print_success(f"话题聚类已启用：{cron}")
@@ -11,6 +11,7 @@ from core.config import cfg
 from bs4 import BeautifulSoup
 from core.content_format import format_content
 import re
+import json
 @dataclass
 class MessageWebHook:
     task: MessageTask
@@ -18,6 +19,18 @@ class MessageWebHook:
     articles: list[Article]
     pass
 
+# 消息(message_type=0)默认模板
+DEFAULT_MESSAGE_TEMPLATE = """
+### {{feed.mp_name}} 订阅消息：
+{% if articles %}
+{% for article in articles %}
+- [**{{ article.title }}**]({{article.url}}) ({{ article.publish_time }})\n
+{% endfor %}
+{% else %}
+- 暂无文章\n
+{% endif %}
+    """
+
 def send_message(hook: MessageWebHook) -> str:
     """
     发送格式化消息
@@ -28,16 +41,7 @@ def send_message(hook: MessageWebHook) -> str:
     返回:
         str: 格式化后的消息内容
     """
-    template = hook.task.message_template if hook.task.message_template else """
-### {{feed.mp_name}} 订阅消息：
-{% if articles %}
-{% for article in articles %}
-- [**{{ article.title }}**]({{article.url}}) ({{ article.publish_time }})\n
-{% endfor %}
-{% else %}
-- 暂无文章\n
-{% endif %}
-    """
+    template = hook.task.message_template if hook.task.message_template else DEFAULT_MESSAGE_TEMPLATE
     parser = TemplateParser(template)
     data = {
         "feed": hook.feed,
@@ -51,6 +55,73 @@ def send_message(hook: MessageWebHook) -> str:
     notice(hook.task.web_hook_url, hook.task.name, message)
     return message
 
+# webhook(message_type=1)结构化负载默认包含的文章字段(与默认模板一致)
+DEFAULT_PAYLOAD_FIELDS = ["id", "mp_id", "title", "pic_url", "url", "description", "publish_time"]
+
+def payload_spec(template: str):
+    """
+    判断webhook任务是否使用结构化负载，返回字段配置；使用文本模板时返回None
+    
+    模板为空时按默认字段生成；模板为JSON对象且包含 fields 列表(不含模板语法)时按指定字段生成，如:
+        {"fields": ["id", "title", "url", "content"], "content_format": "markdown"}
+    """
+    template = (template or "").strip()
+    if not template:
+        return {"fields": DEFAULT_PAYLOAD_FIELDS}
+    if not template.startswith("{") or "{{" in template or "{%" in template:
+        return None
+    try:
+        spec = json.loads(template)
+    except ValueError:
+        return None
+    if not isinstance(spec, dict) or not isinstance(spec.get("fields"), list):
+        return None
+    return spec
+
+def build_payload(task: MessageTask, feed: Feed, articles: list, spec: dict = None) -> dict:
+    """
+    直接由文章数据构建webhook负载(只取需要的字段，正文仅在包含 content 字段时转换格式)
+    
+    参数:
+        articles: Article对象或采集回调的文章字典
+        spec: payload_spec 返回的字段配置
+    """
+    spec = spec or {"fields": DEFAULT_PAYLOAD_FIELDS}
+    fields = [name for name in spec.get("fields") or DEFAULT_PAYLOAD_FIELDS if isinstance(name, str)]
+    content_format = spec.get("content_format") or cfg.get("webhook.content_format", "html")
+    rows = []
+    for article in articles:
+        row = {}
+        for name in fields:
+            value = article.get(name) if isinstance(article, dict) else getattr(article, name, None)
+            if name == "publish_time" and isinstance(value, (int, float)):
+                value = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+            elif name == "content" and value:
+                value = format_content(value, content_format)
+            row[name] = "" if value is None else value
+        rows.append(row)
+    return {
+        "feed": {"id": feed.id, "name": feed.mp_name},
+        "articles": rows,
+        "task": {"id": task.id, "name": task.name},
+        "now": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def send_payload(hook: MessageWebHook, spec: dict) -> str:
+    """
+    以结构化负载调用webhook(不经过文本模板)
+    """
+    from core.notice.delivery import Delivery, dumps
+    if not hook.task.web_hook_url:
+        logger.error("web_hook_url为空")
+        return
+    payload = dumps(build_payload(hook.task, hook.feed, hook.articles, spec))
+    try:
+        Delivery.enqueue(hook.task.web_hook_url, payload, kind="webhook", title=hook.task.name)
+        return "Webhook已加入发送队列"
+    except Exception as e:
+        raise ValueError(f"Webhook调用失败: {str(e)}")
+
 def call_webhook(hook: MessageWebHook) -> str:
     """
     调用webhook接口发送数据
@@ -62,7 +133,7 @@ def call_webhook(hook: MessageWebHook) -> str:
         str: 调用结果信息
         
     异常:
-        ValueError: 当webhook调用失败时抛出
+        ValueError: 当webhook写入发送队列失败时抛出
     """
     template = hook.task.message_template if hook.task.message_template else """{
   "feed": {
@@ -117,7 +188,6 @@ def call_webhook(hook: MessageWebHook) -> str:
     }
    
    # 预处理content字段
-    import json
     def process_content(content):
         if content is None:
             return ""
@@ -144,20 +214,61 @@ def call_webhook(hook: MessageWebHook) -> str:
     if not hook.task.web_hook_url:
         logger.error("web_hook_url为空")
         return 
-    # 发送webhook请求
-    import requests
+    # 写入发件箱后立即返回，由发送服务异步投递(失败自动重试)，不阻塞采集队列
+    from core.notice.delivery import Delivery
     # print_success(f"发送webhook请求{payload}")
     try:
-        response = requests.post(
-            hook.task.web_hook_url,
-            data=payload,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
-        return "Webhook调用成功"
+        Delivery.enqueue(hook.task.web_hook_url, payload, kind="webhook", title=hook.task.name)
+        return "Webhook已加入发送队列"
     except Exception as e:
         raise ValueError(f"Webhook调用失败: {str(e)}")
 
+def send_digest(task: MessageTask, groups: list) -> int:
+    """
+    汇总发送一次任务运行中所有公众号的新文章
+    
+    模板只解析一次，按公众号逐段渲染后按平台消息大小上限合并为尽量少的几条消息发送
+    
+    参数:
+        task: 消息任务
+        groups: [(feed, articles), ...]，articles 为 article_fields 处理后的字典列表
+        
+    返回:
+        int: 发送的消息条数
+    """
+    from core.notice import notice_batch
+    parser = TemplateParser(task.message_template or DEFAULT_MESSAGE_TEMPLATE)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    sections = [
+        parser.render({"feed": feed, "articles": articles, "task": task, "now": now}).strip()
+        for feed, articles in groups if articles
+    ]
+    return notice_batch(task.web_hook_url, task.name, [s for s in sections if s])
+
+def article_fields(article) -> dict:
+    """
+    将Article对象或字典统一为包含Article所有列的字典，publish_time 转为时间字符串
+    """
+    if isinstance(article, dict):
+        # 如果是字典类型，直接使用
+        return {
+            field.name: (
+                datetime.fromtimestamp(article[field.name]).strftime("%Y-%m-%d %H:%M:%S")
+                if field.name == "publish_time" and field.name in article
+                else article.get(field.name, "")
+            )
+            for field in Article.__table__.columns
+        }
+    # 如果是Article对象，使用getattr获取属性
+    return {
+        field.name: (
+            datetime.fromtimestamp(getattr(article, field.name)).strftime("%Y-%m-%d %H:%M:%S")
+            if field.name == "publish_time"
+            else getattr(article, field.name)
+        )
+        for field in Article.__table__.columns
+    }
+
 def web_hook(hook:MessageWebHook):
     """
     根据消息类型路由到对应的处理函数
@@ -178,28 +289,13 @@ def web_hook(hook:MessageWebHook):
             # raise ValueError("没有更新到文章")
             logger.warning("没有更新到文章")
             return 
+        if hook.task.message_type == 1:
+            spec = payload_spec(hook.task.message_template)
+            if spec is not None:
+                # 结构化负载直接使用原始文章数据，无需转换所有字段
+                return send_payload(hook, spec)
         for article in hook.articles:
-            if isinstance(article, dict):
-                # 如果是字典类型，直接使用
-                processed_article = {
-                    field.name: (
-                        datetime.fromtimestamp(article[field.name]).strftime("%Y-%m-%d %H:%M:%S")
-                        if field.name == "publish_time" and field.name in article
-                        else article.get(field.name, "")
-                    )
-                    for field in Article.__table__.columns
-                }
-            else:
-                # 如果是Article对象，使用getattr获取属性
-                processed_article = {
-                    field.name: (
-                        datetime.fromtimestamp(getattr(article, field.name)).strftime("%Y-%m-%d %H:%M:%S")
-                        if field.name == "publish_time"
-                        else getattr(article, field.name)
-                    )
-                    for field in Article.__table__.columns
-                }
-            processed_articles.append(processed_article)
+            processed_articles.append(article_fields(article))
         
         hook.articles = processed_articles
         
@@ -0,0 +1,226 @@
+"""独立采集 worker
+
+从共享数据库的 queue_jobs 表领取公众号采集/正文抓取任务执行，可在多个节点同时运行:
+
+    python -m jobs.worker --concurrency 2
+
+API 进程在配置 worker.distributed=True 时只负责投递任务，不再在进程内执行采集。
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from core.cancel import CancelToken, bind
+from core.config import cfg
+from core.print import print_error, print_info, print_success, print_warning
+from core.queue.lease import LeaseQueue
+from core.queue.registry import register_task, resolve_task
+
+# worker 使用的队列名
+WORKER_QUEUE = "worker"
+
+
+def distributed() -> bool:
+    """是否启用分布式 worker(采集任务投递到数据库队列)"""
+    return str(cfg.get("worker.distributed", False)).lower() == "true"
+
+
+# ---------------------------------------------------------------- 任务
+@register_task("worker.crawl_feed", tag="crawl")
+def crawl_feed(mp_id: str, task_id: str = None, max_page: int = 1, run_id: str = None) -> None:
+    """采集单个公众号，指定 task_id 时按消息任务执行(含WebHook通知，run_id 为汇总通知的运行ID)"""
+    from core.db import DB
+    from core.models.feed import Feed
+    from core.models.message_task import MessageTask
+
+    session = DB.get_session()
+    feed = session.query(Feed).filter(Feed.id == mp_id).first()
+    if feed is None:
+        print_warning(f"公众号不存在: {mp_id}")
+        return
+    if task_id:
+        from jobs.mps import do_job
+
+        task = session.query(MessageTask).filter(MessageTask.id == task_id).first()
+        if task is not None:
+            do_job(feed, task, run_id=run_id)
+            return
+    from core.wx import WxGather
+    from jobs.article import UpdateArticle
+
+    wx = WxGather().Model()
+    wx.get_Articles(feed.faker_id, CallBack=UpdateArticle, Mps_id=feed.id, Mps_title=feed.mp_name, MaxPage=int(max_page or 1))
+
+
+@register_task("worker.fetch_content", tag="content")
+def fetch_content(article_id: str) -> None:
+    """抓取单篇文章正文并保存"""
+    from core.db import DB
+    from core.models.article import Article, DATA_STATUS
+    from driver.article_extract import ArticleExtractor
+
+    session = DB.get_session()
+    article = session.query(Article).filter(Article.id == article_id).first()
+    if article is None or (article.content or "").strip():
+        return
+    url = article.url or f"https://mp.weixin.qq.com/s/{article.id}"
+    content = ArticleExtractor.extract(url).get("content") or ""
+    if not content:
+        raise Exception(f"未获取到正文: {url}")
+    article.content = content
+    if content == "DELETED":
+        article.status = DATA_STATUS.DELETED
+    session.commit()
+
+
+@register_task("worker.content_backfill", tag="content")
+def content_backfill(max_items: int = None) -> None:
+    from jobs.content_backfill import ContentBackfill
+
+    ContentBackfill.run(max_items)
+
+
+# ---------------------------------------------------------------- 投递
+def enqueue_crawl(mp_id: str, task_id: str = None, max_page: int = 1, priority: int = 100,
+                  run_id: str = None) -> int:
+    kwargs = {"mp_id": mp_id, "task_id": task_id, "max_page": max_page}
+    if run_id:
+        kwargs["run_id"] = run_id
+    return LeaseQueue(WORKER_QUEUE).enqueue(
+        "worker.crawl_feed",
+        kwargs=kwargs,
+        priority=priority,
+        dedupe_key=f"crawl:{mp_id}:{task_id or ''}",
+        tag="crawl",
+        # 合并到等待中的任务时以本次运行为准
+        replace=bool(run_id),
+        # 汇总通知按运行统计完成数，不能合并到上一次运行仍在执行的任务
+        dedupe_running=not run_id,
+    )
+
+
+def enqueue_fetch(article_id: str, priority: int = 200) -> int:
+    return LeaseQueue(WORKER_QUEUE).enqueue(
+        "worker.fetch_content",
+        args=[article_id],
+        priority=priority,
+        dedupe_key=f"fetch:{article_id}",
+        tag="content",
+    )
+
+
+def enqueue_backfill(max_items: int = None) -> int:
+    return LeaseQueue(WORKER_QUEUE).enqueue(
+        "worker.content_backfill",
+        kwargs={"max_items": max_items},
+        priority=300,
+        dedupe_key="content_backfill",
+        tag="content",
+    )
+
+
+# ---------------------------------------------------------------- worker
+class Worker:
+    """租约队列 worker
+
+    并发领取任务执行，执行期间后台线程按租约的1/3周期续约；
+    任务异常时按退避重试，进程被杀时租约过期后由其它 worker 接管。
+    """
+
+    def __init__(self, queue: str = WORKER_QUEUE, concurrency: int = None, lease: int = None,
+                 names: Iterable[str] = None, worker_id: str = None, poll: float = None):
+        self.queue = LeaseQueue(queue)
+        self.concurrency = max(1, int(concurrency or cfg.get("worker.concurrency", 2) or 2))
+        self.lease = int(lease or self.queue.lease)
+        self.names = list(names) if names else None
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.poll = float(poll or cfg.get("worker.poll", 2) or 2)
+        self._stop = threading.Event()
+        self._slots = threading.Semaphore(self.concurrency)
+        # lost: 租约已被其它 worker 接管，本次执行结果未记录
+        self.stats = {"done": 0, "retry": 0, "dead": 0, "lost": 0}
+
+    def stop(self, *_args) -> None:
+        print_warning(f"worker {self.worker_id} 正在停止，等待执行中的任务完成...")
+        self._stop.set()
+
+    def execute(self, job: dict) -> None:
+        from core.queue.queue import tag_timeout
+
+        finished = self.queue.keepalive(job["id"], self.worker_id, self.lease)
+        start = time.time()
+        # 采集/抓取循环通过取消令牌感知执行期限，超时后尽快退出并按失败重试
+        token = CancelToken(job.get("timeout") or tag_timeout(job["tag"] or "default"), name=job["name"])
+        previous = bind(token)
+        try:
+            func = resolve_task(job["name"])
+            if func is None:
+                raise Exception(f"未注册的任务: {job['name']}")
+            # 正常返回即视为完成(超过期限也不再重试)；抛出任何异常(含 TaskCancelled)按失败重试
+            func(*job["args"], **job["kwargs"])
+            if self.queue.complete(job["id"], self.worker_id):
+                self.stats["done"] += 1
+                print_success(f"任务完成 {job['name']}#{job['id']} 耗时{time.time() - start:.2f}秒")
+            else:
+                self.stats["lost"] += 1
+                print_warning(f"任务 {job['name']}#{job['id']} 已执行完成，但租约已被其它worker接管，可能重复执行")
+        except Exception as e:
+            result = self.queue.fail(job["id"], self.worker_id, str(e))
+            self.stats[result] += 1
+            if result == "lost":
+                print_warning(f"任务失败 {job['name']}#{job['id']}，租约已被其它worker接管: {e}")
+            else:
+                print_error(f"任务失败 {job['name']}#{job['id']}({result}): {e}")
+        finally:
+            bind(previous)
+            finished.set()
+            self._slots.release()
+
+    def run(self) -> None:
+        print_success(f"worker {self.worker_id} 已启动: 队列{self.queue.name} 并发{self.concurrency} 租约{self.lease}秒")
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="worker") as pool:
+            while not self._stop.is_set():
+                self._slots.acquire()
+                if self._stop.is_set():
+                    self._slots.release()
+                    break
+                job: Optional[dict] = None
+                try:
+                    job = self.queue.claim(self.worker_id, self.names, self.lease)
+                except Exception as e:
+                    print_error(f"领取任务失败: {e}")
+                if job is None:
+                    self._slots.release()
+                    self._stop.wait(self.poll)
+                    continue
+                print_info(f"领取任务 {job['name']}#{job['id']} 第{job['attempts']}次")
+                pool.submit(self.execute, job)
+        print_success(f"worker {self.worker_id} 已退出 {self.stats}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WeRSS 分布式采集 worker")
+    parser.add_argument("--queue", default=WORKER_QUEUE, help="队列名称")
+    parser.add_argument("--concurrency", type=int, default=None, help="并发任务数")
+    parser.add_argument("--lease", type=int, default=None, help="租约时长(秒)")
+    parser.add_argument("--names", default="", help="只执行指定任务名，逗号分隔")
+    args, _ = parser.parse_known_args()
+    worker = Worker(
+        queue=args.queue,
+        concurrency=args.concurrency,
+        lease=args.lease,
+        names=[n.strip() for n in args.names.split(",") if n.strip()] or None,
+    )
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
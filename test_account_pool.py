@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-account token pool used by crawl jobs.
+
+Run:
+  python test_account_pool.py
+"""
+
+import os
+import tempfile
+import time
+
+import core.wx.base as base
+from driver.account_pool import COOLDOWN, EXPIRED, HEALTHY, AccountPool
+
+
+def _login(name: str) -> dict:
+    return {"token": f"token-{name}", "cookies_str": f"bizuin={name}; slave_user={name}"}
+
+
+def _pool(path: str = None) -> AccountPool:
+    pool = AccountPool(path or os.path.join(tempfile.mkdtemp(), "accounts.lic"))
+    # 不导入当前配置中的登录账号
+    pool._loaded = True
+    return pool
+
+
+def test_rotation():
+    pool = _pool()
+    pool.add(_login("a"))
+    pool.add(_login("b"))
+    first = pool.acquire()
+    second = pool.acquire()
+    # 分配负载最低的账号
+    assert {first.id, second.id} == {"a", "b"}
+    pool.release(first.id)
+    pool.release(second.id)
+
+    pool.cooldown("a", seconds=0.3)
+    assert pool.acquire().id == "b"
+    pool.release("b")
+    assert pool.retire("b") == 0
+    assert pool.acquire() is None and pool.healthy_count() == 0
+    states = {a["id"]: a["status"] for a in pool.get_info()["accounts"]}
+    assert states == {"a": COOLDOWN, "b": EXPIRED}
+    # 冷却结束后恢复分配，下线的账号重新扫码登录后恢复
+    time.sleep(0.4)
+    assert pool.acquire().id == "a"
+    pool.add(_login("b"))
+    assert pool.get_info()["healthy"] == 2
+
+
+def test_shared_file():
+    path = os.path.join(tempfile.mkdtemp(), "accounts.lic")
+    api, worker = _pool(path), _pool(path)
+    api.add(_login("a"))
+    assert worker.pick().id == "a"
+    # worker 启动后才登录的账号：文件变化时重新读取
+    api.add(_login("b"))
+    worker.cooldown("a", seconds=60)
+    assert worker.pick().id == "b"
+    # worker 保存冷却状态时合并而不是覆盖 API 进程登记的账号
+    reloaded = _pool(path)
+    states = {a["id"]: a["status"] for a in reloaded.get_info()["accounts"]}
+    assert states == {"a": COOLDOWN, "b": HEALTHY}
+    assert api.pick().id == "b"
+
+
+def test_switch_account():
+    pool = _pool()
+    pool.add(_login("a"))
+    pool.add(_login("b"))
+    original = base.Accounts
+    base.Accounts = pool
+    try:
+        gather = base.WxGather()
+        gather.get_token(lease=True)
+        first = gather.account_id
+        # 频率限制：当前账号冷却，换用另一个账号继续
+        assert gather.switch_account("Frequency Control")
+        assert gather.account_id and gather.account_id != first
+        assert gather.token == f"token-{gather.account_id}"
+        # 会话失效且没有其它健康账号：不再切换
+        assert not gather.switch_account("Invalid Session")
+        assert gather.account_id == ""
+        assert pool.healthy_count() == 0
+        assert not gather.switch_account("Other")
+    finally:
+        base.Accounts = original
+
+
+def main():
+    test_rotation()
+    test_shared_file()
+    test_switch_account()
+    print("✅ test_account_pool.py passed")
+
+
+if __name__ == "__main__":
+    main()
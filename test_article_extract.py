@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the HTTP-first article parser.
+
+Run:
+  python test_article_extract.py
+"""
+
+from driver.article_extract import parse_article_html
+from driver.playwright_driver import RequestBlockPolicy
+
+
+SAMPLE = """
+<html><head>
+<title>fallback title</title>
+<meta property="og:title" content="测试文章" />
+<meta property="og:article:author" content="作者A" />
+<meta property="og:description" content="文章描述" />
+<meta property="og:image" content="https://mmbiz.qpic.cn/cover.jpg" />
+</head><body>
+<strong id="js_name">测试公众号</strong>
+<div id="js_content" style="visibility: hidden;"><p>第一段正文</p><img data-src="https://mmbiz.qpic.cn/a.png"/></div>
+<script>
+var biz = "" || "MzA5NzQ2NjQwMA==";
+var ct = "1700000000";
+var nickname = htmlDecode("测试公众号");
+</script>
+</body></html>
+"""
+
+
+def test_parse_article():
+    info = parse_article_html(SAMPLE, "https://mp.weixin.qq.com/s/abc")
+    assert info["title"] == "测试文章"
+    assert info["author"] == "作者A"
+    assert info["description"] == "文章描述"
+    assert info["topic_image"] == "https://mmbiz.qpic.cn/cover.jpg"
+    assert info["publish_time"] == 1700000000
+    assert info["mp_info"]["biz"] == "MzA5NzQ2NjQwMA=="
+    assert info["mp_id"] == "MP_WXS_3097466400"
+    assert "第一段正文" in info["content"]
+    assert "https://mmbiz.qpic.cn/a.png" in info["content"]
+
+
+def test_escalation_markers():
+    verify = parse_article_html("<html><body>当前环境异常，完成验证后即可继续访问</body></html>", "")
+    assert verify.get("verify") and not verify["content"]
+
+    deleted = parse_article_html("<html><body>该内容已被发布者删除</body></html>", "")
+    assert deleted["content"] == "DELETED"
+
+    empty = parse_article_html("<html><body><div id='js_content'>  </div></body></html>", "")
+    assert empty["content"] == ""
+
+
+def test_block_policy():
+    policy = RequestBlockPolicy("image,font", "mp.weixin.qq.com,res.wx.qq.com")
+    assert not policy.should_block("document", "https://mp.weixin.qq.com/s/abc")
+    assert not policy.should_block("script", "https://res.wx.qq.com/mmbizappmsg/a.js")
+    assert policy.should_block("image", "https://mp.weixin.qq.com/logo.png")
+    assert policy.should_block("script", "https://hm.baidu.com/hm.js")
+    assert not RequestBlockPolicy("image", "").should_block("xhr", "https://example.com/")
+
+
+def main():
+    test_parse_article()
+    test_escalation_markers()
+    test_block_policy()
+    print("✅ test_article_extract.py passed")
+
+
+if __name__ == "__main__":
+    main()
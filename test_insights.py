@@ -6,9 +6,44 @@ Run:
   python test_insights.py
 """
 
-from core.insights.extract import extract_headings, extract_summary
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.insights.extract import extract_headings, extract_summary, parse_article
+from core.llm.client import LLM, LLMClient, estimate_tokens
 from core.llm.siliconflow import SiliconFlowError, siliconflow_chat_json
 
+_active = {"now": 0, "peak": 0, "connections": set()}
+_lock = threading.Lock()
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with _lock:
+            _active["now"] += 1
+            _active["peak"] = max(_active["peak"], _active["now"])
+            _active["connections"].add(self.client_address)
+        time.sleep(0.1)
+        with _lock:
+            _active["now"] -= 1
+        reply = {"choices": [{"message": {"content": '{"highlight": "h", "points": ["p"]}'}}],
+                 "usage": {"total_tokens": 10}}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
 
 def test_extract_basic():
     html = "<h1>一级标题</h1><p>第一段内容用于摘要提取。</p><h2>二级A</h2><p>更多</p><h2>二级B</h2>"
@@ -19,25 +54,387 @@ def test_extract_basic():
     assert any(h["text"] == "二级A" for h in headings)
     assert any(h["text"] == "二级B" for h in headings)
 
+    parsed = parse_article(html + "<script>var x = 1;</script>")
+    assert parsed is parse_article(html + "<script>var x = 1;</script>")  # 同一正文只解析一次
+    assert "var x" not in parsed.text and parsed.word_count == len(parsed.text.replace(" ", ""))
+    assert parsed.summary("", max_len=200) == parsed.text  # 段落过短时退回全文
+    assert parsed.heading_items((2,), max_items=1) == [{"level": 2, "text": "二级A"}]
 
-async def test_llm_guardrails():
+
+def test_llm_guardrails():
     try:
-        await siliconflow_chat_json(
+        asyncio.run(siliconflow_chat_json(
             model="",
             api_url="",
             api_key="",
             messages=[{"role": "user", "content": "{}"}],
-        )
+        ))
     except SiliconFlowError:
         return
     raise AssertionError("Expected SiliconFlowError for missing config")
 
 
+def test_shared_llm_client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = LLMClient()
+    client.max_in_flight = 2
+    futures = [client.submit(base + "/chat/completions", {"messages": [{"role": "user", "content": "hi"}]})
+               for _ in range(6)]
+    assert all(f.result(10)["usage"]["total_tokens"] == 10 for f in futures)
+    # 全局并发上限，且连接被复用
+    assert _active["peak"] <= 2 and len(_active["connections"]) <= 2
+    assert client.get_metrics()["tokens"] == 60
+    client.close()
+
+    # 同步线程中复用事件循环执行异步调用
+    data = LLM.run(siliconflow_chat_json(model="m", api_url=base, api_key="k",
+                                          messages=[{"role": "user", "content": "{}"}]))
+    assert data == {"highlight": "h", "points": ["p"]}
+
+    # 异步代码使用 arun()，在运行中的事件循环内调用 run() 直接报错而不是阻塞
+    async def call_async():
+        try:
+            LLM.run(asyncio.sleep(0))
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("LLM.run() must not block a running loop")
+        return await LLM.arun(siliconflow_chat_json(model="m", api_url=base, api_key="k",
+                                                    messages=[{"role": "user", "content": "{}"}]))
+
+    assert asyncio.run(call_async()) == {"highlight": "h", "points": ["p"]}
+    assert estimate_tokens([{"content": "中文" * 10}]) == 20
+    assert estimate_tokens([{"content": "abcd" * 10}, {"content": "x"}]) == 11
+    server.shutdown()
+
+
+def test_llm_cache():
+    import os
+    import tempfile
+
+    from core.db import Db
+    from core.llm.cache import LLMCache
+
+    db = Db(tag="LLM缓存测试")
+    db.init(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'llm_cache.db')}")
+    cache = LLMCache(db=db)
+    cache.enabled = True
+    text = "正文  第一段\n\n第二段"
+    key = cache.key("v1", "m", text, {"temperature": 0.2})
+    assert cache.get(key) is None
+    cache.put(key, '{"ok": 1}', model="m", prompt_version="v1")
+    # 排版差异(空白)命中同一条缓存，提示词版本/模型/参数/正文不同则不命中
+    same = cache.key("v1", "m", "正文 第一段 第二段", {"temperature": 0.2})
+    assert same == key and cache.get(same) == '{"ok": 1}'
+    assert cache.key("v2", "m", text, {"temperature": 0.2}) != key
+    assert cache.key("v1", "m2", text, {"temperature": 0.2}) != key
+    assert cache.key("v1", "m", text, {"temperature": 0.5}) != key
+    assert cache.key("v1", "m", "正文 第一段", {"temperature": 0.2}) != key
+
+    from core.models.llm_cache import LLMCacheEntry
+    session = db.get_session()
+    cache.max_bytes = 100
+    for i in range(5):
+        cache.put(f"k{i}", "x" * 40)
+        session.query(LLMCacheEntry).filter(LLMCacheEntry.key == f"k{i}").update({LLMCacheEntry.last_hit: i})
+        session.commit()
+    cache.get("k0")
+    assert cache.evict() > 0
+    stats = cache.stats()
+    assert stats["bytes"] <= 100, stats
+    assert cache.get("k1") is None and cache.get("k0") == "x" * 40  # 淘汰最久未命中的
+
+    cache.ttl = 1
+    session.query(LLMCacheEntry).update({LLMCacheEntry.created_at: int(time.time()) - 10})
+    session.commit()
+    assert cache.get("k0") is None
+
+
+def test_insights_backfill():
+    import os
+    import tempfile
+
+    from core.db import Db
+    from core.models.article import Article
+    from core.models.article_insight import ArticleInsight
+    from core.insights.related import RelatedIndex
+    from jobs.insights_backfill import InsightsBackfillWorker
+
+    tmp = tempfile.mkdtemp()
+    db = Db(tag="洞察回填测试")
+    db.init(f"sqlite:///{os.path.join(tmp, 'backfill.db')}")
+    db.create_tables()
+    session = db.get_session()
+    session.add_all([
+        Article(id=f"a{i:02d}", mp_id="mp", title=f"标题{i}", description="" if i % 2 else f"摘要{i}",
+                content=f"<h1>标题{i}</h1><p>{'正文内容' * 10}{i}</p>", status=1)
+        for i in range(10)
+    ])
+    session.commit()
+
+    index = RelatedIndex(path=os.path.join(tmp, "related"), dim=64)
+    worker = InsightsBackfillWorker(workers=2, batch_size=4, checkpoint=os.path.join(tmp, "checkpoint.json"),
+                                    index=index)
+    worker.db = db
+    progress = worker.run(max_items=4)
+    assert progress["scanned"] == 4 and worker.cursor == "a03"
+    # 从检查点继续(新进程)：计数与耗时累计整个回填过程，max_items 按本次运行计数
+    worker = InsightsBackfillWorker(workers=2, batch_size=4, checkpoint=os.path.join(tmp, "checkpoint.json"),
+                                    index=index)
+    worker.db = db
+    progress = worker.run(max_items=4)
+    assert progress["scanned"] == 8 and worker.cursor == "a07", progress
+    progress = worker.run()
+    assert progress["scanned"] == 10 and progress["created"] == 10, progress
+    assert progress["elapsed"] >= 0 and worker.cursor is None
+    session = db.get_session()
+    assert session.query(ArticleInsight).count() == 10
+    article = session.query(Article).filter(Article.id == "a01").first()
+    insight = session.query(ArticleInsight).filter(ArticleInsight.article_id == "a01").first()
+    assert article.description == insight.summary and insight.summary.startswith("正文内容")
+    assert json.loads(insight.headings_json) == [{"level": 1, "text": "标题1"}]
+    assert json.loads(insight.key_points_json)["source"] == "local"
+    assert len(index) == 10 and "a01" in index
+
+    # 内容未变化的文章跳过，只更新变化的
+    article.content = "<p>新的正文内容新的正文内容新的正文内容</p>"
+    session.commit()
+    progress = worker.run(restart=True)
+    assert progress["updated"] == 1 and progress["skipped"] == 9, progress
+
+
+def test_map_reduce():
+    from core.insights.mapreduce import map_reduce, split_chunks
+
+    html = "".join(f"<h2>第{i}节</h2>" + "".join(f"<p>{'内容' * 100}{i}-{j}</p>" for j in range(5)) for i in range(6))
+    parsed = parse_article(html)
+    chunks = split_chunks(parsed, max_tokens=1500, max_chunks=16)
+    assert len(chunks) > 1 and all(len(c) <= 1500 + 100 for c in chunks)
+    # 在标题处分块，且不丢失任何内容
+    assert all(c.startswith("## 第") for c in chunks)
+    assert "\n".join(chunks).count("内容" * 100) == 30
+    # 分块数受 max_chunks 限制
+    assert len(split_chunks(parsed, max_tokens=100, max_chunks=4)) == 4
+
+    calls = []
+    sources = []
+
+    async def chat_json(messages, stage, usage, source):
+        calls.append(stage)
+        sources.append(source)
+        usage["total_tokens"] = usage.get("total_tokens", 0) + 10
+        if stage == "map":
+            return {"points": [messages]}
+        return {"points": [p for part in messages for p in part["points"]]}
+
+    result, report = asyncio.run(map_reduce(
+        name="test",
+        chunks=chunks,
+        chat_json=chat_json,
+        map_prompt=lambda i, total, chunk: f"{i + 1}/{total}",
+        reduce_prompt=lambda parts: parts,
+        max_tokens=1500,
+    ))
+    assert result["points"] == [f"{i + 1}/{len(chunks)}" for i in range(len(chunks))]
+    assert report["map"]["total_tokens"] == 10 * len(chunks) and calls.count("map") == len(chunks)
+    assert report["reduce"]["levels"] == 1
+    # 缓存按每次调用依据的正文片段(分块/合并前的部分结果)计算
+    assert sources[:len(chunks)] == chunks
+    assert json.loads(sources[-1]) == [{"points": [f"{i + 1}/{len(chunks)}"]} for i in range(len(chunks))]
+
+
+def test_extractive_summary():
+    from core.insights import extractive
+
+    html = (
+        "<h1>新能源汽车销量创新高</h1>"
+        "<p>今年前三季度新能源汽车销量同比增长百分之三十，创下历史新高。</p>"
+        "<p>天气不错，作者周末去了公园散步，顺便拍了几张照片。</p>"
+        "<p>业内人士认为，新能源汽车销量增长主要得益于电池成本下降和充电网络完善。</p>"
+        "<p>电池成本在过去三年下降了近一半，新能源汽车价格随之下探。</p>"
+        "<p>充电网络覆盖率提升，也缓解了消费者对新能源汽车续航的担忧。</p>"
+        "<p>欢迎关注本公众号，点击右上角分享给朋友。</p>"
+    )
+    start = time.time()
+    data = extractive.summarize(parse_article(html), title="新能源汽车销量创新高")
+    assert time.time() - start < 0.5
+    assert len(data["points"]) == 3
+    assert "新能源汽车" in data["highlight"]
+    assert not any("公园" in p for p in data["points"])
+    # 正文大多在 <section> 中、<p> 只覆盖一小部分时，按全文切句
+    sections = "".join(f"<section>第{i}条新闻：新能源汽车销量继续增长，电池成本持续下降。</section>" for i in range(10))
+    sentences = extractive.split_sentences(parse_article("<p>编者按：本期导读。</p>" + sections))
+    assert len(sentences) >= 10
+    assert extractive.tokenize("AI芯片GPU") == ["ai", "芯片", "gpu"]
+
+
+def test_related_index():
+    import tempfile
+
+    from core.insights.related import RelatedIndex
+
+    path = tempfile.mkdtemp()
+    index = RelatedIndex(path=path, dim=256)
+    topics = {
+        "car": "新能源汽车 电池 充电桩 续航 销量 补贴",
+        "food": "美食 火锅 餐厅 菜谱 烹饪 口味",
+        "tech": "芯片 GPU 算力 大模型 训练 推理",
+    }
+    day = 86400
+    for i in range(1200):
+        name = list(topics)[i % 3]
+        words = topics[name].split()
+        text = " ".join(words[j % len(words)] for j in range(i % 5, i % 5 + 4))
+        index.add(f"{name}{i}", f"mp{i % 2}", 1700000000 + i * day // 10, f"{name}{i}", text)
+    index.flush()
+    assert len(index) == 1200  # 超过初始容量后自动扩容
+
+    hits = index.search("car0", k=5)
+    assert len(hits) == 5 and all(h[0].startswith("car") for h in hits)
+    assert all(int(h[0][3:]) % 2 == 0 for h in index.search("car0", k=5, same_feed=True))
+    assert all(abs(int(h[0][3:])) <= 100 for h in index.search("car0", k=20, days=10))
+    # 从磁盘重新加载
+    reloaded = RelatedIndex(path=path, dim=256)
+    assert reloaded.search("car0", k=5) == hits
+
+    # 多个进程(各自的实例)交替写入同一索引：行号不冲突，且互相能读到对方新增的行
+    other = RelatedIndex(path=path, dim=256)
+    index.add("car-new", "mp0", 1700000000, "car", topics["car"])
+    other.add("food-new", "mp1", 1700000000, "food", topics["food"])
+    index.add("tech-new", "mp1", 1700000000, "tech", topics["tech"])
+    assert len(index) == len(other) == 1203
+    assert index.read(1200, 1203)[0] == other.read(1200, 1203)[0] == ["car-new", "food-new", "tech-new"]
+    assert index.search("food-new", k=3) and all(h[0].startswith("food") for h in other.search("food-new", k=3))
+
+
+def test_topic_clustering():
+    import tempfile
+    import time
+
+    from core.insights.related import RelatedIndex
+    from core.insights.topics import TopicClusterer
+
+    index = RelatedIndex(path=tempfile.mkdtemp(), dim=256)
+    clusterer = TopicClusterer(index=index, path=tempfile.mkdtemp())
+    clusterer.batch_size = 50
+    now = int(time.time())
+    stories = {
+        "quake": "地震 震级 震中 余震 救援 伤亡",
+        "chip": "芯片 出口 管制 半导体 光刻机 制裁",
+    }
+    # 旧文章(窗口外)不参与聚类
+    index.add("old", "mp0", now - 30 * 86400, "地震 震级 震中", "地震 震级 震中 余震")
+    for i in range(30):
+        name = "quake" if i < 20 else "chip"
+        words = stories[name].split()
+        text = " ".join(words[j % len(words)] for j in range(i % 3, i % 3 + 5))
+        # 地震: 5个公众号在最近几小时集中报道；芯片: 1个公众号、时间分散
+        feed, age = (f"mp{i % 5}", i * 600) if name == "quake" else ("mp9", (i - 20) * 7200)
+        index.add(f"{name}{i}", feed, now - age, " ".join(words[:2]), text)
+    index.flush()
+
+    report = clusterer.run_cycle(cpu_budget=10)
+    assert report["processed"] == 31 and report["skipped"] == 1 and report["pending"] == 0
+    trending = clusterer.trending()
+    assert trending and trending[0]["feeds"] == 5
+    assert all(m.startswith("quake") for m in trending[0]["members"])
+    assert trending[0]["representative"].startswith("quake")
+    # 只被一个公众号报道的话题不算热点
+    assert all("mp9" not in t["feed_ids"] for t in trending)
+
+    # 增量：只处理新增文章；状态从磁盘恢复
+    index.add("quake99", "mp7", now, "地震 救援", "地震 震级 余震 救援 伤亡")
+    index.flush()
+    reloaded = TopicClusterer(index=index, path=clusterer.path)
+    assert reloaded.run_cycle(cpu_budget=10)["processed"] == 1
+    top = reloaded.trending()[0]
+    assert top["feeds"] == 6 and "quake99" in top["members"]
+    # CPU预算为0时不处理，游标保持不变
+    index.add("chip100", "mp8", now, "芯片", "芯片 出口 管制")
+    assert reloaded.run_cycle(cpu_budget=0)["pending"] == 1
+
+    # 多个进程共用状态：每轮从磁盘上的最新状态继续，读取方在状态变化后重新加载
+    size = len(clusterer.get(top["id"])["members"])
+    assert reloaded.run_cycle(cpu_budget=10)["processed"] == 1
+    assert clusterer.run_cycle(cpu_budget=10)["processed"] == 0
+    index.add("quake100", "mp6", now, "地震 救援", "地震 震级 余震 救援 伤亡")
+    assert clusterer.run_cycle(cpu_budget=10)["processed"] == 1
+    assert len(reloaded.get(top["id"])["members"]) == size + 1
+    assert reloaded.cursor == clusterer.cursor == len(index)
+
+
+def test_public_page_hydration():
+    from types import SimpleNamespace
+
+    from core.insights.hydrate import PublicPageHydrator
+
+    hydrator = PublicPageHydrator()
+    pages = {
+        "https://mp.weixin.qq.com/s/ok": {"description": "页面摘要", "topic_image": "https://img/1.jpg", "content": ""},
+        "https://mp.weixin.qq.com/s/empty": {"description": "", "topic_image": "", "content": ""},
+    }
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return None if url.endswith("/down") else pages[url]
+
+    hydrator._fetch = fetch
+
+    def article(url):
+        return SimpleNamespace(url=url, description="", pic_url="", content="")
+
+    a = article("https://mp.weixin.qq.com/s/ok")
+    assert hydrator.hydrate(a) and a.description == "页面摘要" and a.pic_url == "https://img/1.jpg"
+    # 已有摘要或非公众号链接不请求
+    assert not hydrator.hydrate(a)
+    assert not hydrator.hydrate(article("https://example.com/x"))
+    # 页面没有摘要：进入负缓存，重复访问不再请求
+    for _ in range(3):
+        assert not hydrator.hydrate(article("https://mp.weixin.qq.com/s/empty"))
+    assert fetched.count("https://mp.weixin.qq.com/s/empty") == 1
+    hydrator.forget("https://mp.weixin.qq.com/s/empty")
+    hydrator.hydrate(article("https://mp.weixin.qq.com/s/empty"))
+    assert fetched.count("https://mp.weixin.qq.com/s/empty") == 2
+    # 请求失败由 _fetch 决定是否缓存，这里未缓存，下次会重试
+    hydrator.hydrate(article("https://mp.weixin.qq.com/s/down"))
+    hydrator.hydrate(article("https://mp.weixin.qq.com/s/down"))
+    assert fetched.count("https://mp.weixin.qq.com/s/down") == 2
+    # HTTP 错误按 error_ttl 缓存，不当作空页面
+    from driver.article_extract import ArticleExtractor
+
+    hydrator = PublicPageHydrator()
+    hydrator.negative_ttl, hydrator.error_ttl = 3600, 60
+    original = ArticleExtractor.fetch_http
+    ArticleExtractor.fetch_http = lambda url: {"content": "", "description": "", "http_status": 503}
+    try:
+        assert hydrator._fetch("https://mp.weixin.qq.com/s/503") is None
+    finally:
+        ArticleExtractor.fetch_http = original
+    assert hydrator._negative["https://mp.weixin.qq.com/s/503"] - time.time() <= 60
+    # 过期后重新请求；超过容量时淘汰最久未用的链接
+    hydrator._negative["https://mp.weixin.qq.com/s/old"] = 0
+    assert not hydrator._cached_negative("https://mp.weixin.qq.com/s/old")
+    hydrator.max_entries = 2
+    for i in range(3):
+        hydrator._remember(f"https://mp.weixin.qq.com/s/{i}", 60)
+    assert list(hydrator._negative) == ["https://mp.weixin.qq.com/s/1", "https://mp.weixin.qq.com/s/2"]
+
+
 def main():
     test_extract_basic()
-
-    import asyncio
-    asyncio.run(test_llm_guardrails())
+    test_shared_llm_client()
+    test_llm_cache()
+    test_insights_backfill()
+    test_map_reduce()
+    test_extractive_summary()
+    test_related_index()
+    test_topic_clustering()
+    test_public_page_hydration()
+    test_llm_guardrails()
     print("✅ test_insights.py passed")
 
 
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for scheduler leader election.
+
+Run:
+  python test_leader.py
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import update
+
+from core.db import Db
+from core.leader import LeaderElection
+from core.models.leader_lock import LeaderLock
+
+
+def test_single_leader_and_failover():
+    path = os.path.join(tempfile.mkdtemp(), "leader.db")
+    db = Db(tag="选举测试")
+    db.init(f"sqlite:///{path}")
+    a = LeaderElection("test", ttl=30, db=db)
+    b = LeaderElection("test", ttl=30, db=db)
+    a.enabled = b.enabled = True
+
+    assert a.try_acquire()
+    assert not b.try_acquire()
+    assert a.try_acquire()  # 续约
+    assert a.is_leader() and not b.is_leader()
+
+    # 主节点失联：租约过期后其它实例接管，原主节点续约失败
+    session = db.get_session()
+    session.execute(update(LeaderLock).where(LeaderLock.name == "test").values(lease_until=0))
+    session.commit()
+    assert b.try_acquire()
+    assert not a.try_acquire()
+    assert b.is_leader() and not a.is_leader()
+
+    # 主动释放后立即可被接管
+    b.release()
+    assert a.try_acquire()
+
+
+def main():
+    test_single_leader_and_failover()
+    print("✅ test_leader.py passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Tests for the DB-backed lease queue used by distributed workers.
+
+Run:
+  python test_lease_queue.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from core.db import Db
+from core.queue import TaskQueueManager, register_task
+from core.monitor import to_prometheus
+from core.queue.lease import LeaseQueue
+
+
+def _queue() -> LeaseQueue:
+    path = os.path.join(tempfile.mkdtemp(), "queue.db")
+    db = Db(tag="队列测试")
+    db.init(f"sqlite:///{path}")
+    q = LeaseQueue("test", db=db)
+    q.retry_backoff = 0
+    return q
+
+
+def test_claim_complete_and_dedupe():
+    q = _queue()
+    first = q.enqueue("demo", args=[1], dedupe_key="k")
+    assert q.enqueue("demo", args=[1], dedupe_key="k") == first
+    q.enqueue("demo", args=[2], priority=1)
+
+    job = q.claim("w1")
+    assert job["args"] == [2]  # 优先级高的先执行
+    assert q.claim("w1")["id"] == first
+    assert q.claim("w2") is None
+    assert q.heartbeat(first, "w1")
+    # 只与等待中的任务合并时，执行中的同键任务不影响新任务写入
+    second, created = q.submit("demo", args=[1], dedupe_key="k", dedupe_running=False)
+    assert created and second != first
+    assert q.submit("demo", args=[1], dedupe_key="k", dedupe_running=False) == (second, False)
+    assert not q.heartbeat(first, "w2")
+    # 执行中的任务失败重试时，已有等待中的同键任务：合并到该任务，不再重复排队
+    assert q.fail(first, "w1", "boom") == "retry"
+    assert q.stats()["pending"] == 1 and q.stats()["done"] == 1
+
+    # 等待中的同键任务由唯一索引兜底(并发写入时两边都查不到已有任务)
+    from sqlalchemy.exc import IntegrityError
+    from core.models.queue_job import QueueJob
+    session = q._session()
+    session.add(QueueJob(queue="test", name="demo", payload="{}", dedupe_key="k", status=0, run_at=0))
+    try:
+        session.commit()
+        raise AssertionError("duplicate pending dedupe_key accepted")
+    except IntegrityError:
+        session.rollback()
+
+
+def test_enqueue_crawl_per_run():
+    import jobs.worker as worker
+
+    q = _queue()
+    original = worker.LeaseQueue
+    worker.LeaseQueue = lambda name: q
+    try:
+        first = worker.enqueue_crawl("mp1", "t1", run_id="run1")
+        assert q.claim("w1")["kwargs"]["run_id"] == "run1"
+        # 上一次运行的采集仍在执行：新运行写入自己的任务，不合并到旧任务
+        second = worker.enqueue_crawl("mp1", "t1", run_id="run2")
+        assert second != first
+        # 等待中的同键任务合并，并以最新一次运行为准
+        assert worker.enqueue_crawl("mp1", "t1", run_id="run3") == second
+        assert q.claim("w1")["kwargs"]["run_id"] == "run3"
+        # 不带 run_id 的采集与执行中的任务合并
+        assert worker.enqueue_crawl("mp2") == worker.enqueue_crawl("mp2")
+    finally:
+        worker.LeaseQueue = original
+
+
+def test_retry_dead_and_lease_expiry():
+    q = _queue()
+    job_id = q.enqueue("demo", max_attempts=2)
+    assert q.fail(q.claim("w1")["id"], "w1", "boom") == "retry"
+    assert q.fail(q.claim("w1")["id"], "w1", "boom") == "dead"
+    assert q.stats()["dead"] == 1
+    assert q.replay_dead() == 1
+
+    # worker 失联：租约过期后其它 worker 可重新领取
+    job = q.claim("w1", lease=1)
+    assert job["id"] == job_id
+    time.sleep(2.1)
+    again = q.claim("w2")
+    assert again and again["id"] == job_id and again["worker_id"] == "w2"
+    assert not q.complete(job_id, "w1")
+    # 租约已被接管：失败结果不覆盖新 worker 的任务
+    assert q.fail(job_id, "w1", "boom") == "lost"
+    assert q.fail(job_id, "w1", "boom", retry=False) == "lost"
+    assert q.complete(job_id, "w2")
+
+
+_calls = []
+
+
+@register_task("test.record")
+def _record(value):
+    _calls.append(value)
+    if value == "fail":
+        raise Exception("boom")
+
+
+@register_task("test.maybe_fail")
+def _maybe_fail(value):
+    if value == "fail":
+        raise Exception("boom")
+
+
+def test_worker_lost_lease():
+    from jobs.worker import Worker
+
+    q = _queue()
+    worker = Worker(queue="test", worker_id="w1")
+    worker.queue = q
+    q.enqueue("test.maybe_fail", args=["ok"])
+    q.enqueue("test.maybe_fail", args=["fail"])
+    for _ in range(2):
+        # 执行期间租约过期，任务被其它 worker 接管
+        job = q.claim("w2")
+        worker._slots.acquire()
+        worker.execute(job)
+    assert worker.stats == {"done": 0, "retry": 0, "dead": 0, "lost": 2}
+    assert q.stats()["running"] == 2
+
+
+def test_task_queue_manager_durable():
+    manager = TaskQueueManager(tag="测试", name="test", durable=True)
+    manager._store = _queue()
+    manager.add_task(_record, "ok")
+    manager.add_task(_record, "fail")
+    manager.add_task(_record, lambda: None)  # 参数不可序列化，进入内存队列
+    assert manager.get_queue_info()["durable"]["pending"] == 2
+    assert len(manager._heap) == 1
+
+    manager.run_task_background()
+    deadline = time.time() + 10
+    while time.time() < deadline and manager.get_queue_info()["durable"]["dead"] < 1:
+        time.sleep(0.2)
+    manager.stop()
+    info = manager.get_queue_info()["durable"]
+    assert info["done"] == 1 and info["dead"] == 1
+    assert _calls.count("fail") == manager.store.max_attempts
+
+
+def test_task_queue_coalesce():
+    manager = TaskQueueManager(tag="测试", name="coalesce", durable=True)
+    manager._store = _queue()
+    assert manager.add_task(_record, "x", _priority="bulk")
+    assert not manager.add_task(_record, "x", _priority="interactive")  # 与等待中的任务合并
+    jobs = manager.store.stats()
+    assert jobs["pending"] == 1 and manager.stats["coalesced"] == 1
+    job = manager.store.claim("w1")
+    assert job["priority"] == 10  # 提升为交互优先级
+
+    order = []
+    memory = TaskQueueManager(tag="测试", name="memory", durable=False, workers=1)
+    assert memory.add_task(order.append, "old", _key="refresh")
+    assert not memory.add_task(order.append, "new", _key="refresh", _latest=True)
+    assert not memory.add_task(order.append, "ignored", _key="refresh")
+    assert memory.get_queue_info()["pending_tasks"] == 1
+    memory.run_task_background()
+    deadline = time.time() + 5
+    while time.time() < deadline and not order:
+        time.sleep(0.05)
+    memory.stop()
+    assert order == ["new"]
+    assert memory.stats["coalesced"] == 2
+
+
+def test_task_queue_priority_and_tag_limits():
+    order = []
+    manager = TaskQueueManager(tag="测试", name="memory", durable=False, workers=1)
+    manager.add_task(order.append, "default")
+    manager.add_task(order.append, "bulk", _priority="bulk")
+    manager.add_task(order.append, "interactive", _priority="interactive")
+    manager.run_task_background()
+    deadline = time.time() + 5
+    while time.time() < deadline and len(order) < 3:
+        time.sleep(0.05)
+    manager.stop()
+    assert order == ["interactive", "default", "bulk"]
+    while time.time() < deadline and manager.get_metrics()["run"]["count"] < 3:
+        time.sleep(0.05)
+    metrics = manager.get_metrics()
+    assert metrics["enqueued"] == 3 and metrics["run"]["count"] == 3
+    assert 'werss_queue_run_seconds_count{queue="memory"}' in to_prometheus()
+
+    manager = TaskQueueManager(tag="测试", name="memory", durable=False, workers=3)
+    manager._limits = {"slow": 1}
+    running, peak, done = [], [], []
+    gate = threading.Event()
+
+    def slow(value):
+        running.append(value)
+        peak.append(len(running))
+        gate.wait(5)
+        running.remove(value)
+
+    manager.add_task(slow, "a", _tag="slow")
+    manager.add_task(slow, "b", _tag="slow")
+    manager.add_task(done.append, "other")
+    manager.run_task_background()
+    while time.time() < deadline and not done:
+        time.sleep(0.05)
+    # 分组已满时其它分组的任务不受影响
+    assert done == ["other"]
+    assert manager.get_queue_info()["running"] == {"slow": 1}
+    gate.set()
+    while time.time() < deadline and (manager.get_queue_info()["pending_tasks"] or running):
+        time.sleep(0.05)
+    manager.stop()
+    assert max(peak) == 1  # 同一分组不超过并发上限
+
+
+def test_task_queue_watchdog():
+    from core import cancel
+
+    manager = TaskQueueManager(tag="测试", name="memory", durable=False, workers=1)
+    manager.grace = 0.5
+    release, seen, done = threading.Event(), [], []
+
+    def cooperative():
+        # 可取消的等待在超时后立即返回
+        seen.append(cancel.sleep(30))
+
+    def stuck():
+        release.wait(10)
+
+    def batches():
+        # 每批0.6秒，总计超过期限；按批续期后不会被取消
+        for _ in range(3):
+            time.sleep(0.6)
+            cancel.check()
+            cancel.extend()
+        seen.append("batches")
+
+    manager.add_task(cooperative, _timeout=1)
+    manager.add_task(batches, _timeout=1)
+    manager.add_task(stuck, _timeout=1)
+    manager.add_task(done.append, "next")
+    manager.run_task_background()
+    deadline = time.time() + 8
+    while time.time() < deadline and not done:
+        time.sleep(0.05)
+    release.set()
+    manager.stop()
+    assert seen == [False, "batches"]
+    # 卡住的工作线程被回收，新线程继续执行后续任务
+    assert done == ["next"] and manager.recycled == 1
+    # 超时后正常返回的任务按完成计，不重复执行
+    assert manager.stats["failed"] == 1 and manager.stats["done"] == 3
+
+
+def main():
+    test_claim_complete_and_dedupe()
+    test_enqueue_crawl_per_run()
+    test_retry_dead_and_lease_expiry()
+    test_worker_lost_lease()
+    test_task_queue_manager_durable()
+    test_task_queue_coalesce()
+    test_task_queue_priority_and_tag_limits()
+    test_task_queue_watchdog()
+    print("✅ test_lease_queue.py passed")
+
+
+if __name__ == "__main__":
+    main()
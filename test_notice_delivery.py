@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tests for the async webhook/notice delivery outbox.
+
+Run:
+  python test_notice_delivery.py
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import core.notice
+from core.db import Db
+from core.notice import split_message
+from core.notice.delivery import WebhookDelivery, dumps
+from core.notice.dingtalk import build_dingtalk_message
+from core.queue.lease import LeaseQueue
+
+_received = []
+_fail_first = {"/flaky": 1, "/robot": 1}
+_active = {"now": 0, "peak": 0}
+_lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with _lock:
+            _active["now"] += 1
+            _active["peak"] = max(_active["peak"], _active["now"])
+        time.sleep(1.5 if self.path == "/slow" else 0.1)
+        with _lock:
+            _active["now"] -= 1
+            failing = _fail_first.get(self.path, 0) > 0
+            if failing:
+                _fail_first[self.path] -= 1
+        if self.path == "/robot":
+            # 机器人接口限流时仍返回200，错误码在响应体中
+            status, reply = 200, {"errcode": 0 if not failing else 130101, "errmsg": "ok"}
+        elif self.path == "/bad":
+            status, reply = 400, {"error": "bad request"}
+        else:
+            status, reply = (500 if failing else 200), {"ok": not failing}
+        if status == 200 and not failing:
+            _received.append((self.path, json.loads(body)))
+        data = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _server() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _delivery() -> WebhookDelivery:
+    path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    db = Db(tag="发件箱测试")
+    db.init(f"sqlite:///{path}")
+    delivery = WebhookDelivery(name="webhook-test", durable=True)
+    delivery.enabled = True
+    delivery.concurrency = 2
+    delivery.retry_backoff = 0
+    delivery.poll = 0.2
+    delivery._store = LeaseQueue("webhook-test", db=db)
+    delivery._store.retry_backoff = 0
+    delivery._store.max_attempts = delivery.max_attempts = 3
+    return delivery
+
+
+def test_outbox_delivery():
+    base = _server()
+    delivery = _delivery()
+    start = time.time()
+    for i in range(6):
+        delivery.enqueue(f"{base}/hook", {"n": i})
+    delivery.enqueue(f"{base}/flaky", {"n": "flaky"})
+    delivery.enqueue(f"{base}/robot", build_dingtalk_message("标题", "内容"), kind="dingtalk")
+    delivery.enqueue(f"{base}/bad", {"n": "bad"})
+    # 只写入发件箱，不等待发送
+    assert time.time() - start < 2
+
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        stats = delivery.store.stats()
+        if stats["pending"] == 0 and stats["running"] == 0:
+            break
+        time.sleep(0.1)
+    stats = delivery.store.stats()
+    assert stats["done"] == 8 and stats["dead"] == 1, stats
+    paths = [path for path, _ in _received]
+    assert paths.count("/hook") == 6 and "/flaky" in paths and "/robot" in paths
+    # 同一主机的并发受限
+    assert _active["peak"] <= 2
+    assert delivery.get_metrics()["retried"] == 2
+    delivery.close()
+
+
+def _wait_idle(delivery: WebhookDelivery, timeout: float = 15) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = delivery.store.stats()
+        if stats["pending"] == 0 and stats["running"] == 0:
+            break
+        time.sleep(0.1)
+    return delivery.store.stats()
+
+
+def test_outbox_lease_keepalive():
+    base = _server()
+    delivery = _delivery()
+    delivery.concurrency = 1
+    delivery.store.lease = 3
+    # 同主机串行发送，后面的消息等待超过租约时长，续约避免被重复领取
+    for i in range(4):
+        delivery.enqueue(f"{base}/slow", {"n": i})
+    stats = _wait_idle(delivery)
+    assert stats["done"] == 4, stats
+    from core.models.queue_job import QueueJob
+
+    session = delivery.store._session()
+    assert [job.attempts for job in session.query(QueueJob).all()] == [1, 1, 1, 1]
+    session.commit()
+    assert sorted(body["n"] for path, body in _received if path == "/slow") == [0, 1, 2, 3]
+
+    # 已发送但更新发件箱失败：只重试更新状态，不重新发送
+    original = delivery.store.complete
+    failures = [1]
+
+    def complete(job_id, worker_id=None):
+        if failures:
+            failures.pop()
+            raise RuntimeError("database is locked")
+        return original(job_id, worker_id)
+
+    delivery.store.complete = complete
+    delivery.enqueue(f"{base}/once", {"n": "once"})
+    stats = _wait_idle(delivery)
+    assert stats["done"] == 5 and not failures, stats
+    assert [path for path, _ in _received].count("/once") == 1
+    delivery.close()
+
+
+def test_split_message():
+    sections = [f"### 公众号{i}\n" + "\n".join(f"- 文章{i}-{j}" for j in range(20)) for i in range(10)]
+    chunks = split_message(sections, 1000)
+    assert all(len(c.encode("utf-8")) <= 1000 for c in chunks)
+    assert len(chunks) < len(sections)
+    assert "\n".join(chunks).count("- 文章") == 200
+    # 单段超过上限时按行拆分
+    assert len(split_message(["\n".join(["行" * 100] * 10)], 400)) == 10
+
+
+def test_task_run_digest():
+    from core.models.feed import Feed
+    from core.models.message_task import MessageTask
+    from jobs.notice_digest import TaskRunDigest
+
+    db = Db(tag="汇总测试")
+    db.init(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'digest.db')}")
+    db.create_tables()
+    session = db.get_session()
+    task = MessageTask(id="t1", message_type=0, name="日报", message_template="",
+                       web_hook_url="https://oapi.dingtalk.com/robot/send?access_token=x", mps_id="[]")
+    feeds = [Feed(id=f"mp{i}", mp_name=f"公众号{i}") for i in range(5)]
+    session.add_all([task] + feeds)
+    session.commit()
+
+    sent = []
+    original = core.notice.notice
+    core.notice.notice = lambda url, title, text: sent.append((title, text))
+    try:
+        digest = TaskRunDigest(db=db)
+        run_id = digest.start(task)
+        for i, feed in enumerate(feeds):
+            articles = [{"id": f"a{i}{j}", "mp_id": feed.id, "title": f"标题{i}-{j}", "url": "u",
+                         "publish_time": 1700000000} for j in range(i % 3)]
+            digest.add(run_id, task, feed, articles)
+            if i < 4:
+                assert not sent  # 投递数尚未确定/未全部完成时不发送
+            if i == 2:
+                digest.set_expected(run_id, len(feeds))
+        # 5个公众号的新文章合并为一条消息
+        assert len(sent) == 1 and sent[0][0] == "日报"
+        assert sent[0][1].count("标题") == 4 and "公众号0" not in sent[0][1]
+        assert digest.flush(run_id) == 0  # 同一次运行只发送一次
+    finally:
+        core.notice.notice = original
+
+
+def test_webhook_payload():
+    from types import SimpleNamespace
+    from jobs.webhook import build_payload, payload_spec
+
+    assert payload_spec("")["fields"][0] == "id"
+    assert payload_spec('{"articles": [{% for a in articles %}{{a}}{% endfor %}]}') is None
+    spec = payload_spec('{"fields": ["title", "publish_time", "content"], "content_format": "text"}')
+    task = SimpleNamespace(id="t1", name="任务")
+    feed = SimpleNamespace(id="mp1", mp_name="公众号")
+    article = {"id": "a1", "title": '含"引号"', "publish_time": 1700000000, "content": "<p>正文</p>"}
+    payload = json.loads(dumps(build_payload(task, feed, [article], spec)))
+    assert payload["feed"] == {"id": "mp1", "name": "公众号"}
+    assert payload["articles"] == [{
+        "title": '含"引号"',
+        "publish_time": datetime.fromtimestamp(1700000000).strftime("%Y-%m-%d %H:%M:%S"),
+        "content": "正文",
+    }]
+
+
+def main():
+    test_webhook_payload()
+    test_split_message()
+    test_task_run_digest()
+    test_outbox_delivery()
+    test_outbox_lease_keepalive()
+    print("✅ test_notice_delivery.py passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded seen-article set used by WxGather.
+
+Run:
+  python test_wx_seen.py
+"""
+
+from core.wx.seen import SeenSet, article_key
+
+
+def test_seen_set_bounded():
+    seen = SeenSet(capacity=3, seed_days=0)
+    assert seen.add("a") and seen.add("b") and seen.add("c")
+    assert not seen.add("a")  # 已存在，同时刷新为最近使用
+    assert seen.add("d")  # 淘汰最久未使用的 b
+    assert len(seen) == 3
+    assert "b" not in seen
+    assert "a" in seen and "c" in seen and "d" in seen
+
+
+def test_article_key():
+    assert article_key("MP_WXS_3097466400", "2247483650_1") == "3097466400-2247483650_1"
+
+
+def main():
+    test_seen_set_bounded()
+    test_article_key()
+    print("✅ test_wx_seen.py passed")
+
+
+if __name__ == "__main__":
+    main()